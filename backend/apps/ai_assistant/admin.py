@@ -0,0 +1,10 @@
+from django.contrib import admin
+from .models import ChatSession
+
+
+@admin.register(ChatSession)
+class ChatSessionAdmin(admin.ModelAdmin):
+    list_display = ['id', 'user', 'message_count', 'created_at', 'updated_at']
+    search_fields = ['user__email']
+    readonly_fields = ['id', 'user', 'summary', 'turns', 'message_count', 'created_at', 'updated_at']
+    date_hierarchy = 'updated_at'
@@ -0,0 +1,7 @@
+from django.apps import AppConfig
+
+
+class AiAssistantConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'apps.ai_assistant'
+    label = 'ai_assistant'
@@ -0,0 +1,43 @@
+"""
+Modelo falso con la interfaz de genai.GenerativeModel
+
+Se activa con AI_ASSISTANT_FAKE_MODEL=True (tests y desarrollo local sin
+GEMINI_API_KEY ni cuota). Responde un texto determinista que depende del
+último mensaje del prompt, en fragmentos con una demora configurable
+(AI_ASSISTANT_FAKE_MODEL_DELAY_MS) para simular la generación en streaming.
+"""
+import time
+
+from django.conf import settings
+
+
+class FakeChunk:
+    """Fragmento de respuesta (como GenerateContentResponse)"""
+
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeGenerativeModel:
+    """Reemplazo local de genai.GenerativeModel"""
+
+    def __init__(self, delay_ms=None):
+        self.delay_ms = settings.AI_ASSISTANT_FAKE_MODEL_DELAY_MS if delay_ms is None else delay_ms
+
+    def _reply(self, prompt):
+        lines = [line for line in str(prompt).splitlines() if line.startswith('Usuario:')]
+        question = lines[-1][len('Usuario:'):].strip() if lines else str(prompt)[-80:]
+        return f'Respuesta de prueba de RutaGO a: {question}'
+
+    def _stream(self, text):
+        words = text.split(' ')
+        for index, word in enumerate(words):
+            if self.delay_ms:
+                time.sleep(self.delay_ms / 1000)
+            yield FakeChunk(word if index == len(words) - 1 else f'{word} ')
+
+    def generate_content(self, prompt, stream=False):
+        text = self._reply(prompt)
+        if stream:
+            return self._stream(text)
+        return FakeChunk(text)
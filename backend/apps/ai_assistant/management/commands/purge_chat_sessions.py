@@ -0,0 +1,53 @@
+"""
+Management command para eliminar sesiones de chat expiradas
+
+Una sesión sin actividad por más de CHAT_SESSION['ttl_days'] ya no se puede
+continuar (se inicia una nueva); este comando borra esas filas.
+
+Pensado para ejecutarse periódicamente (cron de Railway, una vez al día).
+
+Uso:
+    python manage.py purge_chat_sessions
+    python manage.py purge_chat_sessions --days 3 --dry-run
+"""
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from apps.ai_assistant.models import ChatSession
+
+
+class Command(BaseCommand):
+    help = 'Elimina las sesiones de chat sin actividad más antiguas que el TTL'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=settings.CHAT_SESSION['ttl_days'],
+            help="Días sin actividad antes de eliminar una sesión (default: CHAT_SESSION['ttl_days'])",
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Muestra cuántas sesiones se eliminarían sin modificar la base de datos',
+        )
+
+    def handle(self, *args, **options):
+        days = options['days']
+        if days < 1:
+            raise CommandError('--days debe ser al menos 1')
+
+        expired = ChatSession.objects.filter(updated_at__lt=timezone.now() - timedelta(days=days))
+
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING(
+                f'[DRY RUN] Se eliminarían {expired.count()} sesiones de chat. No se realizaron cambios.'
+            ))
+            return
+
+        deleted, _ = expired.delete()
+        self.stdout.write(self.style.SUCCESS(f'✓ {deleted} sesiones de chat expiradas eliminadas'))
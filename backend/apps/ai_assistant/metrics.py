@@ -0,0 +1,90 @@
+"""
+Contadores y latencias del asistente AI
+
+Se guardan en la caché 'default' (Redis en producción), así que suman las
+peticiones de todos los workers. Se consultan en /api/ai/metrics/.
+"""
+from django.core.cache import cache
+
+from core.executor import bulkhead_stats
+
+KEY_PREFIX = 'ai_metrics:'
+
+# Contadores expuestos en /api/ai/metrics/
+COUNTERS = (
+    'response_cache.chat.hits',
+    'response_cache.chat.misses',
+    'response_cache.suggest_route.hits',
+    'response_cache.suggest_route.misses',
+    'chat_stream.requests',
+    'chat_stream.errors',
+    'gemini_quota.granted',
+    'gemini_quota.queued',
+    'gemini_quota.shed',
+    'single_flight.leaders',
+    'single_flight.followers',
+    'single_flight.remote_followers',
+)
+
+# Latencias observadas (se guarda cantidad y suma en ms para el promedio)
+TIMINGS = (
+    'chat_stream.first_token',
+    'chat_stream.total',
+    'gemini_quota.wait',
+)
+
+
+def increment(name, amount=1):
+    """Suma amount al contador name"""
+    key = f'{KEY_PREFIX}{name}'
+    try:
+        cache.incr(key, amount)
+    except ValueError:
+        # Primer uso (o caché reiniciada): crear el contador y sumar
+        cache.add(key, 0, None)
+        cache.incr(key, amount)
+
+
+def observe(name, milliseconds):
+    """Registra una latencia en ms del timing name"""
+    increment(f'{name}.count')
+    increment(f'{name}.sum_ms', int(round(milliseconds)))
+
+
+def snapshot():
+    """Valores actuales de los contadores, tasas de acierto del caché de respuestas y cuota"""
+    from .quota import remaining
+
+    names = list(COUNTERS) + [f'{name}.{part}' for name in TIMINGS for part in ('count', 'sum_ms')]
+    values = cache.get_many([f'{KEY_PREFIX}{name}' for name in names])
+    values = {name: values.get(f'{KEY_PREFIX}{name}', 0) for name in names}
+    counters = {name: values[name] for name in COUNTERS}
+
+    hit_rates = {}
+    for kind in ('chat', 'suggest_route'):
+        hits = counters[f'response_cache.{kind}.hits']
+        lookups = hits + counters[f'response_cache.{kind}.misses']
+        hit_rates[kind] = round(hits / lookups, 4) if lookups else None
+
+    latencies = {}
+    for name in TIMINGS:
+        count = values[f'{name}.count']
+        latencies[name] = {
+            'count': count,
+            'avg_ms': round(values[f'{name}.sum_ms'] / count, 1) if count else None,
+        }
+
+    return {
+        'counters': counters,
+        'response_cache_hit_rate': hit_rates,
+        'latency_ms': latencies,
+        'gemini_quota_remaining': remaining(),
+        # Por proceso (el worker que atiende la consulta)
+        'bulkheads': bulkhead_stats(),
+    }
+
+
+def reset():
+    """Reinicia todos los contadores y latencias"""
+    names = list(COUNTERS) + [f'{name}.{part}' for name in TIMINGS for part in ('count', 'sum_ms')]
+    cache.delete_many([f'{KEY_PREFIX}{name}' for name in names])
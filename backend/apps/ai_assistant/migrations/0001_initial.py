@@ -0,0 +1,36 @@
+# Generated by Django 5.0.1 on 2026-10-19 15:20
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChatSession',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('summary', models.TextField(blank=True, default='')),
+                ('turns', models.JSONField(blank=True, default=list)),
+                ('message_count', models.IntegerField(default=0, help_text='Mensajes totales de la conversación')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True, db_index=True)),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='chat_sessions', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Sesión de chat',
+                'verbose_name_plural': 'Sesiones de chat',
+                'db_table': 'ai_chat_sessions',
+                'ordering': ['-updated_at'],
+            },
+        ),
+    ]
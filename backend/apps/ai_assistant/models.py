@@ -0,0 +1,37 @@
+import uuid
+from django.db import models
+from django.contrib.auth import get_user_model
+
+User = get_user_model()
+
+
+class ChatSession(models.Model):
+    """
+    Conversación con RutaGO guardada en el servidor
+
+    Solo se guardan los últimos mensajes que caben en el presupuesto de
+    tokens; los anteriores se condensan en un resumen acumulado (ver
+    sessions.py), así el tamaño de la fila no crece con la conversación.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, null=True, blank=True, related_name='chat_sessions'
+    )
+
+    # Resumen de los mensajes que ya salieron de turns
+    summary = models.TextField(blank=True, default='')
+    # Últimos mensajes: [{"role": "user"|"assistant", "content": "..."}]
+    turns = models.JSONField(default=list, blank=True)
+    message_count = models.IntegerField(default=0, help_text="Mensajes totales de la conversación")
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    class Meta:
+        db_table = 'ai_chat_sessions'
+        verbose_name = 'Sesión de chat'
+        verbose_name_plural = 'Sesiones de chat'
+        ordering = ['-updated_at']
+
+    def __str__(self):
+        return f"{self.id} ({self.message_count} mensajes)"
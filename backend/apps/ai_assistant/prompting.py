@@ -0,0 +1,249 @@
+"""
+Armado de prompts de Gemini con presupuesto de tokens
+
+- El prefijo de sistema (SYSTEM_PREFIX) es un string fijo que se arma una
+  vez por proceso.
+- Cada negocio entra al prompt como una línea compacta (business_line) en vez
+  de un bloque de varias líneas. El índice BM25 la calcula al indexar el
+  negocio (apps/ai_assistant/retrieval.py), así queda cacheada por versión
+  del catálogo.
+- PromptBuilder incluye las partes por prioridad mientras quepan en
+  PROMPT_MAX_TOKENS y las escribe en orden de lectura; lo que no cabe se
+  descarta (primero el resumen, luego el historial más antiguo y los
+  negocios menos relevantes).
+
+Cada prompt se registra en el log con sus tokens estimados y las partes
+incluidas por sección.
+"""
+import logging
+from typing import Dict, List
+
+from django.conf import settings
+
+from .quota import count_tokens
+
+logger = logging.getLogger(__name__)
+
+# Contexto del sistema para RutaGO
+SYSTEM_CONTEXT = """
+Eres RutaGO, un asistente de inteligencia artificial experto en turismo y emprendimientos locales de Santiago, Chile.
+
+Tu misión es ayudar a los usuarios a:
+1. Descubrir negocios locales auténticos en Santiago
+2. Crear rutas personalizadas de turismo basadas en negocios reales de nuestra base de datos
+3. Recomendar experiencias basadas en sus preferencias
+4. Proporcionar información cultural e histórica de Santiago
+5. Sugerir actividades según categorías: gastronomía, hospedaje, turismo
+
+Características de tu personalidad:
+- Amigable y entusiasta sobre Santiago
+- Conocedor de la cultura local chilena
+- Proactivo en hacer sugerencias
+- Conciso pero informativo
+- Usa lenguaje casual chileno cuando sea apropiado
+
+Cuando respondas:
+- Sé breve y directo (máximo 3-4 párrafos)
+- Usa emojis ocasionalmente para darle vida
+- Menciona negocios específicos cuando sea relevante usando datos reales
+- Ofrece opciones y alternativas
+- Pregunta por preferencias si necesitas más información
+
+IMPORTANTE - Reglas de Seguridad:
+- NUNCA menciones emails, teléfonos o datos de contacto personales de negocios o usuarios
+- NUNCA reveles información privada o sensible de la base de datos
+- Solo menciona información pública: nombres de negocios, direcciones, categorías, descripciones, ratings
+- Si te piden información sensible, responde educadamente que no puedes proporcionar ese tipo de datos
+
+Cuando sugier as rutas:
+- Usa negocios reales que te proporciono en el contexto
+- Considera ubicaciones geográficas para crear rutas lógicas
+- Ten en cuenta ratings y categorías para mejores recomendaciones
+- Propón rutas de 3-5 lugares ordenados geográficamente
+
+Recuerda: Estás aquí para hacer que la experiencia de descubrir Santiago sea memorable y auténtica usando información real de negocios locales.
+"""
+
+SYSTEM_PREFIX = SYSTEM_CONTEXT + "\n---\n"
+
+# Formato de las líneas de negocios (explicado una vez en el encabezado)
+BUSINESS_HEADER = (
+    "NEGOCIOS DISPONIBLES EN SANTIAGO (usa estos datos reales).\n"
+    "Formato: nombre (categoría) | ubicación | precio | rating (reseñas) | descripción\n"
+)
+
+# Largo máximo de la descripción en la línea de un negocio
+DESCRIPTION_CHARS = 140
+
+# Prioridades de PromptBuilder (menor número = se incluye antes)
+PRIORITY_REQUIRED = 0
+PRIORITY_TOP_BUSINESSES = 1
+PRIORITY_LAST_EXCHANGE = 2
+PRIORITY_BUSINESSES = 3
+PRIORITY_HISTORY = 4
+PRIORITY_SUMMARY = 5
+
+# Negocios más relevantes que van antes que el historial
+TOP_BUSINESSES = 3
+
+
+def business_line(data: Dict) -> str:
+    """Línea compacta de un negocio a partir de safe_business_data()"""
+    description = ' '.join((data['description'] or '').split())
+    if len(description) > DESCRIPTION_CHARS:
+        description = description[:DESCRIPTION_CHARS - 1].rstrip() + '…'
+    location = ', '.join(part for part in (data['address'], data['neighborhood'], data['comuna']) if part)
+    verified = ' ✓' if data['verified'] else ''
+    return (
+        f"{data['name']}{verified} ({data['category']}) | {location} | {data['price_range']} | "
+        f"{data['rating']}/5 ({data['review_count']}) | {description}"
+    )
+
+
+class PromptBuilder:
+    """
+    Prompt con presupuesto de tokens
+
+    Las partes se agregan por sección con una prioridad; build() incluye las
+    de menor prioridad primero mientras quepan y escribe las secciones en
+    el orden en que se declararon. Dentro de una sección y prioridad, la
+    primera parte que no cabe corta las siguientes (sin huecos).
+    """
+
+    def __init__(self, kind, max_tokens=None):
+        self.kind = kind
+        self.max_tokens = max_tokens or settings.PROMPT_MAX_TOKENS
+        self._sections = {}  # sección -> (encabezado, pie, [(prioridad, orden, texto)])
+        self._keep_last = set()
+
+    def section(self, name, header='', footer='', keep_last=False):
+        """
+        Declara una sección (se escribe en orden de declaración)
+
+        Args:
+            keep_last: Si faltan tokens conserva las últimas partes (ej. historial)
+                en vez de las primeras (ej. negocios por relevancia)
+        """
+        self._sections[name] = (header, footer, [])
+        if keep_last:
+            self._keep_last.add(name)
+        return self
+
+    def add(self, name, text, priority=PRIORITY_REQUIRED):
+        """Agrega una parte a una sección"""
+        parts = self._sections[name][2]
+        parts.append((priority, len(parts), text))
+        return self
+
+    def build(self) -> str:
+        """Prompt final dentro del presupuesto (las partes obligatorias siempre entran)"""
+        candidates = sorted(
+            (priority, name, -order if name in self._keep_last else order, order, text)
+            for name, (_, _, parts) in self._sections.items()
+            for priority, order, text in parts
+        )
+        used = count_tokens(SYSTEM_PREFIX)
+        included = set()
+        opened = set()
+        cut = set()
+        for priority, name, _, order, text in candidates:
+            if (name, priority) in cut:
+                continue
+            header, footer, _ = self._sections[name]
+            cost = count_tokens(text) + (0 if name in opened else count_tokens(header + footer))
+            if priority != PRIORITY_REQUIRED and used + cost > self.max_tokens:
+                cut.add((name, priority))
+                continue
+            used += cost
+            included.add((name, order))
+            opened.add(name)
+
+        prompt_parts = [SYSTEM_PREFIX]
+        stats = {}
+        for name, (header, footer, parts) in self._sections.items():
+            kept = [text for _, order, text in parts if (name, order) in included]
+            if not kept:
+                continue
+            prompt_parts.append(header)
+            prompt_parts.extend(kept)
+            prompt_parts.append(footer)
+            stats[name] = f'{len(kept)}/{len(parts)}'
+
+        prompt = ''.join(prompt_parts)
+        logger.info(
+            'Prompt %s: %s tokens estimados (máx. %s; partes por sección %s)',
+            self.kind, count_tokens(prompt), self.max_tokens, stats
+        )
+        return prompt
+
+
+def build_chat_prompt(
+    user_message: str,
+    conversation_history: List[Dict] = None,
+    businesses_context: List[Dict] = None,
+    summary: str = '',
+) -> str:
+    """Prompt de chat: negocios relevantes, resumen, historial y mensaje del usuario"""
+    builder = (
+        PromptBuilder('chat')
+        .section('businesses', BUSINESS_HEADER, "\n---\n\n")
+        .section('summary', "Resumen de la conversación anterior:\n", "\n")
+        .section('history', "Historial de conversación:\n", "\n", keep_last=True)
+        .section('message')
+    )
+
+    for i, business in enumerate(businesses_context or []):
+        line = business.get('context_line') or business_line(business)
+        priority = PRIORITY_TOP_BUSINESSES if i < TOP_BUSINESSES else PRIORITY_BUSINESSES
+        builder.add('businesses', f"{i + 1}. {line}\n", priority)
+
+    if summary:
+        builder.add('summary', f"{summary}\n", PRIORITY_SUMMARY)
+
+    history = conversation_history or []
+    for i, msg in enumerate(history):
+        role = "Usuario" if msg["role"] == "user" else "RutaGO"
+        priority = PRIORITY_LAST_EXCHANGE if i >= len(history) - 2 else PRIORITY_HISTORY
+        builder.add('history', f"{role}: {msg['content']}\n", priority)
+
+    # El mensaje es obligatorio: se recorta para que el presupuesto sea un tope real
+    # (las vistas ya rechazan mensajes más largos)
+    message = str(user_message)[:settings.CHAT_MESSAGE_MAX_CHARS]
+    builder.add('message', f"Usuario: {message}\nRutaGO:")
+    return builder.build()
+
+
+def build_route_prompt(stops: List[Dict], preferences_text: str, total_duration: int, visit_duration: int) -> str:
+    """
+    Prompt para narrar un itinerario ya definido (todas las paradas son obligatorias)
+
+    Args:
+        stops: Datos de cada parada (safe_business_data) con 'travel_time_from_previous'
+    """
+    builder = (
+        PromptBuilder('suggest_route')
+        .section('stops', "RUTA YA DEFINIDA (en este orden de visita):\n")
+        .section('instructions')
+    )
+    for i, stop in enumerate(stops, 1):
+        line = stop.get('context_line') or business_line(stop)
+        walk = f" | caminata desde la anterior: {stop['travel_time_from_previous']} min" if i > 1 else ''
+        builder.add('stops', f"{i}. {line}{walk}\n")
+
+    builder.add('instructions', f"""
+Como RutaGO, presenta esta ruta turística por Santiago:
+
+Preferencias del usuario:
+{preferences_text}
+
+Duración total estimada: {total_duration} minutos ({visit_duration} min por lugar)
+
+Proporciona:
+1. Un nombre atractivo para la ruta
+2. Breve descripción de por qué es especial cada lugar
+3. Tips útiles (transporte, mejor horario, etc.)
+
+IMPORTANTE: NO cambies el orden, NO agregues ni quites lugares.
+Formato claro y fácil de seguir.
+""")
+    return builder.build()
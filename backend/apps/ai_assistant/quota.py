@@ -0,0 +1,252 @@
+"""
+Cuota de la API de Gemini (token buckets compartidos entre workers)
+
+El tier gratuito limita requests por minuto, requests por día y tokens por
+día. Cada límite es un token bucket que se rellena de forma continua
+(capacidad / período); una llamada a Gemini descuenta 1 request de los
+buckets de requests y los tokens estimados del prompt más la respuesta del
+bucket de tokens, todo o nada.
+
+Si la cuota alcanza en poco tiempo (GEMINI_QUOTA['max_wait'] segundos) la
+llamada espera; si no, falla de inmediato con QuotaExceededError (503 con
+Retry-After) en vez de gastar un request que Gemini rechazaría.
+
+Con Redis (caché 'default' con django_redis) los buckets viven en Redis y se
+actualizan con un script Lua atómico, así que la cuota se comparte entre
+todos los workers. Sin Redis se usa la caché local con un lock del proceso.
+
+Uso:
+    estimated = quota.acquire(quota.estimate_tokens(prompt))
+    response = model.generate_content(prompt)
+    quota.settle(estimated, actual_tokens)
+"""
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from core.executor import ServiceUnavailableError
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = 'gemini_quota:'
+
+# Caracteres por token (aproximación para texto en español)
+CHARS_PER_TOKEN = 4
+
+# Descuenta de todos los buckets o de ninguno.
+# KEYS: un key por bucket. ARGV: force y luego (capacidad, tasa/s, costo) por bucket.
+# Retorna 0 si descontó, -1 si el costo supera la capacidad o los segundos
+# de espera (como string) hasta que alcance.
+TAKE_SCRIPT = """
+local now = redis.call('TIME')
+now = tonumber(now[1]) + tonumber(now[2]) / 1000000
+local force = ARGV[1] == '1'
+local levels = {}
+local wait = 0
+for i, key in ipairs(KEYS) do
+    local base = 1 + (i - 1) * 3
+    local capacity = tonumber(ARGV[base + 1])
+    local rate = tonumber(ARGV[base + 2])
+    local cost = tonumber(ARGV[base + 3])
+    local state = redis.call('HMGET', key, 'level', 'at')
+    local level = tonumber(state[1]) or capacity
+    local at = tonumber(state[2]) or now
+    level = math.min(capacity, level + math.max(0, now - at) * rate)
+    levels[i] = level - cost
+    if not force then
+        if cost > capacity then
+            return -1
+        end
+        if level < cost then
+            wait = math.max(wait, (cost - level) / rate)
+        end
+    end
+end
+if wait > 0 then
+    return tostring(wait)
+end
+for i, key in ipairs(KEYS) do
+    local base = 1 + (i - 1) * 3
+    local capacity = tonumber(ARGV[base + 1])
+    local rate = tonumber(ARGV[base + 2])
+    redis.call('HSET', key, 'level', tostring(levels[i]), 'at', tostring(now))
+    redis.call('EXPIRE', key, math.ceil(capacity / rate) + 60)
+end
+return 0
+"""
+
+
+class QuotaExceededError(ServiceUnavailableError):
+    """La cuota de Gemini no alcanza para la llamada en el tiempo de espera permitido"""
+    default_detail = 'El asistente alcanzó su límite de uso. Intenta de nuevo en unos segundos.'
+    default_code = 'quota_exceeded'
+
+
+def count_tokens(text):
+    """Tokens estimados de un texto (estimador único del asistente, redondea hacia arriba)"""
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+
+def estimate_tokens(prompt):
+    """Tokens estimados de una llamada: prompt más la respuesta esperada"""
+    return count_tokens(prompt) + settings.GEMINI_QUOTA['output_tokens']
+
+
+def _buckets(requests, tokens):
+    """(nombre, capacidad, tasa por segundo, costo) de cada bucket configurado"""
+    config = settings.GEMINI_QUOTA
+    buckets = [
+        ('requests_per_minute', config['requests_per_minute'], 60, requests),
+        ('requests_per_day', config['requests_per_day'], 86400, requests),
+        ('tokens_per_day', config['tokens_per_day'], 86400, tokens),
+    ]
+    return [
+        (name, capacity, capacity / period, cost)
+        for name, capacity, period, cost in buckets
+        if capacity  # 0 desactiva el límite
+    ]
+
+
+class LocalBucketStore:
+    """Buckets en la caché local del proceso (desarrollo o sin Redis)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+
+    def take(self, buckets, force=False):
+        with self._lock:
+            now = time.time()
+            keys = [f'{KEY_PREFIX}{name}' for name, _, _, _ in buckets]
+            states = cache.get_many(keys)
+            levels = []
+            wait = 0
+            for key, (_, capacity, rate, cost) in zip(keys, buckets):
+                level, at = states.get(key, (capacity, now))
+                level = min(capacity, level + max(0, now - at) * rate)
+                levels.append(level - cost)
+                if not force:
+                    if cost > capacity:
+                        return None
+                    if level < cost:
+                        wait = max(wait, (cost - level) / rate)
+            if wait:
+                return wait
+            cache.set_many({
+                key: (level, now)
+                for key, level in zip(keys, levels)
+            }, None)
+            return 0
+
+    def levels(self, buckets):
+        now = time.time()
+        keys = [f'{KEY_PREFIX}{name}' for name, _, _, _ in buckets]
+        states = cache.get_many(keys)
+        result = {}
+        for key, (name, capacity, rate, _) in zip(keys, buckets):
+            level, at = states.get(key, (capacity, now))
+            result[name] = min(capacity, level + max(0, now - at) * rate)
+        return result
+
+
+class RedisBucketStore:
+    """Buckets en Redis, actualizados por un script Lua atómico"""
+
+    def __init__(self):
+        from django_redis import get_redis_connection
+
+        self._client = get_redis_connection('default')
+        self._script = self._client.register_script(TAKE_SCRIPT)
+
+    def take(self, buckets, force=False):
+        args = ['1' if force else '0']
+        for _, capacity, rate, cost in buckets:
+            args += [capacity, rate, cost]
+        result = float(self._script(keys=[f'{KEY_PREFIX}{name}' for name, _, _, _ in buckets], args=args))
+        return None if result < 0 else result
+
+    def levels(self, buckets):
+        now = time.time()
+        result = {}
+        for name, capacity, rate, _ in buckets:
+            level, at = self._client.hmget(f'{KEY_PREFIX}{name}', 'level', 'at')
+            if level is None:
+                result[name] = capacity
+            else:
+                result[name] = min(capacity, float(level) + max(0, now - float(at)) * rate)
+        return result
+
+
+_store = None
+
+
+def _get_store():
+    """Store de buckets según la caché 'default' (uno por proceso)"""
+    global _store
+    if _store is None:
+        if 'django_redis' in settings.CACHES['default']['BACKEND']:
+            _store = RedisBucketStore()
+        else:
+            _store = LocalBucketStore()
+    return _store
+
+
+def acquire(tokens, max_wait=None):
+    """
+    Reserva cuota para una llamada a Gemini, esperando si alcanza pronto
+
+    Args:
+        tokens: Tokens estimados (estimate_tokens)
+        max_wait: Segundos máximos de espera (default: GEMINI_QUOTA['max_wait'])
+
+    Returns:
+        Tokens reservados (para settle)
+
+    Raises:
+        QuotaExceededError: Si la cuota no alcanza dentro de max_wait
+    """
+    if max_wait is None:
+        max_wait = settings.GEMINI_QUOTA['max_wait']
+    buckets = _buckets(1, tokens)
+    if not buckets:
+        return tokens
+
+    started = time.monotonic()
+    waited = False
+    while True:
+        wait = _get_store().take(buckets)
+        if wait == 0:
+            break
+        remaining = max_wait - (time.monotonic() - started)
+        if wait is None or wait > remaining:
+            metrics.increment('gemini_quota.shed')
+            retry_after = None if wait is None else max(1, int(wait + 1))
+            logger.warning('Cuota de Gemini agotada: llamada rechazada (disponible en %s s)', retry_after)
+            raise QuotaExceededError(retry_after=retry_after)
+        waited = True
+        time.sleep(wait)
+
+    metrics.increment('gemini_quota.granted')
+    if waited:
+        metrics.increment('gemini_quota.queued')
+        metrics.observe('gemini_quota.wait', (time.monotonic() - started) * 1000)
+    return tokens
+
+
+def settle(estimated, actual):
+    """Ajusta el bucket de tokens con los tokens reales de una llamada ya hecha"""
+    if actual is None or actual == estimated:
+        return
+    buckets = [bucket for bucket in _buckets(0, actual - estimated) if bucket[0] == 'tokens_per_day']
+    if buckets:
+        # Forzado: una respuesta más larga que lo estimado deja el bucket en deuda
+        _get_store().take(buckets, force=True)
+
+
+def remaining():
+    """Cuota disponible ahora en cada bucket (redondeada)"""
+    buckets = _buckets(0, 0)
+    return {name: int(level) for name, level in _get_store().levels(buckets).items()}
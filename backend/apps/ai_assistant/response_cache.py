@@ -0,0 +1,79 @@
+"""
+Caché de respuestas de Gemini
+
+Las aperturas repetidas ("¿Qué hacer en Bellavista?") no deben gastar cuota
+(15 RPM) ni segundos de latencia. La clave es un hash de:
+- el mensaje normalizado (minúsculas, sin tildes, sin signos ni espacios extra),
+- los últimos mensajes del historial que entran al prompt,
+- la versión del catálogo de negocios, que cambia cuando cambia el contexto
+  de negocios que se inyecta al prompt.
+
+Usa la caché 'llm' (TTL LLM_CACHE_TIMEOUT; LRU en memoria o Redis). Solo se
+guardan respuestas exitosas del modelo, nunca los mensajes de error.
+"""
+import hashlib
+import json
+import re
+
+from django.core.cache import caches
+
+from apps.businesses.catalog import get_catalog_version
+from core.utils import fold_accents
+from . import metrics
+
+# Mensajes del historial enviado por el cliente que entran al prompt (ver GeminiService.prepare_chat)
+HISTORY_SIZE = 5
+
+NON_WORD_RE = re.compile(r'[^\w]+')
+
+
+def normalize_message(text):
+    """Texto comparable: minúsculas, sin tildes, solo palabras separadas por un espacio"""
+    return NON_WORD_RE.sub(' ', fold_accents(str(text or ''))).strip()
+
+
+def _key(kind, payload):
+    raw = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+    return f'{kind}:{hashlib.sha256(raw.encode()).hexdigest()}'
+
+
+def chat_key(message, conversation_history=None, summary=''):
+    """Clave de una respuesta de chat (historial y resumen tal como entran al prompt)"""
+    history = [
+        (msg.get('role'), normalize_message(msg.get('content')))
+        for msg in (conversation_history or [])
+        if isinstance(msg, dict)
+    ]
+    return _key('chat', {
+        'message': normalize_message(message),
+        'history': history,
+        'summary': normalize_message(summary),
+        'catalog': get_catalog_version(),
+    })
+
+
+def suggest_route_key(preferences, business_ids):
+    """Clave de la narración de un itinerario"""
+    return _key('suggest_route', {
+        'preferences': preferences,
+        'stops': list(business_ids),
+        'catalog': get_catalog_version(),
+    })
+
+
+def get(key):
+    """Respuesta guardada (None si no hay) y registra acierto o fallo"""
+    kind = key.split(':', 1)[0]
+    response = caches['llm'].get(key)
+    metrics.increment(f'response_cache.{kind}.{"hits" if response is not None else "misses"}')
+    return response
+
+
+def peek(key):
+    """Respuesta guardada (None si no hay), sin registrar métricas"""
+    return caches['llm'].get(key)
+
+
+def store(key, response):
+    """Guarda una respuesta exitosa del modelo"""
+    caches['llm'].set(key, response)
@@ -0,0 +1,339 @@
+"""
+Índice BM25 en memoria para el contexto de negocios del asistente
+
+Indexa nombre, descripciones, barrio, comuna, categoría, tags y
+características de los negocios publicados, con pesos por campo, tildes
+plegadas (core.utils.fold_accents) y un stemming liviano para español
+(plurales, género y algunos sufijos derivativos).
+
+Cada documento guarda también los datos públicos del negocio que se envían
+al modelo, de modo que una consulta no toca la base de datos.
+
+relevant_businesses() combina este índice con la búsqueda semántica.
+
+El índice se actualiza cuando cambia la versión del catálogo
+(apps/businesses/catalog.py): se compara el updated_at de cada negocio
+publicado y solo se reindexan los nuevos o modificados y se quitan los que
+dejaron de estar publicados. rank_score, rating y review_count se escriben
+en bloque sin tocar updated_at, así que en cada versión se releen para todos
+los documentos en la misma consulta y se corrigen los que cambiaron.
+"""
+import heapq
+import logging
+import math
+import re
+import threading
+from collections import Counter
+from dataclasses import dataclass
+from typing import Dict, List
+
+from apps.businesses.catalog import get_catalog_version
+from core.utils import SPANISH_STOPWORDS, fold_accents
+from .prompting import business_line
+
+logger = logging.getLogger(__name__)
+
+# Parámetros de BM25
+K1 = 1.2
+B = 0.75
+
+# Constante de Reciprocal Rank Fusion entre BM25 y búsqueda semántica
+RRF_K = 60
+
+# Repeticiones de los términos de cada campo (peso por campo)
+FIELD_WEIGHTS = {
+    'name': 3,
+    'category': 2,
+    'subcategory': 2,
+    'tags': 2,
+    'features': 2,
+    'neighborhood': 2,
+    'comuna': 2,
+    'short_description': 1,
+    'description': 1,
+}
+
+# Palabras que llevan a una categoría aunque no aparezcan en los negocios
+CATEGORY_KEYWORDS = {
+    'comida': ['comida', 'restaurant', 'comer', 'almuerzo', 'almorzar', 'cena', 'cenar', 'desayuno', 'café', 'cafetería'],
+    'turismo': ['turismo', 'visitar', 'museo', 'atracción', 'tour', 'paseo'],
+    'hospedaje': ['hotel', 'hospedaje', 'dormir', 'hostal', 'alojamiento'],
+}
+
+# Sufijos derivativos (sobre texto ya plegado), del más largo al más corto
+SUFFIXES = (
+    'amientos', 'imientos', 'amiento', 'imiento', 'aciones', 'uciones',
+    'acion', 'ucion', 'mente', 'idades', 'idad', 'ismos', 'ismo',
+)
+
+TOKEN_RE = re.compile(r'[a-z0-9ñ]+')
+
+VOWELS = 'aeiou'
+
+
+def stem(word):
+    """Stemming liviano para español sobre una palabra ya plegada"""
+    for suffix in SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            return word[:-len(suffix)]
+    # Plurales: luces -> luz, bares -> bar, vinos -> vino
+    if word.endswith('ces') and len(word) > 4:
+        word = word[:-3] + 'z'
+    elif word.endswith('es') and len(word) > 4 and word[-3] not in VOWELS:
+        word = word[:-2]
+    elif word.endswith('s') and len(word) > 3:
+        word = word[:-1]
+    # Género: empanada/empanado, rica/rico
+    if len(word) > 3 and word[-1] in 'aeo':
+        word = word[:-1]
+    return word
+
+
+def tokenize(text):
+    """Términos de un texto: tildes plegadas, sin stopwords y con stemming"""
+    return [
+        stem(token)
+        for token in TOKEN_RE.findall(fold_accents(text))
+        if token not in SPANISH_STOPWORDS and len(token) > 1
+    ]
+
+
+def safe_business_data(business):
+    """Extrae solo datos seguros y públicos de un negocio"""
+    return {
+        'name': business.name,
+        'category': business.category.name,
+        'description': business.short_description,
+        'neighborhood': business.neighborhood,
+        'comuna': business.comuna,
+        'address': business.address,
+        'price_range': '$' * business.price_range,
+        'rating': float(business.rating),
+        'review_count': business.review_count,
+        'verified': business.verified,
+        # NO incluir: email, phone, owner, coordinates exactas
+    }
+
+
+def _category_expansions():
+    """Término de búsqueda -> términos de la categoría a agregar a la consulta"""
+    expansions = {}
+    for slug, keywords in CATEGORY_KEYWORDS.items():
+        for keyword in keywords:
+            for term in tokenize(keyword):
+                expansions.setdefault(term, []).extend(tokenize(slug))
+    return expansions
+
+
+@dataclass
+class SearchHit:
+    """
+    Resultado de una búsqueda
+
+    Attributes:
+        business_id: ID del negocio
+        score: Puntaje BM25 (0 en el respaldo por ranking)
+        data: Datos públicos del negocio (safe_business_data y context_line)
+    """
+    business_id: str
+    score: float
+    data: Dict
+
+
+class BusinessSearchIndex:
+    """Índice invertido BM25 de negocios publicados, actualizado por versión de catálogo"""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._version = None
+        self._updated_at = {}  # id -> updated_at indexado
+        self._documents = {}  # id -> (términos, largo, rank_score, datos)
+        self._postings = {}  # término -> {id: frecuencia}
+        self._total_length = 0
+        self._norms = {}  # id -> normalización por largo de BM25
+        self._by_rank = []
+        self._expansions = _category_expansions()
+
+    def _ensure_current(self):
+        version = get_catalog_version()
+        if version == self._version:
+            return
+        with self._lock:
+            if version != self._version:
+                self._refresh()
+                self._version = version
+
+    def _refresh(self):
+        from apps.businesses.models import Business
+
+        published = Business.objects.filter(is_active=True, status='published')
+        current = {}
+        ranking = {}  # id -> (rank_score, rating, review_count)
+        for pk, updated_at, rank_score, rating, review_count in published.values_list(
+            'id', 'updated_at', 'rank_score', 'rating', 'review_count'
+        ):
+            current[str(pk)] = updated_at
+            ranking[str(pk)] = (rank_score, float(rating), review_count)
+
+        removed = [pk for pk in self._updated_at if pk not in current]
+        changed = [pk for pk, updated_at in current.items() if self._updated_at.get(pk) != updated_at]
+
+        for pk in removed:
+            self._remove(pk)
+            del self._updated_at[pk]
+
+        # En la primera construcción se leen todos sin una lista enorme de IDs
+        businesses = published if len(changed) == len(current) else published.filter(id__in=changed)
+        businesses = (
+            businesses
+            .select_related('category')
+            .prefetch_related('tags', 'features')
+        )
+        for business in businesses.iterator(chunk_size=500):
+            pk = str(business.pk)
+            if pk not in current:
+                # Publicado entre las dos consultas: entra en la próxima versión
+                continue
+            self._remove(pk)
+            self._add(pk, business)
+            self._updated_at[pk] = current[pk]
+
+        # Ranking y reseñas de los documentos que no se reindexaron
+        refreshed = 0
+        for pk, (rank_score, rating, review_count) in ranking.items():
+            document = self._documents.get(pk)
+            if document is None:
+                continue
+            terms, length, indexed_score, data = document
+            if (indexed_score, data['rating'], data['review_count']) == (rank_score, rating, review_count):
+                continue
+            data = {**data, 'rating': rating, 'review_count': review_count}
+            data['context_line'] = business_line(data)
+            self._documents[pk] = (terms, length, rank_score, data)
+            refreshed += 1
+
+        self._by_rank = sorted(self._documents, key=lambda pk: -self._documents[pk][2])
+        if self._documents:
+            average_length = self._total_length / len(self._documents)
+            self._norms = {
+                pk: K1 * (1 - B + B * document[1] / average_length)
+                for pk, document in self._documents.items()
+            }
+        logger.info(
+            'Índice BM25 de negocios: %s reindexados, %s con ranking actualizado, %s eliminados, %s en total',
+            len(changed), refreshed, len(removed), len(self._documents)
+        )
+
+    def _add(self, pk, business):
+        fields = {
+            'name': business.name,
+            'category': f'{business.category.name} {business.category.slug}',
+            'subcategory': business.subcategory,
+            'tags': ' '.join(tag.name for tag in business.tags.all()),
+            'features': ' '.join(feature.name for feature in business.features.all()),
+            'neighborhood': business.neighborhood,
+            'comuna': business.comuna,
+            'short_description': business.short_description,
+            'description': business.description,
+        }
+        terms = Counter()
+        for field, text in fields.items():
+            for term in tokenize(text):
+                terms[term] += FIELD_WEIGHTS[field]
+
+        length = sum(terms.values())
+        data = safe_business_data(business)
+        # Línea del prompt precalculada (se recalcula al reindexar el negocio)
+        data['context_line'] = business_line(data)
+        self._documents[pk] = (terms, length, business.rank_score, data)
+        self._total_length += length
+        for term, frequency in terms.items():
+            self._postings.setdefault(term, {})[pk] = frequency
+
+    def _remove(self, pk):
+        document = self._documents.pop(pk, None)
+        if document is None:
+            return
+        terms, length = document[0], document[1]
+        self._total_length -= length
+        for term in terms:
+            postings = self._postings[term]
+            del postings[pk]
+            if not postings:
+                del self._postings[term]
+
+    def search(self, query, limit=10) -> List[SearchHit]:
+        """
+        Negocios más relevantes para un mensaje
+
+        Sin términos que coincidan retorna los mejores por rank_score.
+
+        Args:
+            query: Mensaje del usuario
+            limit: Máximo de resultados
+
+        Returns:
+            Lista de SearchHit ordenada por relevancia
+        """
+        self._ensure_current()
+        with self._lock:
+            terms = tokenize(query)
+            terms += [extra for term in terms for extra in self._expansions.get(term, [])]
+
+            documents = self._documents
+            count = len(documents)
+            norms = self._norms
+            scores = {}
+            for term in set(terms):
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                weight = (K1 + 1) * math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+                for pk, frequency in postings.items():
+                    scores[pk] = scores.get(pk, 0) + weight * frequency / (frequency + norms[pk])
+
+            if scores:
+                # Empates por rank_score
+                best = heapq.nlargest(limit, scores, key=lambda pk: (scores[pk], documents[pk][2]))
+                return [SearchHit(pk, round(scores[pk], 4), documents[pk][3]) for pk in best]
+            return [SearchHit(pk, 0, documents[pk][3]) for pk in self._by_rank[:limit]]
+
+    def get_data(self, pk):
+        """Datos públicos de un negocio indexado (None si no está publicado)"""
+        self._ensure_current()
+        document = self._documents.get(pk)
+        return document[3] if document else None
+
+
+# Instancia compartida por proceso
+business_index = BusinessSearchIndex()
+
+
+def relevant_businesses(query, limit=10) -> List[Dict]:
+    """
+    Datos públicos de los negocios más relevantes para un mensaje
+
+    Fusiona por Reciprocal Rank Fusion los resultados de BM25 (palabras) y de
+    la búsqueda semántica (apps/businesses/services/semantic_search.py); sin
+    coincidencias en ninguno retorna los mejores por rank_score.
+    """
+    from apps.businesses.services.semantic_search import semantic_index
+
+    keyword_hits = [hit for hit in business_index.search(query, limit=limit * 2) if hit.score > 0]
+    semantic_hits = semantic_index.search(query, limit=limit * 2)
+    if not keyword_hits and not semantic_hits:
+        return [hit.data for hit in business_index.search(query, limit=limit)]
+
+    fused = {}
+    for hits in ([hit.business_id for hit in keyword_hits], [hit.business_id for hit in semantic_hits]):
+        for rank, pk in enumerate(hits, 1):
+            fused[pk] = fused.get(pk, 0) + 1 / (RRF_K + rank)
+
+    results = []
+    for pk in sorted(fused, key=fused.get, reverse=True):
+        data = business_index.get_data(pk)
+        if data is not None:
+            results.append(data)
+        if len(results) >= limit:
+            break
+    return results
@@ -2,11 +2,96 @@
 Servicio de integración con Google Gemini AI para RutaGO
 """
 import os
+import re
 import json
 import google.generativeai as genai
 from django.conf import settings
-from apps.businesses.models import Business, Category
-from apps.routes.models import Route
+from apps.businesses.models import Business
+from apps.routes.services.discovery import discover_routes
+from apps.routes.services.itinerary import generate_itinerary, ItineraryError
+from core.executor import ServiceUnavailableError, call_external
+from . import quota, response_cache
+from .prompting import SYSTEM_CONTEXT, build_chat_prompt, build_route_prompt
+from .retrieval import business_index, relevant_businesses, safe_business_data
+from .sessions import record_turn
+from .single_flight import single_flight
+
+
+# Presupuesto de las preferencias -> rango de precio máximo
+BUDGET_PRICE_RANGES = {
+    'bajo': 1,
+    'economico': 1,
+    'económico': 1,
+    'medio': 2,
+    'alto': 4,
+}
+
+
+def _parse_duration(value):
+    """
+    Minutos desde un entero o textos como '4 horas', '1.5 h', '90 min' o '1 día'
+
+    Un día equivale a ITINERARY_DAY_MINUTES (horas de recorrido, no 24 h).
+
+    Raises:
+        ItineraryError: Si el texto no tiene una duración reconocible o supera
+            ITINERARY_MAX_TIME_BUDGET
+    """
+    minutes = _duration_minutes(value)
+    if not 0 < minutes <= settings.ITINERARY_MAX_TIME_BUDGET:
+        raise ItineraryError(f'La duración debe estar entre 1 y {settings.ITINERARY_MAX_TIME_BUDGET} minutos')
+    return minutes
+
+
+def _duration_minutes(value):
+    """Minutos sin validar el rango (ver _parse_duration)"""
+    if isinstance(value, (int, float)):
+        return int(value)
+    text = str(value).lower().replace(',', '.')
+    days = re.search(r'(\d+(?:\.\d+)?)\s*d[ií]a', text)
+    hours = re.search(r'(\d+(?:\.\d+)?)\s*h', text)
+    minutes = re.search(r'(\d+)\s*min', text)
+    if not days and not hours and not minutes:
+        if text.strip().isdigit():
+            return int(text)
+        raise ItineraryError(f'Duración inválida: "{value}" (usa minutos, horas o días)')
+    return (
+        int(float(days.group(1)) * settings.ITINERARY_DAY_MINUTES if days else 0)
+        + int(float(hours.group(1)) * 60 if hours else 0)
+        + int(minutes.group(1) if minutes else 0)
+    )
+
+
+def itinerary_from_preferences(preferences: dict):
+    """
+    Genera el itinerario local a partir de las preferencias de suggest-route
+
+    Preferencias reconocidas: categories, budget ('bajo'|'medio'|'alto' o 1-4),
+    duration (minutos o texto), start ({latitude, longitude}) y max_stops.
+
+    Raises:
+        ItineraryError: Si las preferencias son inválidas o no hay itinerario posible
+    """
+    budget = preferences.get('budget')
+    max_price = BUDGET_PRICE_RANGES.get(str(budget).lower()) if isinstance(budget, str) else budget
+
+    start = preferences.get('start')
+    try:
+        if start:
+            start = (float(start['latitude']), float(start['longitude']))
+        max_stops = int(preferences['max_stops']) if preferences.get('max_stops') else None
+        if max_price is not None:
+            max_price = int(max_price)
+    except (KeyError, TypeError, ValueError):
+        raise ItineraryError('Preferencias inválidas: revisa start, budget y max_stops')
+
+    return generate_itinerary(
+        categories=preferences.get('categories') or None,
+        max_price=max_price,
+        time_budget=_parse_duration(preferences['duration']) if preferences.get('duration') else None,
+        start=start,
+        max_stops=max_stops,
+    )
 
 
 class GeminiService:
@@ -14,6 +99,17 @@ class GeminiService:
 
     def __init__(self):
         """Inicializa el servicio de Gemini"""
+        if settings.AI_ASSISTANT_FAKE_MODEL:
+            from .fake_model import FakeGenerativeModel
+            self.model = FakeGenerativeModel()
+        else:
+            self.model = self._load_model()
+
+        # Contexto del sistema para RutaGO (prefijo fijo de todos los prompts)
+        self.system_context = SYSTEM_CONTEXT
+
+    def _load_model(self):
+        """Configura la API key y carga el modelo de Gemini"""
         import os
         
         api_key = os.getenv('GEMINI_API_KEY')
@@ -37,106 +133,25 @@ class GeminiService:
         # Disponible en el tier gratuito de Google AI Studio
         # Límites: 15 RPM, 1M tokens/día, 1500 RPD
         try:
-            self.model = genai.GenerativeModel('gemini-flash-latest')
+            model = genai.GenerativeModel('gemini-flash-latest')
             print(f"✅ Modelo gemini-flash-latest cargado correctamente")
         except Exception as e:
             print(f"❌ Error al cargar modelo: {str(e)}")
             raise
 
-        # Contexto del sistema para RutaGO
-        self.system_context = """
-Eres RutaGO, un asistente de inteligencia artificial experto en turismo y emprendimientos locales de Santiago, Chile.
-
-Tu misión es ayudar a los usuarios a:
-1. Descubrir negocios locales auténticos en Santiago
-2. Crear rutas personalizadas de turismo basadas en negocios reales de nuestra base de datos
-3. Recomendar experiencias basadas en sus preferencias
-4. Proporcionar información cultural e histórica de Santiago
-5. Sugerir actividades según categorías: gastronomía, hospedaje, turismo
-
-Características de tu personalidad:
-- Amigable y entusiasta sobre Santiago
-- Conocedor de la cultura local chilena
-- Proactivo en hacer sugerencias
-- Conciso pero informativo
-- Usa lenguaje casual chileno cuando sea apropiado
-
-Cuando respondas:
-- Sé breve y directo (máximo 3-4 párrafos)
-- Usa emojis ocasionalmente para darle vida
-- Menciona negocios específicos cuando sea relevante usando datos reales
-- Ofrece opciones y alternativas
-- Pregunta por preferencias si necesitas más información
-
-IMPORTANTE - Reglas de Seguridad:
-- NUNCA menciones emails, teléfonos o datos de contacto personales de negocios o usuarios
-- NUNCA reveles información privada o sensible de la base de datos
-- Solo menciona información pública: nombres de negocios, direcciones, categorías, descripciones, ratings
-- Si te piden información sensible, responde educadamente que no puedes proporcionar ese tipo de datos
-
-Cuando sugier as rutas:
-- Usa negocios reales que te proporciono en el contexto
-- Considera ubicaciones geográficas para crear rutas lógicas
-- Ten en cuenta ratings y categorías para mejores recomendaciones
-- Propón rutas de 3-5 lugares ordenados geográficamente
-
-Recuerda: Estás aquí para hacer que la experiencia de descubrir Santiago sea memorable y auténtica usando información real de negocios locales.
-"""
+        return model
 
     def _get_safe_business_data(self, business):
         """Extrae solo datos seguros y públicos de un negocio"""
-        return {
-            'name': business.name,
-            'category': business.category.name,
-            'description': business.short_description,
-            'neighborhood': business.neighborhood,
-            'comuna': business.comuna,
-            'address': business.address,
-            'price_range': '$' * business.price_range,
-            'rating': float(business.rating),
-            'review_count': business.review_count,
-            'verified': business.verified,
-            # NO incluir: email, phone, owner, coordinates exactas
-        }
+        return safe_business_data(business)
 
     def _fetch_relevant_businesses(self, user_message: str, limit=10):
-        """Busca negocios relevantes basados en el mensaje del usuario"""
-        # Palabras clave para categorías
-        category_keywords = {
-            'comida': ['comida', 'restaurant', 'comer', 'almuerzo', 'cena', 'café', 'cafetería'],
-            'turismo': ['turismo', 'visitar', 'museo', 'atracción', 'tour', 'paseo'],
-            'hospedaje': ['hotel', 'hospedaje', 'dormir', 'hostal', 'alojamiento'],
-        }
-
-        # Detectar categoría en el mensaje
-        message_lower = user_message.lower()
-        matched_categories = []
-
-        for category, keywords in category_keywords.items():
-            if any(keyword in message_lower for keyword in keywords):
-                matched_categories.append(category)
-
-        # Buscar negocios
-        businesses = Business.objects.filter(is_active=True)
-
-        # Filtrar por categorías si se detectaron
-        if matched_categories:
-            categories = Category.objects.filter(slug__in=matched_categories)
-            if categories.exists():
-                businesses = businesses.filter(category__in=categories)
-
-        # Ordenar por rating y limitar resultados
-        businesses = businesses.order_by('-rating', '-review_count')[:limit]
-
-        # Retornar datos seguros
-        return [self._get_safe_business_data(b) for b in businesses]
+        """Busca negocios relevantes para el mensaje (BM25 + búsqueda semántica)"""
+        return relevant_businesses(user_message, limit=limit)
 
     def _fetch_public_routes(self, limit=5):
-        """Obtiene rutas públicas destacadas"""
-        routes = Route.objects.filter(
-            is_public=True,
-            is_featured=True
-        ).order_by('-created_at')[:limit]
+        """Obtiene las rutas públicas mejor rankeadas del feed de descubrimiento"""
+        routes, _ = discover_routes(limit=limit)
 
         routes_data = []
         for route in routes:
@@ -151,150 +166,174 @@ Recuerda: Estás aquí para hacer que la experiencia de descubrir Santiago sea m
 
         return routes_data
 
-    def generate_response(self, user_message: str, conversation_history: list = None) -> str:
+    def prepare_chat(self, user_message: str, conversation_history: list = None, session=None):
+        """
+        Prepara una respuesta de chat: clave de caché, respuesta cacheada o prompt
+
+        Con sesión, el historial y el resumen salen de la sesión (ya acotados
+        por su presupuesto de tokens); sin sesión, de los últimos mensajes del
+        historial enviado por el cliente.
+
+        Returns:
+            tuple: (cache_key, respuesta cacheada o None, prompt o None)
+        """
+        if session is not None:
+            conversation_history, summary = session.turns, session.summary
+        else:
+            conversation_history, summary = (conversation_history or [])[-response_cache.HISTORY_SIZE:], ''
+
+        # Respuesta ya generada para el mismo mensaje, historial y catálogo
+        cache_key = response_cache.chat_key(user_message, conversation_history, summary)
+        cached = response_cache.get(cache_key)
+        if cached is not None:
+            return cache_key, cached, None
+
+        # Obtener contexto de negocios relevantes
+        businesses_context = self._fetch_relevant_businesses(user_message)
+
+        # Construir el prompt completo con contexto e historial
+        full_prompt = self._build_prompt(
+            user_message,
+            conversation_history,
+            businesses_context,
+            summary
+        )
+        return cache_key, None, full_prompt
+
+    def generate_response(self, user_message: str, conversation_history: list = None, session=None) -> str:
         """
         Genera una respuesta usando Gemini basada en el mensaje del usuario
 
         Args:
             user_message: Mensaje del usuario
             conversation_history: Lista de mensajes previos [{"role": "user"|"assistant", "content": "..."}]
+            session: ChatSession (opcional); reemplaza a conversation_history y
+                registra el intercambio si la respuesta se generó bien
 
         Returns:
             str: Respuesta generada por Gemini
         """
         try:
-            # Obtener contexto de negocios relevantes
-            businesses_context = self._fetch_relevant_businesses(user_message)
-
-            # Construir el prompt completo con contexto e historial
-            full_prompt = self._build_prompt(
-                user_message,
-                conversation_history,
-                businesses_context
-            )
-
-            # Generar respuesta
-            response = self.model.generate_content(full_prompt)
-
-            return response.text
+            cache_key, cached, full_prompt = self.prepare_chat(user_message, conversation_history, session)
+            if cached is not None:
+                response_text = cached
+            else:
+                # Peticiones idénticas concurrentes comparten una sola llamada
+                response_text = single_flight.do(
+                    cache_key, lambda: self._generate_and_store(cache_key, full_prompt)
+                )
 
+        except ServiceUnavailableError:
+            raise
         except Exception as e:
-            error_msg = str(e)
-            print(f"❌ Error al generar respuesta con Gemini: {error_msg}")
-            
-            # Log más detallado para debugging
-            import traceback
-            print("📋 Traceback completo:")
-            traceback.print_exc()
-            
-            # Log de la API key (solo primeros caracteres para seguridad)
-            import os
-            api_key = os.getenv('GEMINI_API_KEY')
-            print(f"🔑 API Key configurada: {bool(api_key)}")
-            if api_key:
-                print(f"🔑 API Key preview: {api_key[:15]}...")
-                print(f"🔑 API Key length: {len(api_key)}")
-            
-            # Mensaje de error más específico para el usuario
-            if "API key" in error_msg.lower() or "authentication" in error_msg.lower() or "invalid" in error_msg.lower():
-                return "⚠️ Hay un problema con la configuración de la API key. Por favor, verifica que sea válida en Google AI Studio."
-            elif "quota" in error_msg.lower() or "limit" in error_msg.lower():
-                return "⚠️ El servicio está temporalmente saturado. Por favor, intenta de nuevo en unos minutos."
-            else:
-                return f"Lo siento, tuve un problema al procesar tu mensaje. Error: {error_msg[:100]}"
-
-    def _build_prompt(self, user_message: str, conversation_history: list = None, businesses_context: list = None) -> str:
-        """Construye el prompt completo con contexto e historial"""
-        prompt_parts = [self.system_context, "\n---\n"]
-
-        # Agregar contexto de negocios si existe
-        if businesses_context and len(businesses_context) > 0:
-            prompt_parts.append("NEGOCIOS DISPONIBLES EN SANTIAGO (usa estos datos reales):\n")
-            for i, business in enumerate(businesses_context, 1):
-                prompt_parts.append(f"\n{i}. {business['name']}\n")
-                prompt_parts.append(f"   - Categoría: {business['category']}\n")
-                prompt_parts.append(f"   - Ubicación: {business['address']}, {business['neighborhood']}, {business['comuna']}\n")
-                prompt_parts.append(f"   - Descripción: {business['description']}\n")
-                prompt_parts.append(f"   - Precio: {business['price_range']}\n")
-                prompt_parts.append(f"   - Rating: {business['rating']}/5.0 ({business['review_count']} reseñas)\n")
-                if business['verified']:
-                    prompt_parts.append(f"   - ✓ Negocio verificado\n")
-            prompt_parts.append("\n---\n\n")
-
-        # Agregar historial de conversación si existe
-        if conversation_history:
-            prompt_parts.append("Historial de conversación:\n")
-            for msg in conversation_history[-5:]:  # Solo últimos 5 mensajes
-                role = "Usuario" if msg["role"] == "user" else "RutaGO"
-                prompt_parts.append(f"{role}: {msg['content']}\n")
-            prompt_parts.append("\n")
-
-        # Agregar mensaje actual del usuario
-        prompt_parts.append(f"Usuario: {user_message}\n")
-        prompt_parts.append("RutaGO:")
-
-        return "".join(prompt_parts)
-
-    def suggest_route(self, preferences: dict) -> str:
-        """
-        Sugiere una ruta basada en las preferencias del usuario
+            return self.error_message(e)
 
-        Args:
-            preferences: Dict con preferencias como categorías, duración, presupuesto, etc.
+        if session is not None:
+            record_turn(session, user_message, response_text)
+        return response_text
 
-        Returns:
-            str: Sugerencia de ruta personalizada
+    def _generate(self, prompt: str):
         """
-        # Obtener negocios basados en preferencias
-        businesses = Business.objects.filter(is_active=True)
-
-        # Filtrar por categorías si se especificaron
-        if 'categories' in preferences and preferences['categories']:
-            categories = Category.objects.filter(slug__in=preferences['categories'])
-            if categories.exists():
-                businesses = businesses.filter(category__in=categories)
-
-        # Ordenar por rating
-        businesses = businesses.order_by('-rating', '-review_count')[:10]
-
-        # Convertir a datos seguros
-        businesses_data = [self._get_safe_business_data(b) for b in businesses]
-
-        prompt_parts = [self.system_context, "\n---\n"]
-        prompt_parts.append("NEGOCIOS DISPONIBLES (usa estos para crear la ruta):\n")
+        Llama a Gemini dentro de la cuota y del bulkhead de Gemini
 
-        for i, business in enumerate(businesses_data, 1):
-            prompt_parts.append(f"\n{i}. {business['name']}\n")
-            prompt_parts.append(f"   - Categoría: {business['category']}\n")
-            prompt_parts.append(f"   - Ubicación: {business['address']}, {business['neighborhood']}, {business['comuna']}\n")
-            prompt_parts.append(f"   - Descripción: {business['description']}\n")
-            prompt_parts.append(f"   - Precio: {business['price_range']}\n")
-            prompt_parts.append(f"   - Rating: {business['rating']}/5.0\n")
-
-        prompt_parts.append(f"""
+        Raises:
+            ServiceUnavailableError: Sin cuota (QuotaExceededError) o bulkhead saturado
+        """
+        estimated = quota.acquire(quota.estimate_tokens(prompt))
+        response = call_external('gemini', self.model.generate_content, prompt)
+        usage = getattr(response, 'usage_metadata', None)
+        quota.settle(estimated, getattr(usage, 'total_token_count', None))
+        return response
+
+    def _generate_and_store(self, cache_key: str, prompt: str) -> str:
+        """Genera una respuesta y la guarda en el caché de respuestas"""
+        response = self._generate(prompt)
+        response_cache.store(cache_key, response.text)
+        return response.text
+
+    def stream_chunks(self, full_prompt: str):
+        """
+        Genera la respuesta en streaming
 
-Como RutaGO, crea una ruta turística personalizada para Santiago usando SOLO los negocios listados arriba:
+        Requiere un cupo del bulkhead de Gemini (bulkhead('gemini').acquire())
+        y cuota reservada con quota.acquire().
 
-Preferencias del usuario:
-{self._format_preferences(preferences)}
+        Yields:
+            str: Fragmentos de texto en el orden en que los entrega Gemini
+        """
+        for chunk in self.model.generate_content(full_prompt, stream=True):
+            if chunk.text:
+                yield chunk.text
+
+    def error_message(self, error: Exception) -> str:
+        """Registra un error de Gemini y retorna el mensaje para el usuario"""
+        error_msg = str(error)
+        print(f"❌ Error al generar respuesta con Gemini: {error_msg}")
+        
+        # Log más detallado para debugging
+        import traceback
+        print("📋 Traceback completo:")
+        traceback.print_exc()
+        
+        # Log de la API key (solo primeros caracteres para seguridad)
+        import os
+        api_key = os.getenv('GEMINI_API_KEY')
+        print(f"🔑 API Key configurada: {bool(api_key)}")
+        if api_key:
+            print(f"🔑 API Key preview: {api_key[:15]}...")
+            print(f"🔑 API Key length: {len(api_key)}")
+        
+        # Mensaje de error más específico para el usuario
+        if "API key" in error_msg.lower() or "authentication" in error_msg.lower() or "invalid" in error_msg.lower():
+            return "⚠️ Hay un problema con la configuración de la API key. Por favor, verifica que sea válida en Google AI Studio."
+        elif "quota" in error_msg.lower() or "limit" in error_msg.lower():
+            return "⚠️ El servicio está temporalmente saturado. Por favor, intenta de nuevo en unos minutos."
+        else:
+            return f"Lo siento, tuve un problema al procesar tu mensaje. Error: {error_msg[:100]}"
+
+    def _build_prompt(self, user_message: str, conversation_history: list = None, businesses_context: list = None, summary: str = '') -> str:
+        """Construye el prompt completo con contexto e historial, dentro del presupuesto de tokens"""
+        return build_chat_prompt(user_message, conversation_history, businesses_context, summary)
+
+    def suggest_route(self, preferences: dict, itinerary) -> str:
+        """
+        Narra una ruta ya elegida y ordenada por el generador local de itinerarios
 
-Proporciona:
-1. Un nombre atractivo para la ruta
-2. 3-5 lugares de la lista anterior en orden lógico geográfico
-3. Tiempo estimado en cada lugar
-4. Breve descripción de por qué es especial cada lugar
-5. Tips útiles (transporte, mejor horario, etc.)
+        Args:
+            preferences: Dict con preferencias como categorías, duración, presupuesto, etc.
+            itinerary: Itinerary con las paradas en orden
 
-IMPORTANTE: USA SOLO NEGOCIOS DE LA LISTA PROPORCIONADA.
-Formato claro y fácil de seguir.
-""")
+        Returns:
+            str: Descripción de la ruta personalizada
 
-        try:
-            response = self.model.generate_content("".join(prompt_parts))
-            return response.text
-        except Exception as e:
-            print(f"Error al sugerir ruta: {str(e)}")
-            return "No pude generar una ruta en este momento. Por favor, intenta de nuevo."
+        Raises:
+            Los errores de Gemini (la vista responde con el itinerario sin narración)
+        """
+        cache_key = response_cache.suggest_route_key(preferences, itinerary.business_ids)
+        cached = response_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+        # Datos (con su línea de prompt) desde el índice; la base solo para los que falten
+        stops_data = {business_id: business_index.get_data(business_id) for business_id in itinerary.business_ids}
+        missing = [business_id for business_id, data in stops_data.items() if data is None]
+        if missing:
+            for business in Business.objects.select_related('category').filter(id__in=missing):
+                stops_data[str(business.id)] = self._get_safe_business_data(business)
+
+        stops = [
+            {**stops_data[stop['business_id']], 'travel_time_from_previous': stop['travel_time_from_previous']}
+            for stop in itinerary.to_dict()['stops']
+            if stops_data.get(stop['business_id']) is not None
+        ]
+        prompt = build_route_prompt(
+            stops,
+            self._format_preferences(preferences),
+            itinerary.total_duration,
+            itinerary.visit_duration,
+        )
+
+        return single_flight.do(cache_key, lambda: self._generate_and_store(cache_key, prompt))
 
     def _format_preferences(self, preferences: dict) -> str:
         """Formatea las preferencias del usuario para el prompt"""
@@ -0,0 +1,134 @@
+"""
+Sesiones de chat en el servidor
+
+El cliente envía solo el mensaje y el session_id; el historial vive en
+ChatSession. Cada sesión guarda:
+- turns: los últimos mensajes que caben en CHAT_SESSION['history_tokens']
+  (y como máximo CHAT_SESSION['max_messages']), que van completos al prompt.
+- summary: resumen acumulado de los mensajes que ya salieron de turns, una
+  línea por mensaje con su primera oración, acotado a
+  CHAT_SESSION['summary_tokens'] (se descartan las líneas más antiguas).
+
+El resumen es extractivo y local: no gasta llamadas ni cuota de Gemini.
+Así el prompt de cada turno tiene un tamaño acotado aunque la conversación
+sea larga.
+"""
+import re
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils import timezone
+
+from .models import ChatSession
+from .quota import CHARS_PER_TOKEN, count_tokens
+
+# Largo máximo de una línea del resumen
+SUMMARY_LINE_CHARS = 160
+
+SENTENCE_END_RE = re.compile(r'(?<=[.!?])\s')
+
+
+def _summary_line(message):
+    """Línea de resumen de un mensaje: rol y primera oración"""
+    role = 'Usuario' if message['role'] == 'user' else 'RutaGO'
+    text = ' '.join(message['content'].split())
+    first = SENTENCE_END_RE.split(text, 1)[0]
+    if len(first) > SUMMARY_LINE_CHARS:
+        first = first[:SUMMARY_LINE_CHARS - 1].rstrip() + '…'
+    return f'- {role}: {first}'
+
+
+def _roll_summary(summary, evicted):
+    """Agrega los mensajes que salen de turns al resumen, dentro del presupuesto"""
+    lines = [line for line in summary.split('\n') if line]
+    lines += [_summary_line(message) for message in evicted]
+
+    budget = settings.CHAT_SESSION['summary_tokens']
+    kept = []
+    for line in reversed(lines):
+        budget -= count_tokens(line)
+        if budget < 0:
+            break
+        kept.append(line)
+    return '\n'.join(reversed(kept))
+
+
+def _fit_turns(turns):
+    """
+    Últimos mensajes que caben en el presupuesto de tokens
+
+    Siempre conserva el último intercambio; un mensaje no ocupa más de la
+    mitad del presupuesto (se recorta).
+
+    Returns:
+        tuple: (mensajes conservados, mensajes que salen, del más antiguo al más nuevo)
+    """
+    config = settings.CHAT_SESSION
+    budget = config['history_tokens']
+    max_chars = budget // 2 * CHARS_PER_TOKEN
+    kept = []
+    for message in reversed(turns):
+        if len(message['content']) > max_chars:
+            message = {**message, 'content': message['content'][:max_chars - 1] + '…'}
+        tokens = count_tokens(message['content'])
+        if len(kept) >= config['max_messages'] or (tokens > budget and len(kept) >= 2):
+            break
+        budget -= tokens
+        kept.append(message)
+    kept.reverse()
+    return kept, turns[:len(turns) - len(kept)]
+
+
+def get_session(session_id, user=None):
+    """
+    Sesión vigente con ese id que pertenece al usuario (None si no existe)
+
+    Una sesión anónima la puede continuar cualquiera que conozca su id; una
+    sesión de un usuario, solo ese usuario.
+    """
+    if not session_id:
+        return None
+    try:
+        session = ChatSession.objects.get(pk=session_id)
+    except (ChatSession.DoesNotExist, ValidationError, ValueError):
+        return None
+    expires = timezone.now() - timedelta(days=settings.CHAT_SESSION['ttl_days'])
+    if session.updated_at < expires:
+        return None
+    if session.user_id and (user is None or session.user_id != user.pk):
+        return None
+    return session
+
+
+def get_or_create_session(session_id, user=None):
+    """Sesión vigente con ese id, o una nueva si no existe o expiró"""
+    if user is not None and not user.is_authenticated:
+        user = None
+    session = get_session(session_id, user)
+    if session is None:
+        session = ChatSession.objects.create(user=user)
+    return session
+
+
+def record_turn(session, user_message, assistant_message):
+    """
+    Agrega un intercambio a la sesión y condensa los mensajes que ya no caben
+
+    Returns:
+        ChatSession actualizada
+    """
+    with transaction.atomic():
+        # Turnos concurrentes de la misma sesión no se pisan
+        locked = ChatSession.objects.select_for_update().get(pk=session.pk)
+        turns, evicted = _fit_turns(locked.turns + [
+            {'role': 'user', 'content': str(user_message)},
+            {'role': 'assistant', 'content': assistant_message},
+        ])
+        if evicted:
+            locked.summary = _roll_summary(locked.summary, evicted)
+        locked.turns = turns
+        locked.message_count += 2
+        locked.save(update_fields=['turns', 'summary', 'message_count', 'updated_at'])
+    return locked
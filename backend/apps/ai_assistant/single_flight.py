@@ -0,0 +1,158 @@
+"""
+Coalescencia de llamadas idénticas a Gemini (single-flight)
+
+Cuando muchos usuarios tocan la misma sugerencia a la vez, todas las
+peticiones tienen la misma clave del caché de respuestas (mismo mensaje
+normalizado, historial y catálogo). La primera genera la respuesta (líder) y
+las demás esperan ese resultado en vez de repetir la llamada: una sola
+llamada gasta cuota y las seguidoras no hacen cola detrás de ella.
+
+Dos niveles:
+- En el proceso: las seguidoras esperan un Event de la llamada en curso y
+  reciben su resultado o su excepción.
+- Entre workers: el líder toma un lock en la caché 'llm' (cache.add, atómico
+  en Redis); un worker que no lo obtiene espera a que el resultado aparezca en
+  el caché de respuestas y, si el lock se libera sin resultado (el líder
+  falló), genera él mismo.
+
+El chat en streaming coalesce solo dentro del proceso (join/finish).
+"""
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+from core.executor import ServiceUnavailableError, bulkhead
+from . import metrics, response_cache
+
+logger = logging.getLogger(__name__)
+
+LOCK_PREFIX = 'single_flight:'
+
+# Intervalo de consulta del resultado de otro worker (segundos)
+POLL_INTERVAL = 0.1
+
+
+def _timed_out():
+    """503 de una espera que superó flight_timeout (con Retry-After)"""
+    return ServiceUnavailableError(
+        'La respuesta está tardando demasiado. Intenta de nuevo en unos segundos.',
+        retry_after=max(1, int(bulkhead('gemini').timeout)),
+    )
+
+
+def flight_timeout():
+    """Segundos que una seguidora espera al líder: timeout de Gemini más la espera de cuota"""
+    return bulkhead('gemini').timeout + settings.GEMINI_QUOTA['max_wait']
+
+
+class Flight:
+    """Llamada en curso: resultado o excepción del líder"""
+
+    def __init__(self):
+        self._done = threading.Event()
+        self.result = None
+        self.error = None
+
+    def wait(self, timeout):
+        """
+        Espera el resultado del líder
+
+        Raises:
+            La excepción del líder, o ServiceUnavailableError si no termina a tiempo
+        """
+        if not self._done.wait(timeout):
+            raise _timed_out()
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+class SingleFlight:
+    """Registro de llamadas en curso por clave (uno por proceso)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights = {}
+
+    def join(self, key):
+        """
+        Llamada en curso para key, o una nueva si no hay
+
+        Returns:
+            tuple: (Flight, True si quien llama es el líder y debe llamar a finish)
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = Flight()
+        metrics.increment('single_flight.leaders' if leader else 'single_flight.followers')
+        return flight, leader
+
+    def finish(self, key, flight, result=None, error=None):
+        """Publica el resultado (o la excepción) del líder y libera la clave"""
+        with self._lock:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+        if error is not None and not isinstance(error, Exception):
+            # Cancelación del líder (ej. cliente desconectado): no propagarla a las seguidoras
+            error = ServiceUnavailableError('La respuesta se interrumpió. Intenta de nuevo.')
+        flight.result = result
+        flight.error = error
+        flight._done.set()
+
+    def do(self, key, fn):
+        """
+        Ejecuta fn una sola vez por key entre llamadas concurrentes
+
+        fn debe guardar su resultado en el caché de respuestas con key, así
+        otros workers lo encuentran.
+
+        Returns:
+            Resultado de fn (propio o del líder)
+        """
+        flight, leader = self.join(key)
+        if not leader:
+            return flight.wait(flight_timeout())
+
+        try:
+            result = _run_across_workers(key, fn)
+        except BaseException as error:
+            self.finish(key, flight, error=error)
+            raise
+        self.finish(key, flight, result=result)
+        return result
+
+
+def _run_across_workers(key, fn):
+    """Ejecuta fn con el lock de key entre workers, o espera el resultado de otro worker"""
+    lock_cache = caches['llm']
+    lock_key = f'{LOCK_PREFIX}{key}'
+    timeout = flight_timeout()
+    deadline = time.monotonic() + timeout
+
+    while not lock_cache.add(lock_key, 1, timeout):
+        # Otro worker está generando: esperar su respuesta en el caché
+        cached = response_cache.peek(key)
+        if cached is not None:
+            metrics.increment('single_flight.remote_followers')
+            return cached
+        if time.monotonic() >= deadline:
+            raise _timed_out()
+        time.sleep(POLL_INTERVAL)
+
+    try:
+        # El líder anterior pudo terminar mientras esperábamos el lock
+        cached = response_cache.peek(key)
+        if cached is not None:
+            return cached
+        return fn()
+    finally:
+        lock_cache.delete(lock_key)
+
+
+# Instancia compartida por proceso
+single_flight = SingleFlight()
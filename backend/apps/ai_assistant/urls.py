@@ -8,6 +8,8 @@ app_name = 'ai_assistant'
 
 urlpatterns = [
     path('chat/', views.chat_view, name='chat'),
+    path('chat/stream/', views.chat_stream_view, name='chat_stream'),
     path('suggest-route/', views.suggest_route_view, name='suggest_route'),
     path('health/', views.health_check_view, name='health_check'),
+    path('metrics/', views.metrics_view, name='metrics'),
 ]
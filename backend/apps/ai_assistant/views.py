@@ -1,11 +1,37 @@
 """
 Vistas para el asistente AI RutaGO
 """
+import asyncio
+import json
+import logging
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
 from rest_framework import status
 from rest_framework.decorators import api_view, permission_classes
-from rest_framework.permissions import IsAuthenticated, AllowAny
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.permissions import IsAuthenticated, IsAdminUser, AllowAny
 from rest_framework.response import Response
-from .services import get_gemini_service
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from apps.businesses.models import Business
+from apps.businesses.serializers import BusinessListSerializer
+from apps.routes.services.itinerary import ItineraryError
+from core.executor import ServiceUnavailableError, bulkhead
+from . import metrics, quota, response_cache
+from .single_flight import flight_timeout, single_flight
+from .services import get_gemini_service, itinerary_from_preferences
+from .sessions import get_or_create_session, record_turn
+
+logger = logging.getLogger(__name__)
+
+
+def _message_too_long():
+    return f'El mensaje supera los {settings.CHAT_MESSAGE_MAX_CHARS} caracteres'
 
 
 @api_view(['POST'])
@@ -17,33 +43,49 @@ def chat_view(request):
     Body:
     {
         "message": "¿Qué lugares puedo visitar en Providencia?",
-        "conversation_history": [
-            {"role": "user", "content": "Hola"},
-            {"role": "assistant", "content": "¡Hola! ¿Cómo puedo ayudarte?"}
-        ]
+        "session_id": "uuid de la sesión (opcional)"
     }
+
+    El historial se guarda en el servidor: la respuesta incluye "session_id"
+    y basta enviarlo en el siguiente mensaje. Si el id no existe o expiró se
+    inicia una sesión nueva. Los clientes antiguos pueden seguir enviando
+    "conversation_history" (sin session_id) y no se crea sesión.
     """
     message = request.data.get('message')
     conversation_history = request.data.get('conversation_history', [])
+    session_id = request.data.get('session_id')
 
     if not message:
         return Response({
             'error': 'El campo "message" es requerido'
         }, status=status.HTTP_400_BAD_REQUEST)
+    if len(str(message)) > settings.CHAT_MESSAGE_MAX_CHARS:
+        return Response({
+            'error': _message_too_long(),
+            'success': False
+        }, status=status.HTTP_400_BAD_REQUEST)
 
     try:
+        session = None
+        if session_id or 'conversation_history' not in request.data:
+            session = get_or_create_session(session_id, request.user)
+
         # Generar respuesta con Gemini
         gemini_service = get_gemini_service()
         response_text = gemini_service.generate_response(
             user_message=message,
-            conversation_history=conversation_history
+            conversation_history=conversation_history,
+            session=session
         )
 
         return Response({
             'response': response_text,
+            'session_id': str(session.id) if session else None,
             'success': True
         }, status=status.HTTP_200_OK)
 
+    except ServiceUnavailableError:
+        raise  # 503 del bulkhead de Gemini
     except Exception as e:
         return Response({
             'error': str(e),
@@ -51,39 +93,241 @@ def chat_view(request):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+def _sse(event, data):
+    """Evento Server-Sent Events con datos JSON"""
+    return f'event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n'
+
+
+async def _chat_events(gemini_service, message, conversation_history, session, release):
+    """
+    Eventos SSE de una respuesta de chat: 'token' por fragmento y al final
+    'done' (con latencias) o 'error'
+
+    La preparación (caché, contexto de negocios) usa el hilo síncrono de
+    Django; cada espera de Gemini corre en un hilo del pool, así una
+    generación lenta no bloquea al worker. Cada fragmento tiene como plazo
+    el timeout del bulkhead de Gemini, cuyo cupo se libera al terminar.
+    """
+    timeout = bulkhead('gemini').timeout
+    started = time.perf_counter()
+    first_token_ms = None
+    parts = []
+    cached = None
+
+    try:
+        cache_key, cached, full_prompt = await sync_to_async(gemini_service.prepare_chat)(
+            message, conversation_history, session
+        )
+        if cached is not None:
+            first_token_ms = (time.perf_counter() - started) * 1000
+            yield _sse('token', {'text': cached})
+        else:
+            flight, leader = single_flight.join(cache_key)
+            if not leader:
+                # Misma pregunta en curso en este worker: esperar su respuesta completa
+                cached = await sync_to_async(flight.wait, thread_sensitive=False)(flight_timeout())
+                first_token_ms = (time.perf_counter() - started) * 1000
+                yield _sse('token', {'text': cached})
+            else:
+                try:
+                    # Esperar cuota en un hilo del pool, sin ocupar el hilo síncrono
+                    estimated = await sync_to_async(quota.acquire, thread_sensitive=False)(
+                        quota.estimate_tokens(full_prompt)
+                    )
+                    chunks = gemini_service.stream_chunks(full_prompt)
+                    next_chunk = sync_to_async(next, thread_sensitive=False)
+                    while True:
+                        text = await asyncio.wait_for(next_chunk(chunks, None), timeout)
+                        if text is None:
+                            break
+                        if first_token_ms is None:
+                            first_token_ms = (time.perf_counter() - started) * 1000
+                        parts.append(text)
+                        yield _sse('token', {'text': text})
+                except BaseException as error:
+                    single_flight.finish(cache_key, flight, error=error)
+                    raise
+                single_flight.finish(cache_key, flight, result=''.join(parts))
+                if parts:
+                    await sync_to_async(response_cache.store)(cache_key, ''.join(parts))
+                await sync_to_async(quota.settle)(
+                    estimated, quota.count_tokens(full_prompt + ''.join(parts))
+                )
+    except asyncio.CancelledError:
+        # El cliente cerró la conexión
+        logger.info('Chat en streaming cancelado por el cliente')
+        raise
+    except ServiceUnavailableError as e:
+        await sync_to_async(metrics.increment)('chat_stream.errors')
+        yield _sse('error', {'message': str(e.detail), 'retry_after': e.retry_after})
+        return
+    except asyncio.TimeoutError:
+        await sync_to_async(metrics.increment)('chat_stream.errors')
+        yield _sse('error', {'message': 'Gemini no respondió a tiempo. Intenta de nuevo en unos segundos.'})
+        return
+    except Exception as e:
+        await sync_to_async(metrics.increment)('chat_stream.errors')
+        yield _sse('error', {'message': await sync_to_async(gemini_service.error_message)(e)})
+        return
+    finally:
+        release()
+
+    if session is not None:
+        answer = cached if cached is not None else ''.join(parts)
+        if answer:
+            await sync_to_async(record_turn)(session, message, answer)
+
+    total_ms = (time.perf_counter() - started) * 1000
+    if first_token_ms is not None:
+        await sync_to_async(metrics.observe)('chat_stream.first_token', first_token_ms)
+    await sync_to_async(metrics.observe)('chat_stream.total', total_ms)
+    logger.info('Chat en streaming: primer token %.0f ms, total %.0f ms', first_token_ms or 0, total_ms)
+
+    yield _sse('done', {
+        'session_id': str(session.id) if session else None,
+        'cached': cached is not None,
+        'first_token_ms': round(first_token_ms, 1) if first_token_ms is not None else None,
+        'total_ms': round(total_ms, 1),
+    })
+
+
+def _jwt_user(request):
+    """Usuario del token JWT de la petición (None si no hay o no es válido); la vista no pasa por DRF"""
+    try:
+        authenticated = JWTAuthentication().authenticate(request)
+    except (AuthenticationFailed, InvalidToken):
+        return None
+    return authenticated[0] if authenticated else None
+
+
+@csrf_exempt
+@require_POST
+async def chat_stream_view(request):
+    """
+    Endpoint de chat con respuesta en streaming (Server-Sent Events)
+
+    Vista asíncrona de Django (sin DRF): servida por un worker ASGI no ocupa
+    un worker mientras Gemini genera. Mismo body (y sesiones) que /api/ai/chat/.
+
+    Eventos:
+        event: token  data: {"text": "..."}
+        event: done   data: {"session_id": "...", "cached": false, "first_token_ms": 850.2, "total_ms": 4210.7}
+        event: error  data: {"message": "..."}
+    """
+    try:
+        body = json.loads(request.body or b'{}')
+    except ValueError:
+        return JsonResponse({'error': 'JSON inválido', 'success': False}, status=400)
+
+    message = body.get('message')
+    conversation_history = body.get('conversation_history', [])
+    session_id = body.get('session_id')
+    if not message:
+        return JsonResponse({
+            'error': 'El campo "message" es requerido',
+            'success': False
+        }, status=400)
+    if len(str(message)) > settings.CHAT_MESSAGE_MAX_CHARS:
+        return JsonResponse({'error': _message_too_long(), 'success': False}, status=400)
+
+    try:
+        gemini_service = await sync_to_async(get_gemini_service)()
+        session = None
+        if session_id or 'conversation_history' not in body:
+            user = await sync_to_async(_jwt_user)(request)
+            session = await sync_to_async(get_or_create_session)(session_id, user)
+    except Exception as e:
+        return JsonResponse({'error': str(e), 'success': False}, status=500)
+
+    # Cupo del bulkhead de Gemini durante todo el streaming; sin cupo, 503 inmediato
+    gemini_bulkhead = bulkhead('gemini')
+    if not gemini_bulkhead.acquire():
+        response = JsonResponse({
+            'error': 'El asistente está saturado. Intenta de nuevo en unos segundos.',
+            'success': False
+        }, status=503)
+        response['Retry-After'] = str(max(1, int(gemini_bulkhead.timeout)))
+        return response
+
+    released = []
+
+    def release():
+        # Idempotente: lo llaman el generador al terminar y el cierre de la respuesta
+        if not released:
+            released.append(True)
+            gemini_bulkhead.release()
+
+    await sync_to_async(metrics.increment)('chat_stream.requests')
+    response = StreamingHttpResponse(
+        _chat_events(gemini_service, message, conversation_history, session, release),
+        content_type='text/event-stream'
+    )
+    # Si el cliente se desconecta antes de iterar, el generador no corre
+    response._resource_closers.append(release)
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # Sin buffer en proxies (nginx)
+    return response
+
+
 @api_view(['POST'])
 @permission_classes([AllowAny])
 def suggest_route_view(request):
     """
     Endpoint para sugerencias de rutas personalizadas
 
+    El itinerario (qué negocios y en qué orden) lo arma el generador local;
+    Gemini solo lo narra. Si Gemini no está disponible se retorna igual el
+    itinerario con "route": null; si está saturado o sin cuota, 503 con
+    Retry-After.
+
     Body:
     {
         "preferences": {
             "categories": ["gastronomia", "turismo"],
             "budget": "medio",
             "duration": "4 horas",
-            "group_size": "2-3 personas"
+            "group_size": "2-3 personas",
+            "start": {"latitude": -33.43, "longitude": -70.64},
+            "max_stops": 5
         }
     }
     """
     preferences = request.data.get('preferences', {})
 
     try:
-        # Generar sugerencia de ruta
-        gemini_service = get_gemini_service()
-        route_suggestion = gemini_service.suggest_route(preferences)
-
-        return Response({
-            'route': route_suggestion,
-            'success': True
-        }, status=status.HTTP_200_OK)
-
-    except Exception as e:
+        itinerary = itinerary_from_preferences(preferences)
+    except ItineraryError as e:
         return Response({
             'error': str(e),
             'success': False
-        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    itinerary_data = itinerary.to_dict()
+    businesses = {
+        str(business.id): business
+        for business in Business.objects.select_related('category').prefetch_related('features').filter(
+            id__in=itinerary.business_ids
+        )
+    }
+    for stop in itinerary_data['stops']:
+        business = businesses.get(stop['business_id'])
+        stop['business'] = BusinessListSerializer(business, context={'request': request}).data if business else None
+
+    try:
+        # Narrar la ruta con Gemini
+        gemini_service = get_gemini_service()
+        route_suggestion = gemini_service.suggest_route(preferences, itinerary)
+    except ServiceUnavailableError:
+        raise  # 503 con Retry-After (bulkhead, cuota o espera del single-flight)
+    except Exception as e:
+        logger.warning('Error al narrar la ruta con Gemini: %s', e)
+        route_suggestion = None
+
+    return Response({
+        'route': route_suggestion,
+        'itinerary': itinerary_data,
+        'success': True
+    }, status=status.HTTP_200_OK)
 
 
 @api_view(['GET'])
@@ -137,3 +381,13 @@ def health_check_view(request):
             'details': 'Verifica que GEMINI_API_KEY esté configurada correctamente',
             'traceback': traceback.format_exc()
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def metrics_view(request):
+    """Contadores del asistente (aciertos y fallos del caché de respuestas)"""
+    return Response({
+        'success': True,
+        'data': metrics.snapshot()
+    }, status=status.HTTP_200_OK)
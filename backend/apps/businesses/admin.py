@@ -1,9 +1,11 @@
 from django.contrib import admin
 from django.utils.html import format_html
 from django.utils import timezone
+from .catalog import bump_catalog_version
+from .services.semantic_search import refresh_business_embeddings
 from .models import (
     Business, Category, Feature, Tag, Favorite, Visit, 
-    BusinessOwnerProfile, BusinessView, BusinessImage, OpeningHours, Report
+    BusinessOwnerProfile, BusinessView, BusinessViewDaily, BusinessImage, OpeningHours, Report
 )
 
 
@@ -117,16 +119,20 @@ class BusinessAdmin(admin.ModelAdmin):
             approved_by=request.user,
             approved_at=timezone.now()
         )
+        refresh_business_embeddings()
+        bump_catalog_version()
         self.message_user(request, f"{updated} negocios aprobados y publicados")
     approve_businesses.short_description = "✅ Aprobar y publicar negocios"
     
     def reject_businesses(self, request, queryset):
         updated = queryset.update(status='rejected')
+        bump_catalog_version()
         self.message_user(request, f"{updated} negocios rechazados")
     reject_businesses.short_description = "❌ Rechazar negocios"
     
     def mark_as_pending(self, request, queryset):
         updated = queryset.update(status='pending_review')
+        bump_catalog_version()
         self.message_user(request, f"{updated} negocios marcados como pendientes")
     mark_as_pending.short_description = "⏳ Marcar como pendiente de revisión"
 
@@ -153,6 +159,8 @@ class BusinessAdmin(admin.ModelAdmin):
             approved_by=request.user,
             approved_at=timezone.now()
         )
+        refresh_business_embeddings()
+        bump_catalog_version()
 
         if updated > 0:
             self.message_user(
@@ -261,6 +269,19 @@ class BusinessViewAdmin(admin.ModelAdmin):
         return False  # No permitir crear manualmente
 
 
+@admin.register(BusinessViewDaily)
+class BusinessViewDailyAdmin(admin.ModelAdmin):
+    """Admin para vistas diarias compactadas (analytics)"""
+    list_display = ['business', 'date', 'views']
+    list_filter = ['date']
+    search_fields = ['business__name']
+    date_hierarchy = 'date'
+    readonly_fields = ['business', 'date', 'views']
+    
+    def has_add_permission(self, request):
+        return False  # Solo las crea compact_business_views
+
+
 @admin.register(BusinessImage)
 class BusinessImageAdmin(admin.ModelAdmin):
     """Admin para imágenes de negocios"""
@@ -299,12 +320,16 @@ class BusinessImageAdmin(admin.ModelAdmin):
     thumbnail_preview.short_description = 'Preview'
     
     def approve_images(self, request, queryset):
+        business_ids = set(queryset.values_list('business_id', flat=True))
         updated = queryset.update(is_approved=True, is_active=True)
+        Business.touch(business_ids)
         self.message_user(request, f"✅ {updated} imágenes aprobadas")
     approve_images.short_description = "✅ Aprobar imágenes"
     
     def reject_images(self, request, queryset):
+        business_ids = set(queryset.values_list('business_id', flat=True))
         updated = queryset.update(is_approved=False, is_active=False)
+        Business.touch(business_ids)
         self.message_user(request, f"❌ {updated} imágenes rechazadas")
     reject_images.short_description = "❌ Rechazar imágenes"
     
@@ -0,0 +1,65 @@
+"""
+Versión del catálogo de negocios
+
+Token compartido que cambia cada vez que se guarda, elimina o publica un
+negocio. Los índices en memoria construidos sobre el catálogo (índice
+espacial, índices de búsqueda) lo comparan en cada uso y se reconstruyen
+cuando cambia.
+
+Se guarda en la base de datos (CatalogVersion, una fila) y no en la caché:
+sin Redis la caché es local de cada proceso y un cambio hecho en un worker
+o en un management command no llegaría a los demás workers. Cada proceso
+lee la fila como máximo una vez cada CATALOG_VERSION_CHECK_SECONDS; un
+cambio hecho en el mismo proceso se ve de inmediato.
+
+Es un token aleatorio y no un contador, para que una versión nueva nunca
+coincida con una ya vista.
+"""
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.db import transaction
+
+_lock = threading.Lock()
+# (versión, momento de la lectura) compartido por los hilos del proceso
+_cached = (None, 0.0)
+
+
+def _read_version():
+    from .models import CatalogVersion
+
+    version = CatalogVersion.objects.filter(pk=1).values_list('version', flat=True).first()
+    if version is None:
+        # Fila creada por la migración 0009; por si se borró
+        version = CatalogVersion.objects.get_or_create(pk=1, defaults={'version': uuid.uuid4().hex})[0].version
+    return version
+
+
+def get_catalog_version():
+    """Versión vigente del catálogo"""
+    global _cached
+    version, checked_at = _cached
+    if version is None or time.monotonic() - checked_at >= settings.CATALOG_VERSION_CHECK_SECONDS:
+        version = _read_version()
+        with _lock:
+            _cached = (version, time.monotonic())
+    return version
+
+
+def _forget_cached_version():
+    global _cached
+    with _lock:
+        _cached = (None, 0.0)
+
+
+def bump_catalog_version():
+    """Invalida los índices del catálogo (en la transacción en curso, si la hay)"""
+    from .models import CatalogVersion
+
+    updated = CatalogVersion.objects.filter(pk=1).update(version=uuid.uuid4().hex)
+    if not updated:
+        CatalogVersion.objects.create(pk=1, version=uuid.uuid4().hex)
+    # Este proceso vuelve a leer la versión apenas se confirme el cambio
+    transaction.on_commit(_forget_cached_version)
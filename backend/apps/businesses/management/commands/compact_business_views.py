@@ -0,0 +1,132 @@
+"""
+Management command para compactar las vistas crudas de negocios
+
+Agrupa las filas de BusinessView más antiguas que el horizonte de retención
+en agregados diarios (BusinessViewDaily) y elimina las filas crudas en lotes
+acotados, para que la tabla business_views y sus índices se mantengan pequeños.
+
+Pensado para ejecutarse periódicamente (cron de Railway, una vez al día).
+
+Uso:
+    python manage.py compact_business_views
+    python manage.py compact_business_views --days 30
+    python manage.py compact_business_views --batch-size 2000 --dry-run
+"""
+
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Count, Q
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from apps.businesses.models import BusinessView, BusinessViewDaily
+
+
+class Command(BaseCommand):
+    help = 'Compacta vistas crudas antiguas en agregados diarios y las elimina en lotes'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=settings.BUSINESS_VIEWS_RETENTION_DAYS,
+            help='Días de vistas crudas a conservar (default: BUSINESS_VIEWS_RETENTION_DAYS)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='Número de filas crudas a compactar por transacción (default: 5000)',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Muestra cuántas filas se compactarían sin modificar la base de datos',
+        )
+
+    def handle(self, *args, **options):
+        days = options['days']
+        batch_size = options['batch_size']
+        dry_run = options['dry_run']
+
+        if days < 1:
+            raise CommandError('--days debe ser al menos 1')
+        if batch_size < 1:
+            raise CommandError('--batch-size debe ser al menos 1')
+
+        # Cortar en el inicio del día local para no partir un día en dos
+        today = timezone.localdate()
+        cutoff_date = today - timedelta(days=days)
+        cutoff = timezone.make_aware(datetime.combine(cutoff_date, time.min))
+
+        old_views = BusinessView.objects.filter(viewed_at__lt=cutoff)
+
+        self.stdout.write(self.style.WARNING(
+            f'Compactando vistas anteriores a {cutoff_date.isoformat()} ({days} días de retención)'
+        ))
+
+        if dry_run:
+            total = old_views.count()
+            self.stdout.write(self.style.WARNING(
+                f'[DRY RUN] Se compactarían {total} vistas crudas. No se realizaron cambios.'
+            ))
+            return
+
+        compacted = 0
+        while True:
+            # Recorrer por PK: las filas antiguas tienen los ids más bajos
+            batch_ids = list(
+                old_views.order_by('id').values_list('id', flat=True)[:batch_size]
+            )
+            if not batch_ids:
+                break
+
+            with transaction.atomic():
+                self._compact_batch(batch_ids)
+
+            compacted += len(batch_ids)
+            self.stdout.write(f'  ✓ {compacted} vistas compactadas')
+
+        self.stdout.write(self.style.SUCCESS(f'\n✓ {compacted} vistas crudas compactadas en agregados diarios'))
+
+    def _compact_batch(self, batch_ids):
+        """Suma un lote de vistas crudas a sus agregados diarios y borra el lote"""
+        counts = (
+            BusinessView.objects
+            .filter(id__in=batch_ids)
+            .annotate(date=TruncDate('viewed_at'))
+            .values('business_id', 'date')
+            .annotate(count=Count('id'))
+            .order_by()
+        )
+        counts = {(row['business_id'], row['date']): row['count'] for row in counts}
+
+        # Un mismo (negocio, día) puede repartirse entre varios lotes: sumar a lo existente
+        existing_filter = Q()
+        for business_id, date in counts:
+            existing_filter |= Q(business_id=business_id, date=date)
+
+        existing = {
+            (daily.business_id, daily.date): daily
+            for daily in BusinessViewDaily.objects.select_for_update().filter(existing_filter)
+        }
+
+        to_update = []
+        to_create = []
+        for key, count in counts.items():
+            daily = existing.get(key)
+            if daily:
+                daily.views += count
+                to_update.append(daily)
+            else:
+                to_create.append(BusinessViewDaily(business_id=key[0], date=key[1], views=count))
+
+        if to_update:
+            BusinessViewDaily.objects.bulk_update(to_update, ['views'])
+        if to_create:
+            BusinessViewDaily.objects.bulk_create(to_create)
+
+        BusinessView.objects.filter(id__in=batch_ids).delete()
@@ -0,0 +1,39 @@
+"""
+Management command para calcular los embeddings de búsqueda semántica
+
+Re-embebe los negocios publicados cuyo texto cambió desde su último
+embedding (o que no tienen). Las búsquedas no re-embeben: guardar o publicar
+un negocio lo hace, y este comando cubre la carga inicial, el cambio de
+SEMANTIC_EMBEDDING_PROVIDER y los cambios hechos fuera de save() (ej. tags).
+
+Uso:
+    python manage.py embed_businesses
+    python manage.py embed_businesses --force
+"""
+
+from django.core.management.base import BaseCommand
+
+from apps.businesses.catalog import bump_catalog_version
+from apps.businesses.services.semantic_search import get_embedding_provider, refresh_business_embeddings
+
+
+class Command(BaseCommand):
+    help = 'Calcula los embeddings de búsqueda semántica de los negocios publicados'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Revisa todos los negocios, no solo los modificados (solo re-embebe si cambió el texto)',
+        )
+
+    def handle(self, *args, **options):
+        provider = get_embedding_provider()
+        self.stdout.write(self.style.WARNING(f'Calculando embeddings con {provider.name}...'))
+
+        embedded = refresh_business_embeddings(force=options['force'])
+        if embedded:
+            # Que los workers recarguen la matriz de vectores
+            bump_catalog_version()
+
+        self.stdout.write(self.style.SUCCESS(f'✓ {embedded} negocios re-embebidos'))
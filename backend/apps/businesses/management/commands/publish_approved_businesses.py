@@ -1,5 +1,7 @@
 from django.core.management.base import BaseCommand
 from django.utils import timezone
+from apps.businesses.catalog import bump_catalog_version
+from apps.businesses.services.semantic_search import refresh_business_embeddings
 from apps.businesses.models import Business, BusinessOwnerProfile
 
 
@@ -74,6 +76,9 @@ class Command(BaseCommand):
             status='published',
             approved_at=timezone.now()
         )
+        # Los negocios recién publicados entran al índice semántico
+        refresh_business_embeddings()
+        bump_catalog_version()
 
         self.stdout.write(
             self.style.SUCCESS(f'\n✓ {updated_count} negocios publicados exitosamente!')
@@ -0,0 +1,40 @@
+"""
+Management command para reparar rating y review_count de los negocios
+
+El rating se mantiene incrementalmente al guardar o eliminar reseñas. Este
+comando recalcula todo desde las reseñas aprobadas con una única consulta
+agrupada y corrige solo los negocios desviados (por ejemplo, después de
+ediciones directas en la base de datos).
+
+Uso:
+    python manage.py recompute_ratings
+    python manage.py recompute_ratings --business <uuid> --business <uuid>
+"""
+
+from django.core.management.base import BaseCommand
+
+from apps.reviews.services import recompute_review_stats
+
+
+class Command(BaseCommand):
+    help = 'Recalcula rating, review_count y estadísticas de reseñas de los negocios'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--business',
+            action='append',
+            dest='business_ids',
+            help='ID de un negocio a reparar (repetible). Por defecto, todos',
+        )
+
+    def handle(self, *args, **options):
+        business_ids = options['business_ids']
+
+        self.stdout.write(self.style.WARNING('Recalculando ratings desde las reseñas aprobadas...'))
+
+        repaired = recompute_review_stats(business_ids)
+
+        if repaired:
+            self.stdout.write(self.style.SUCCESS(f'✓ {repaired} negocios corregidos'))
+        else:
+            self.stdout.write(self.style.SUCCESS('✓ Todos los ratings estaban al día'))
@@ -0,0 +1,56 @@
+"""
+Management command para refrescar rank_score de los negocios
+
+El puntaje se refresca solo al cambiar reseñas o favoritos, pero su término
+de novedad decae con el tiempo (ver apps/businesses/ranking.py). Este
+comando lo recalcula para todos los negocios en lotes.
+
+Pensado para ejecutarse periódicamente (cron de Railway, una vez al día).
+
+Uso:
+    python manage.py refresh_business_rankings
+    python manage.py refresh_business_rankings --batch-size 5000
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.businesses.catalog import bump_catalog_version
+from apps.businesses.models import Business
+from apps.businesses.ranking import refresh_rank_scores
+
+
+class Command(BaseCommand):
+    help = 'Recalcula el puntaje de ranking (rank_score) de todos los negocios'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=2000,
+            help='Negocios a recalcular por lote (default: 2000)',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        if batch_size < 1:
+            raise CommandError('--batch-size debe ser al menos 1')
+
+        self.stdout.write(self.style.WARNING('Recalculando rank_score de los negocios...'))
+
+        refreshed = 0
+        last_id = None
+        businesses = Business.objects.order_by('pk')
+        while True:
+            batch = businesses.filter(pk__gt=last_id) if last_id else businesses
+            batch_ids = list(batch.values_list('pk', flat=True)[:batch_size])
+            if not batch_ids:
+                break
+
+            refreshed += refresh_rank_scores(batch_ids)
+            last_id = batch_ids[-1]
+            self.stdout.write(f'  ✓ {refreshed} negocios recalculados')
+
+        # Los índices en memoria ordenan por rank_score
+        if refreshed:
+            bump_catalog_version()
+        self.stdout.write(self.style.SUCCESS(f'\n✓ {refreshed} negocios con rank_score al día'))
@@ -0,0 +1,30 @@
+# Generated by Django 5.0.1 on 2026-10-19 14:47
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('businesses', '0005_add_images_hours_reports'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BusinessViewDaily',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='Fecha')),
+                ('views', models.PositiveIntegerField(default=0, verbose_name='Vistas')),
+                ('business', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_views', to='businesses.business')),
+            ],
+            options={
+                'verbose_name': 'Vistas diarias',
+                'verbose_name_plural': 'Vistas diarias',
+                'db_table': 'business_views_daily',
+                'ordering': ['-date'],
+                'unique_together': {('business', 'date')},
+            },
+        ),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 5.0.1 on 2026-10-19 14:51
+
+from math import exp, log1p
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def _rank_score(rating_sum, total, favorites_count, created_at, now):
+    """
+    Fórmula de rank_score al crear el campo (congelada: no depende de ranking.py)
+
+    Los cambios posteriores de la fórmula se aplican con el comando
+    refresh_business_rankings o en migraciones nuevas.
+    """
+    prior_mean, prior_weight = 4.0, 5
+    bayesian_rating = (prior_weight * prior_mean + (rating_sum or 0)) / (prior_weight + (total or 0))
+    engagement = 0.15 * log1p(max(favorites_count or 0, 0))
+    recency = 0.0
+    if created_at:
+        age_days = max((now - created_at).total_seconds() / 86400, 0)
+        recency = 0.3 * exp(-age_days / 60)
+    return round(bayesian_rating + engagement + recency, 6)
+
+
+def backfill_rank_score(apps, schema_editor):
+    """Calcula el puntaje de ranking inicial de todos los negocios"""
+    Business = apps.get_model('businesses', 'Business')
+
+    rows = Business.objects.order_by().values_list(
+        'pk', 'favorites_count', 'created_at',
+        'review_stats__rating_sum', 'review_stats__total'
+    )
+    now = timezone.now()
+    to_save = [
+        Business(pk=pk, rank_score=_rank_score(rating_sum, total, favorites_count, created_at, now))
+        for pk, favorites_count, created_at, rating_sum, total in rows
+    ]
+    Business.objects.bulk_update(to_save, ['rank_score'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('businesses', '0006_business_views_daily'),
+        ('reviews', '0002_review_stats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='business',
+            name='rank_score',
+            field=models.FloatField(default=0, editable=False, verbose_name='Puntaje de ranking'),
+        ),
+        migrations.AddIndex(
+            model_name='business',
+            index=models.Index(condition=models.Q(('is_active', True), ('status', 'published')), fields=['-rank_score'], name='businesses_rank_score_idx'),
+        ),
+        migrations.RunPython(backfill_rank_score, migrations.RunPython.noop),
+    ]
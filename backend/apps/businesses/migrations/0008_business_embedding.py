@@ -0,0 +1,29 @@
+# Generated by Django 5.0.1 on 2026-10-19 15:11
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('businesses', '0007_business_rank_score'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BusinessEmbedding',
+            fields=[
+                ('business', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='embedding', serialize=False, to='businesses.business')),
+                ('provider', models.CharField(max_length=100, verbose_name='Proveedor')),
+                ('text_hash', models.CharField(max_length=64, verbose_name='Hash del texto')),
+                ('vector', models.BinaryField(verbose_name='Vector (float32)')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Embedding de negocio',
+                'verbose_name_plural': 'Embeddings de negocios',
+                'db_table': 'business_embeddings',
+            },
+        ),
+    ]
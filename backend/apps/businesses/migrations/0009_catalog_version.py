@@ -0,0 +1,32 @@
+import uuid
+
+from django.db import migrations, models
+
+
+def create_version_row(apps, schema_editor):
+    CatalogVersion = apps.get_model('businesses', 'CatalogVersion')
+    CatalogVersion.objects.get_or_create(pk=1, defaults={'version': uuid.uuid4().hex})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('businesses', '0008_business_embedding'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CatalogVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.CharField(max_length=32)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Versión del catálogo',
+                'verbose_name_plural': 'Versión del catálogo',
+                'db_table': 'catalog_version',
+            },
+        ),
+        migrations.RunPython(create_version_row, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,20 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('businesses', '0009_catalog_version'),
+    ]
+
+    operations = [
+        # Desempate por id: el orden del listado público es total y las páginas estables
+        migrations.RemoveIndex(
+            model_name='business',
+            name='businesses_rank_score_idx',
+        ),
+        migrations.AddIndex(
+            model_name='business',
+            index=models.Index(condition=models.Q(('is_active', True), ('status', 'published')), fields=['-rank_score', 'id'], name='businesses_rank_score_idx'),
+        ),
+    ]
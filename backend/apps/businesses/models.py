@@ -131,6 +131,7 @@ class Business(models.Model):
     # Ratings y verificación
     rating = models.DecimalField(max_digits=3, decimal_places=2, default=0, verbose_name="Rating")
     review_count = models.IntegerField(default=0, verbose_name="Cantidad de reseñas")
+    rank_score = models.FloatField(default=0, editable=False, verbose_name="Puntaje de ranking")
     verified = models.BooleanField(default=False, verbose_name="Verificado")
     claimed = models.BooleanField(default=False, verbose_name="Reclamado")
     owner = models.ForeignKey(User, null=True, blank=True, on_delete=models.SET_NULL, related_name='owned_businesses')
@@ -185,26 +186,105 @@ class Business(models.Model):
             models.Index(fields=['category', 'neighborhood']),
             models.Index(fields=['rating', '-created_at']),
             models.Index(fields=['latitude', 'longitude']),
+            # Ordenamiento del listado público (ver ranking.py)
+            models.Index(
+                fields=['-rank_score', 'id'],
+                name='businesses_rank_score_idx',
+                condition=models.Q(is_active=True, status='published'),
+            ),
         ]
     
+    # Campos copiados en Route.preview; se capturan al cargar para detectar cambios
+    PREVIEW_FIELDS = ('name', 'cover_image')
+    # Campos del texto de búsqueda semántica (y de publicación); otros cambios no re-embeben
+    EMBEDDING_FIELDS = (
+        'name', 'short_description', 'description', 'category', 'subcategory',
+        'neighborhood', 'comuna', 'status', 'is_active',
+    )
+    # Campos que leen los índices en memoria y los prompts cacheados (ver catalog.py);
+    # guardar otros campos (ej. contadores) no cambia la versión del catálogo
+    CATALOG_FIELDS = EMBEDDING_FIELDS + (
+        'slug', 'address', 'latitude', 'longitude', 'price_range', 'rating',
+        'review_count', 'verified', 'rank_score',
+    )
+    _preview_snapshot = None
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        loaded = dict(zip(field_names, values))
+        if all(field in loaded for field in cls.PREVIEW_FIELDS):
+            instance._preview_snapshot = tuple(loaded[field] for field in cls.PREVIEW_FIELDS)
+        return instance
+    
+    def _preview_changed(self, update_fields=None):
+        """True si cambió algún campo que se muestra en Route.preview"""
+        if self._state.adding:
+            return False
+        if update_fields is not None and not set(update_fields) & set(self.PREVIEW_FIELDS):
+            return False
+        if self._preview_snapshot is None:
+            return True  # Instancia cargada sin esos campos: asumir cambio
+        return self._preview_snapshot != tuple(getattr(self, field) for field in self.PREVIEW_FIELDS)
+    
     def save(self, *args, **kwargs):
         if not self.slug:
             self.slug = slugify(self.name)
+        if self._state.adding and not self.rank_score:
+            from .ranking import initial_rank_score
+            self.rank_score = initial_rank_score()
+        update_fields = kwargs.get('update_fields')
+        preview_changed = self._preview_changed(update_fields)
         super().save(*args, **kwargs)
+        
+        if update_fields is None or set(update_fields) & set(self.EMBEDDING_FIELDS):
+            # Antes del cambio de versión: los workers recargan la matriz con este vector
+            from .services.semantic_search import refresh_business_embeddings
+            refresh_business_embeddings([self.pk])
+        if update_fields is None or set(update_fields) & set(self.CATALOG_FIELDS):
+            from .catalog import bump_catalog_version
+            bump_catalog_version()
+        if preview_changed:
+            from apps.routes.services.previews import refresh_business_in_previews
+            refresh_business_in_previews(self)
+        self._preview_snapshot = tuple(getattr(self, field) for field in self.PREVIEW_FIELDS)
+    
+    def delete(self, *args, **kwargs):
+        from apps.routes.models import Route
+        
+        # Las paradas se eliminan en cascada: recalcular después las rutas afectadas
+        routes = list(Route.objects.filter(stops__business_id=self.pk).distinct())
+        result = super().delete(*args, **kwargs)
+        for route in routes:
+            route.update_stats()
+        
+        from .catalog import bump_catalog_version
+        bump_catalog_version()
+        return result
     
     def __str__(self):
         return self.name
     
+    @classmethod
+    def touch(cls, business_ids):
+        """
+        Marca negocios como modificados (updated_at) sin pasar por save()
+        
+        Lo usan imágenes y horarios: el bundle offline de rutas se versiona
+        con el updated_at de los negocios de sus paradas.
+        """
+        cls.objects.filter(pk__in=list(business_ids)).update(updated_at=timezone.now())
+    
     def update_rating(self):
-        """Actualizar rating promedio basado en reviews"""
-        from apps.reviews.models import Review
-        reviews = Review.objects.filter(business=self, is_approved=True)
-        if reviews.exists():
-            from django.db.models import Avg
-            avg_rating = reviews.aggregate(Avg('rating'))['rating__avg']
-            self.rating = round(avg_rating, 2)
-            self.review_count = reviews.count()
-            self.save(update_fields=['rating', 'review_count'])
+        """
+        Recalcular rating promedio desde las reviews.
+        
+        Las reviews mantienen rating y review_count incrementalmente al
+        guardarse; esto solo repara desvíos (ver comando recompute_ratings).
+        """
+        from apps.reviews.services import recompute_review_stats
+        recompute_review_stats([self.pk])
+        self.refresh_from_db(fields=['rating', 'review_count'])
 
 
 class Favorite(models.Model):
@@ -306,6 +386,69 @@ class BusinessView(models.Model):
         return f"Vista de {self.business.name} - {self.viewed_at}"
 
 
+class BusinessViewDaily(models.Model):
+    """
+    Agregado diario de vistas de perfil.
+
+    Las filas crudas de BusinessView más antiguas que el horizonte de retención
+    se compactan aquí (ver comando compact_business_views).
+    """
+    business = models.ForeignKey(Business, on_delete=models.CASCADE, related_name='daily_views')
+    date = models.DateField(verbose_name="Fecha")
+    views = models.PositiveIntegerField(default=0, verbose_name="Vistas")
+
+    class Meta:
+        db_table = 'business_views_daily'
+        verbose_name = 'Vistas diarias'
+        verbose_name_plural = 'Vistas diarias'
+        ordering = ['-date']
+        unique_together = ['business', 'date']
+
+    def __str__(self):
+        return f"{self.business.name} - {self.date}: {self.views}"
+
+
+class CatalogVersion(models.Model):
+    """
+    Versión vigente del catálogo de negocios (una sola fila, pk=1).
+
+    Vive en la base de datos para que todos los workers y los management
+    commands vean el mismo valor aunque la caché sea local (ver catalog.py).
+    """
+    version = models.CharField(max_length=32)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'catalog_version'
+        verbose_name = 'Versión del catálogo'
+        verbose_name_plural = 'Versión del catálogo'
+
+    def __str__(self):
+        return self.version
+
+
+class BusinessEmbedding(models.Model):
+    """
+    Vector de búsqueda semántica de un negocio.
+
+    Se recalcula solo cuando cambia el texto del negocio (text_hash) o el
+    proveedor de embeddings (ver services/semantic_search.py).
+    """
+    business = models.OneToOneField(Business, on_delete=models.CASCADE, primary_key=True, related_name='embedding')
+    provider = models.CharField(max_length=100, verbose_name="Proveedor")
+    text_hash = models.CharField(max_length=64, verbose_name="Hash del texto")
+    vector = models.BinaryField(verbose_name="Vector (float32)")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'business_embeddings'
+        verbose_name = 'Embedding de negocio'
+        verbose_name_plural = 'Embeddings de negocios'
+
+    def __str__(self):
+        return f"{self.business_id} ({self.provider})"
+
+
 class BusinessImage(models.Model):
     """Imágenes de negocios con metadatos"""
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
@@ -351,6 +494,16 @@ class BusinessImage(models.Model):
     
     def __str__(self):
         return f"{self.business.name} - {self.image_type} #{self.order}"
+    
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        Business.touch([self.business_id])
+    
+    def delete(self, *args, **kwargs):
+        business_id = self.business_id
+        result = super().delete(*args, **kwargs)
+        Business.touch([business_id])
+        return result
 
 
 class OpeningHours(models.Model):
@@ -399,6 +552,16 @@ class OpeningHours(models.Model):
         if self.is_24h:
             return f"{self.business.name} - {day_name}: 24 horas"
         return f"{self.business.name} - {day_name}: {self.opens_at} - {self.closes_at}"
+    
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        Business.touch([self.business_id])
+    
+    def delete(self, *args, **kwargs):
+        business_id = self.business_id
+        result = super().delete(*args, **kwargs)
+        Business.touch([business_id])
+        return result
 
 
 class Report(models.Model):
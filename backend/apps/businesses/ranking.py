@@ -0,0 +1,89 @@
+"""
+Puntaje de ranking precalculado para ordenar negocios
+
+rank_score combina:
+- Promedio bayesiano del rating: un negocio con una sola reseña de 5 estrellas
+  se acerca al promedio previo en vez de superar a lugares con muchas reseñas.
+- Engagement: logaritmo de la cantidad de favoritos.
+- Novedad: w * exp(-días desde la creación / τ), acotado por
+  RANKING_RECENCY_WEIGHT (menor que la diferencia entre ratings buenos y
+  malos) para que un negocio nuevo aparezca sin desplazar a los mejor
+  evaluados. Depende de la creación y no de la última reseña: una reseña
+  de 1 estrella no puede subir el puntaje.
+
+El puntaje se guarda en Business.rank_score (indexado) y se refresca al
+cambiar reseñas o favoritos del negocio. Como la novedad decae con el
+tiempo, refresh_business_rankings lo recalcula para todos (una vez al día).
+"""
+from math import exp, log1p
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import Business
+
+
+def compute_rank_score(rating_sum, total, favorites_count, created_at, now=None):
+    """
+    Calcula el puntaje de ranking de un negocio
+
+    Args:
+        rating_sum: Suma de calificaciones de reseñas aprobadas
+        total: Cantidad de reseñas aprobadas
+        favorites_count: Cantidad de favoritos
+        created_at: Fecha de creación del negocio
+        now: Momento del cálculo (default: ahora)
+
+    Returns:
+        float con el puntaje (mayor es mejor)
+    """
+    prior_mean = settings.RANKING_PRIOR_MEAN
+    prior_weight = settings.RANKING_PRIOR_WEIGHT
+
+    bayesian_rating = (prior_weight * prior_mean + (rating_sum or 0)) / (prior_weight + (total or 0))
+    engagement = settings.RANKING_ENGAGEMENT_WEIGHT * log1p(max(favorites_count or 0, 0))
+
+    recency = 0.0
+    if created_at:
+        age_days = max(((now or timezone.now()) - created_at).total_seconds() / 86400, 0)
+        recency = settings.RANKING_RECENCY_WEIGHT * exp(-age_days / settings.RANKING_RECENCY_DAYS)
+
+    return round(bayesian_rating + engagement + recency, 6)
+
+
+def refresh_rank_scores(business_ids=None):
+    """
+    Recalcula y guarda rank_score
+
+    Lee los datos necesarios en una sola consulta (junto a ReviewStats) y
+    escribe con un bulk_update.
+
+    Args:
+        business_ids: IDs de negocios a refrescar (None para todos)
+
+    Returns:
+        Número de negocios actualizados
+    """
+    businesses = Business.objects.all()
+    if business_ids is not None:
+        businesses = businesses.filter(pk__in=list(business_ids))
+
+    rows = businesses.order_by().values_list(
+        'pk', 'favorites_count', 'created_at',
+        'review_stats__rating_sum', 'review_stats__total'
+    )
+
+    now = timezone.now()
+    to_save = []
+    for pk, favorites_count, created_at, rating_sum, total in rows.iterator(chunk_size=2000):
+        score = compute_rank_score(rating_sum, total, favorites_count, created_at, now)
+        to_save.append(Business(pk=pk, rank_score=score))
+
+    Business.objects.bulk_update(to_save, ['rank_score'], batch_size=1000)
+    return len(to_save)
+
+
+def initial_rank_score():
+    """Puntaje de un negocio recién creado (sin reseñas ni favoritos)"""
+    now = timezone.now()
+    return compute_rank_score(0, 0, 0, now, now)
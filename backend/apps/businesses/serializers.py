@@ -215,6 +215,7 @@ class BusinessCreateSerializer(serializers.ModelSerializer):
             BusinessLocationValidator
         )
         from django.core.exceptions import ValidationError as DjangoValidationError
+        from core.executor import ServiceUnavailableError
 
         address = data.get('address')
         latitude = data.get('latitude')
@@ -269,6 +270,8 @@ class BusinessCreateSerializer(serializers.ModelSerializer):
                         f'Error: {str(e)}'
                     )
                 })
+            except ServiceUnavailableError:
+                raise  # 503 con Retry-After: Mapbox saturado, no es un error del usuario
             except Exception as e:
                 # Si falla la geocodificación, requerir coordenadas manuales
                 raise serializers.ValidationError({
@@ -2,5 +2,12 @@
 Servicios de negocio para la app businesses
 """
 from .geocoding_service import GeocodingService
+from .distance_matrix import DistanceMatrix, DistanceMatrixService, distance_matrix
+from .spatial_index import BusinessSpatialIndex, CorridorMatch, spatial_index
+from .semantic_search import SemanticHit, SemanticIndex, refresh_business_embeddings, semantic_index
 
-__all__ = ['GeocodingService']
+__all__ = [
+    'GeocodingService', 'DistanceMatrix', 'DistanceMatrixService', 'distance_matrix',
+    'BusinessSpatialIndex', 'CorridorMatch', 'spatial_index',
+    'SemanticHit', 'SemanticIndex', 'refresh_business_embeddings', 'semantic_index',
+]
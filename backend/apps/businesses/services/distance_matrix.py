@@ -0,0 +1,213 @@
+"""
+Matrices de distancia entre negocios con caché LRU de pares
+
+Las estadísticas de rutas, el optimizador y las búsquedas de cercanía piden
+una y otra vez distancias entre los mismos negocios populares. Este servicio
+arma matrices NxM de distancia (km) y tiempo de traslado (minutos) y guarda
+cada par en un LRU en memoria acotado por cantidad de entradas.
+
+La clave de cada par incluye las coordenadas de ambos negocios, de modo que
+si un negocio cambia de ubicación sus pares antiguos simplemente dejan de
+usarse (y el LRU los expulsa). Los pares que faltan se calculan en un solo
+lote con NumPy, fuera del lock: el lock solo protege el acceso al LRU.
+
+Las métricas del caché (por proceso) se consultan en
+/api/businesses/distance-matrix/stats/ (solo administradores).
+"""
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+from django.conf import settings
+
+from core.utils import TRAVEL_MINUTES_PER_KM, haversine_pairs
+
+logger = logging.getLogger(__name__)
+
+# (id, latitud, longitud) de un negocio
+Point = Tuple[str, float, float]
+
+
+@dataclass
+class DistanceMatrix:
+    """
+    Matrices de distancia y tiempo entre orígenes (filas) y destinos (columnas)
+
+    Attributes:
+        origin_ids: IDs de negocios de las filas
+        destination_ids: IDs de negocios de las columnas
+        distances: numpy.ndarray NxM en kilómetros
+        travel_times: numpy.ndarray NxM en minutos (TRAVEL_MINUTES_PER_KM)
+    """
+    origin_ids: List[str]
+    destination_ids: List[str]
+    distances: np.ndarray
+    travel_times: np.ndarray
+
+
+class DistanceMatrixService:
+    """
+    Servicio de matrices de distancia con LRU de pares (seguro entre hilos)
+
+    Uso:
+        matrix = distance_matrix.matrix_for_businesses(businesses)
+        matrix.distances[i, j]
+    """
+
+    def __init__(self, max_entries=None):
+        self.max_entries = max_entries or settings.DISTANCE_MATRIX_CACHE_SIZE
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _key(a: Point, b: Point):
+        # Distancia simétrica: un solo registro por par sin importar el sentido
+        return (a, b) if a <= b else (b, a)
+
+    def matrix(self, origin_ids: Sequence, destination_ids: Sequence = None) -> DistanceMatrix:
+        """
+        Matriz entre IDs de negocios (carga las coordenadas en una consulta)
+
+        Raises:
+            ValueError: Si algún ID no corresponde a un negocio
+        """
+        from apps.businesses.models import Business
+
+        ids = {str(pk) for pk in origin_ids} | {str(pk) for pk in (destination_ids or [])}
+        coordinates = {
+            str(pk): (str(pk), float(lat), float(lng))
+            for pk, lat, lng in Business.objects.filter(pk__in=ids).values_list('pk', 'latitude', 'longitude')
+        }
+        missing = ids - coordinates.keys()
+        if missing:
+            raise ValueError(f'Negocios no encontrados: {", ".join(sorted(missing))}')
+
+        origins = [coordinates[str(pk)] for pk in origin_ids]
+        destinations = [coordinates[str(pk)] for pk in destination_ids] if destination_ids is not None else None
+        return self.matrix_for_points(origins, destinations)
+
+    def matrix_for_businesses(self, origins, destinations=None) -> DistanceMatrix:
+        """Matriz entre instancias de Business ya cargadas (sin consultas)"""
+        def to_points(businesses):
+            return [(str(b.pk), float(b.latitude), float(b.longitude)) for b in businesses]
+
+        return self.matrix_for_points(
+            to_points(origins),
+            to_points(destinations) if destinations is not None else None
+        )
+
+    def matrix_for_points(self, origins: List[Point], destinations: List[Point] = None) -> DistanceMatrix:
+        """
+        Matriz entre puntos (id, lat, lng); los pares faltantes se calculan en lote
+
+        Args:
+            origins: Puntos de las filas
+            destinations: Puntos de las columnas (por defecto, los mismos orígenes)
+        """
+        if destinations is None:
+            destinations = origins
+
+        # Celdas por par (fuera del lock): un par simétrico puede aparecer varias veces
+        cells = {}
+        for i, a in enumerate(origins):
+            for j, b in enumerate(destinations):
+                if a != b:
+                    cells.setdefault(self._key(a, b), []).append((i, j))
+
+        distances = np.zeros((len(origins), len(destinations)))
+        for key, value in self._distances(list(cells)).items():
+            for i, j in cells[key]:
+                distances[i, j] = value
+
+        return DistanceMatrix(
+            origin_ids=[point[0] for point in origins],
+            destination_ids=[point[0] for point in destinations],
+            distances=distances,
+            travel_times=np.rint(distances * TRAVEL_MINUTES_PER_KM).astype(int),
+        )
+
+    def path_distances(self, points: List[Point]) -> List[float]:
+        """
+        Distancias (km) entre puntos consecutivos de un recorrido, con el mismo LRU
+
+        Solo busca los N-1 pares del recorrido (no la matriz completa).
+
+        Returns:
+            Lista alineada con points: distancia desde el punto anterior (0 para el primero)
+        """
+        indexes = {}
+        for index, (a, b) in enumerate(zip(points, points[1:]), 1):
+            if a != b:
+                indexes.setdefault(self._key(a, b), []).append(index)
+
+        legs = [0.0] * len(points)
+        for key, value in self._distances(list(indexes)).items():
+            for index in indexes[key]:
+                legs[index] = value
+        return legs
+
+    def _distances(self, keys) -> Dict:
+        """
+        Distancia de cada par (sin repetidos): del LRU o calculada en lote
+
+        El lock solo cubre la lectura y la escritura del LRU; armar los pares
+        y calcular los faltantes con NumPy ocurre fuera de él.
+        """
+        with self._lock:
+            values = [self._cache.get(key) for key in keys]
+            for key, value in zip(keys, values):
+                if value is not None:
+                    self._cache.move_to_end(key)
+            hits = sum(value is not None for value in values)
+            self.hits += hits
+            self.misses += len(keys) - hits
+
+        found = dict(zip(keys, values))
+        missing = [key for key, value in found.items() if value is None]
+        if missing:
+            computed = haversine_pairs(
+                [key[0][1] for key in missing], [key[0][2] for key in missing],
+                [key[1][1] for key in missing], [key[1][2] for key in missing]
+            ).tolist()
+            found.update(zip(missing, computed))
+            self._store(zip(missing, computed))
+        return found
+
+    def _store(self, items):
+        with self._lock:
+            for key, value in items:
+                self._cache[key] = value
+                self._cache.move_to_end(key)
+            overflow = len(self._cache) - self.max_entries
+            for _ in range(max(overflow, 0)):
+                self._cache.popitem(last=False)
+            self.evictions += max(overflow, 0)
+
+    def stats(self) -> Dict:
+        """Métricas del caché: aciertos, fallos, tasa de acierto y tamaño"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0,
+                'evictions': self.evictions,
+                'size': len(self._cache),
+                'max_entries': self.max_entries,
+            }
+
+    def clear(self):
+        """Vacía el caché y reinicia las métricas"""
+        with self._lock:
+            self._cache.clear()
+            self.hits = self.misses = self.evictions = 0
+
+
+# Instancia compartida por proceso
+distance_matrix = DistanceMatrixService()
@@ -20,6 +20,8 @@ import requests
 import logging
 from django.conf import settings
 
+from core.executor import call_external
+
 logger = logging.getLogger(__name__)
 
 
@@ -171,7 +173,7 @@ class MapboxGeocodingProvider(GeocodingProvider):
 
         try:
             logger.info(f"Geocodificando dirección: {query}")
-            response = requests.get(url, params=params, timeout=10)
+            response = call_external('mapbox', requests.get, url, params=params, timeout=10)
             response.raise_for_status()
 
             data = response.json()
@@ -251,7 +253,7 @@ class MapboxGeocodingProvider(GeocodingProvider):
 
         try:
             logger.info(f"Reverse geocoding: {latitude}, {longitude}")
-            response = requests.get(url, params=params, timeout=10)
+            response = call_external('mapbox', requests.get, url, params=params, timeout=10)
             response.raise_for_status()
 
             data = response.json()
@@ -0,0 +1,296 @@
+"""
+Búsqueda semántica de negocios por similitud de vectores
+
+Cada negocio publicado tiene un embedding de su texto (nombre, descripciones,
+categoría, tags, características, barrio y comuna) guardado en
+BusinessEmbedding. Solo se recalcula cuando cambia el hash del texto o el
+proveedor, de modo que editar un negocio re-embebe solo ese negocio. Se
+calcula al guardar el negocio, al publicar negocios en lote y con el comando
+embed_businesses; nunca al buscar.
+
+En cada proceso los vectores normalizados se cargan en una matriz NumPy
+contigua (float32) y una consulta es un único producto matriz-vector
+(similitud coseno) más un argpartition para el top-K. La matriz se recarga
+cuando cambia la versión del catálogo (apps/businesses/catalog.py).
+
+El proveedor por defecto es un vectorizador de hashing local (palabras y
+n-gramas de caracteres) sin dependencias ni modelo que descargar. Se puede
+cambiar por un modelo local con SEMANTIC_EMBEDDING_PROVIDER.
+"""
+import hashlib
+import logging
+import threading
+import zlib
+from dataclasses import dataclass
+from typing import List
+
+import numpy as np
+from django.conf import settings
+from django.db.models import F, Q
+from django.utils.module_loading import import_string
+
+from core.utils import SPANISH_STOPWORDS, fold_accents
+from ..catalog import get_catalog_version
+
+logger = logging.getLogger(__name__)
+
+# Peso de los términos de cada campo del texto de un negocio
+FIELD_WEIGHTS = {
+    'name': 2,
+    'category': 2,
+    'tags': 2,
+    'features': 2,
+    'short_description': 1,
+    'description': 1,
+    'neighborhood': 1,
+    'comuna': 1,
+}
+
+# Largos de los n-gramas de caracteres y su peso relativo a la palabra completa
+NGRAM_SIZES = (3, 4, 5)
+NGRAM_WEIGHT = 0.5
+
+
+class HashingEmbeddingProvider:
+    """
+    Embeddings por hashing de palabras y n-gramas de caracteres
+
+    Los n-gramas acercan variantes de una palabra (trabajar/trabajo,
+    tranquilo/tranquila) sin stemming. Cada rasgo suma con signo en una
+    posición del vector según su CRC32; la frecuencia es sublineal y el
+    vector se normaliza a norma 1.
+    """
+
+    def __init__(self, dim=None):
+        self.dim = dim or settings.SEMANTIC_EMBEDDING_DIM
+        self.name = f'hashing-{self.dim}'
+
+    def _features(self, text):
+        for word in fold_accents(text).split():
+            word = ''.join(char for char in word if char.isalnum())
+            if len(word) < 2 or word in SPANISH_STOPWORDS:
+                continue
+            yield word, 1.0
+            padded = f' {word} '
+            for size in NGRAM_SIZES:
+                for start in range(len(padded) - size + 1):
+                    yield padded[start:start + size], NGRAM_WEIGHT
+
+    def embed_one(self, weighted_texts):
+        """Vector de una lista de (texto, peso)"""
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for text, weight in weighted_texts:
+            for feature, feature_weight in self._features(text):
+                hashed = zlib.crc32(feature.encode())
+                sign = 1 if (hashed // self.dim) % 2 else -1
+                vector[hashed % self.dim] += sign * weight * feature_weight
+        vector = np.sign(vector) * np.log1p(np.abs(vector))
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def embed(self, texts) -> np.ndarray:
+        """
+        Embeddings normalizados de varios textos
+
+        Args:
+            texts: Lista de textos, o de listas de (texto, peso)
+
+        Returns:
+            numpy.ndarray (len(texts), dim) float32
+        """
+        return np.vstack([
+            self.embed_one([(text, 1)] if isinstance(text, str) else text)
+            for text in texts
+        ]) if texts else np.empty((0, self.dim), dtype=np.float32)
+
+
+class SentenceTransformerProvider:
+    """Embeddings con un modelo local de sentence-transformers (dependencia opcional)"""
+
+    def __init__(self, model_name=None):
+        try:
+            from sentence_transformers import SentenceTransformer
+        except ImportError:
+            raise ImportError('Instala sentence-transformers para usar SentenceTransformerProvider')
+        model_name = model_name or settings.SEMANTIC_EMBEDDING_MODEL
+        self.model = SentenceTransformer(model_name)
+        self.dim = self.model.get_sentence_embedding_dimension()
+        self.name = f'st-{model_name}'[:100]
+
+    def embed(self, texts) -> np.ndarray:
+        texts = [
+            text if isinstance(text, str) else ' '.join(part for part, _ in text)
+            for text in texts
+        ]
+        return self.model.encode(texts, normalize_embeddings=True).astype(np.float32)
+
+
+_provider = None
+
+
+def get_embedding_provider():
+    """Proveedor configurado en SEMANTIC_EMBEDDING_PROVIDER (uno por proceso)"""
+    global _provider
+    if _provider is None:
+        _provider = import_string(settings.SEMANTIC_EMBEDDING_PROVIDER)()
+    return _provider
+
+
+def business_text(business):
+    """Texto de un negocio como lista de (texto, peso) (requiere category, tags y features)"""
+    fields = {
+        'name': business.name,
+        'category': f'{business.category.name} {business.subcategory}',
+        'tags': ' '.join(tag.name for tag in business.tags.all()),
+        'features': ' '.join(feature.name for feature in business.features.all()),
+        'short_description': business.short_description,
+        'description': business.description,
+        'neighborhood': business.neighborhood,
+        'comuna': business.comuna,
+    }
+    return [(text, FIELD_WEIGHTS[field]) for field, text in fields.items() if text]
+
+
+def _text_hash(weighted_texts):
+    raw = '\n'.join(f'{weight}:{text}' for text, weight in weighted_texts)
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def refresh_business_embeddings(business_ids=None, force=False):
+    """
+    Re-embebe los negocios publicados cuyo texto o proveedor cambió
+
+    Solo revisa los negocios modificados después de su embedding (o sin
+    embedding); de esos, solo llama al proveedor para los que cambió el
+    hash del texto.
+
+    Args:
+        business_ids: Limitar a estos negocios (opcional)
+        force: Revisar todos los negocios aunque no estén modificados
+
+    Returns:
+        Número de negocios re-embebidos
+    """
+    from ..models import Business, BusinessEmbedding
+
+    provider = get_embedding_provider()
+    businesses = Business.objects.filter(is_active=True, status='published')
+    if business_ids is not None:
+        businesses = businesses.filter(id__in=business_ids)
+    if not force:
+        businesses = businesses.filter(
+            Q(embedding__isnull=True)
+            | Q(embedding__updated_at__lt=F('updated_at'))
+            | ~Q(embedding__provider=provider.name)
+        )
+    businesses = list(businesses.select_related('category', 'embedding').prefetch_related('tags', 'features'))
+    if not businesses:
+        return 0
+
+    rows = []
+    pending = []
+    for business in businesses:
+        text = business_text(business)
+        text_hash = _text_hash(text)
+        current = getattr(business, 'embedding', None)
+        row = BusinessEmbedding(business=business, provider=provider.name, text_hash=text_hash)
+        if current and current.provider == provider.name and current.text_hash == text_hash:
+            row.vector = current.vector  # Mismo texto: solo se marca como revisado
+        else:
+            pending.append((row, text))
+        rows.append(row)
+
+    if pending:
+        vectors = provider.embed([text for _, text in pending])
+        for (row, _), vector in zip(pending, vectors):
+            row.vector = np.asarray(vector, dtype=np.float32).tobytes()
+
+    BusinessEmbedding.objects.bulk_create(
+        rows,
+        update_conflicts=True,
+        unique_fields=['business'],
+        update_fields=['provider', 'text_hash', 'vector', 'updated_at'],
+    )
+    if pending:
+        logger.info('Embeddings de negocios: %s re-embebidos de %s revisados', len(pending), len(rows))
+    return len(pending)
+
+
+@dataclass
+class SemanticHit:
+    """
+    Resultado de una búsqueda semántica
+
+    Attributes:
+        business_id: ID del negocio
+        similarity: Similitud coseno con la consulta
+    """
+    business_id: str
+    similarity: float
+
+
+class SemanticIndex:
+    """Matriz contigua de embeddings de negocios publicados, recargada por versión de catálogo"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        # (ids, matriz): se reemplaza completo para lecturas consistentes
+        self._data = ([], None)
+
+    def _ensure_current(self):
+        version = get_catalog_version()
+        if version == self._version:
+            return
+        with self._lock:
+            if version != self._version:
+                # Solo recarga vectores ya calculados: re-embeber no va en una búsqueda
+                self._data = self._load()
+                self._version = version
+
+    def _load(self):
+        from ..models import BusinessEmbedding
+
+        provider = get_embedding_provider()
+        rows = list(
+            BusinessEmbedding.objects
+            .filter(business__is_active=True, business__status='published', provider=provider.name)
+            .values_list('business_id', 'vector')
+        )
+        ids = [str(pk) for pk, _ in rows]
+        matrix = np.empty((len(rows), provider.dim), dtype=np.float32)
+        for index, (_, vector) in enumerate(rows):
+            matrix[index] = np.frombuffer(vector, dtype=np.float32)
+        logger.info('Índice semántico de negocios cargado: %s vectores de %s dimensiones', len(ids), provider.dim)
+        return ids, matrix
+
+    def search(self, query, limit=10, min_similarity=0.05) -> List[SemanticHit]:
+        """
+        Negocios más similares a un texto
+
+        Args:
+            query: Texto de búsqueda
+            limit: Máximo de resultados
+            min_similarity: Similitud mínima para incluir un negocio
+
+        Returns:
+            Lista de SemanticHit ordenada por similitud
+        """
+        self._ensure_current()
+        ids, matrix = self._data
+        if not ids or not query.strip():
+            return []
+
+        similarities = matrix @ get_embedding_provider().embed([query])[0]
+        limit = min(limit, len(ids))
+        top = np.argpartition(-similarities, limit - 1)[:limit]
+        top = top[np.argsort(-similarities[top], kind='stable')]
+        return [
+            SemanticHit(business_id=ids[index], similarity=round(float(similarities[index]), 4))
+            for index in top
+            if similarities[index] >= min_similarity
+        ]
+
+
+# Instancia compartida por proceso
+semantic_index = SemanticIndex()
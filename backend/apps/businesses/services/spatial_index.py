@@ -0,0 +1,221 @@
+"""
+Índice espacial en memoria de negocios publicados
+
+Grilla regular en grados sobre las coordenadas de los negocios activos y
+publicados, con los arreglos de coordenadas en NumPy. Se construye una vez
+por proceso y se reconstruye cuando cambia la versión del catálogo
+(apps/businesses/catalog.py).
+
+Soporta búsqueda por radio (within) y de corredor (along). La búsqueda de
+corredor (negocios cerca de una polilínea) usa:
+1. Prefiltro por celdas de la grilla que tocan el bounding box de cada
+   segmento, ampliado por el buffer.
+2. Distancia punto-segmento vectorizada (candidatos x segmentos) en una
+   proyección local equirectangular, suficiente a escala de ciudad.
+3. Costo de desvío: d(A, P) + d(P, B) - d(A, B) del mejor segmento.
+"""
+import logging
+import threading
+from dataclasses import dataclass
+from math import cos, radians
+from typing import List
+
+import numpy as np
+
+from ..catalog import get_catalog_version
+
+logger = logging.getLogger(__name__)
+
+# Tamaño de celda de la grilla (~550 m en latitud)
+CELL_SIZE_DEG = 0.005
+
+# Metros por grado de latitud
+METERS_PER_DEG_LAT = 110574
+
+
+@dataclass
+class CorridorMatch:
+    """
+    Negocio cercano a una polilínea
+
+    Attributes:
+        business_id: ID del negocio
+        distance_m: Distancia a la polilínea en metros
+        detour_m: Metros extra de pasar por el negocio en el mejor tramo
+        segment: Índice del tramo (entre la parada segment y segment + 1)
+    """
+    business_id: str
+    distance_m: float
+    detour_m: float
+    segment: int
+
+
+class BusinessSpatialIndex:
+    """Grilla de negocios publicados reconstruida por versión de catálogo"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        # (ids, lats, lngs, cells): se reemplaza completo para lecturas consistentes
+        self._data = ([], np.empty(0), np.empty(0), {})
+
+    def _ensure_current(self):
+        version = get_catalog_version()
+        if version == self._version:
+            return
+        with self._lock:
+            if version != self._version:
+                self._data = self._build()
+                self._version = version
+
+    def _build(self):
+        from ..models import Business
+
+        rows = list(
+            Business.objects
+            .filter(is_active=True, status='published')
+            .values_list('id', 'latitude', 'longitude')
+        )
+        ids = [str(pk) for pk, _, _ in rows]
+        lats = np.array([float(lat) for _, lat, _ in rows])
+        lngs = np.array([float(lng) for _, _, lng in rows])
+
+        cells = {}
+        keys = zip(np.floor(lats / CELL_SIZE_DEG).astype(int), np.floor(lngs / CELL_SIZE_DEG).astype(int))
+        for index, key in enumerate(keys):
+            cells.setdefault(key, []).append(index)
+
+        logger.info('Índice espacial de negocios construido: %s negocios, %s celdas', len(ids), len(cells))
+        return ids, lats, lngs, {key: np.array(indexes) for key, indexes in cells.items()}
+
+    @staticmethod
+    def _candidates(cells, lat_min, lat_max, lng_min, lng_max):
+        """Índices de negocios en las celdas que tocan el bounding box"""
+        i_min, i_max = int(np.floor(lat_min / CELL_SIZE_DEG)), int(np.floor(lat_max / CELL_SIZE_DEG))
+        j_min, j_max = int(np.floor(lng_min / CELL_SIZE_DEG)), int(np.floor(lng_max / CELL_SIZE_DEG))
+        if (i_max - i_min + 1) * (j_max - j_min + 1) > len(cells):
+            # Bounding box más grande que el catálogo: recorrer solo las celdas ocupadas
+            found = [
+                cell for (i, j), cell in cells.items()
+                if i_min <= i <= i_max and j_min <= j <= j_max
+            ]
+        else:
+            found = [
+                cells[(i, j)]
+                for i in range(i_min, i_max + 1)
+                for j in range(j_min, j_max + 1)
+                if (i, j) in cells
+            ]
+        return np.concatenate(found) if found else np.empty(0, dtype=int)
+
+    def within(self, lat, lng, radius_m) -> List[str]:
+        """
+        IDs de negocios publicados a menos de radius_m metros de un punto
+
+        Args:
+            lat: Latitud del centro
+            lng: Longitud del centro
+            radius_m: Radio en metros
+        """
+        self._ensure_current()
+        ids, lats, lngs, cells = self._data
+        if not ids:
+            return []
+
+        meters_per_deg_lng = METERS_PER_DEG_LAT * cos(radians(lat))
+        radius_lat = radius_m / METERS_PER_DEG_LAT
+        radius_lng = radius_m / meters_per_deg_lng
+        candidates = self._candidates(cells, lat - radius_lat, lat + radius_lat, lng - radius_lng, lng + radius_lng)
+        if not len(candidates):
+            return []
+
+        distance = np.hypot(
+            (lngs[candidates] - lng) * meters_per_deg_lng,
+            (lats[candidates] - lat) * METERS_PER_DEG_LAT
+        )
+        return [ids[index] for index in candidates[distance <= radius_m]]
+
+    def along(self, points, buffer_m, exclude_ids=(), limit=20) -> List[CorridorMatch]:
+        """
+        Negocios publicados a menos de buffer_m metros de la polilínea
+
+        Args:
+            points: Lista de (lat, lng) en orden
+            buffer_m: Distancia máxima a la polilínea en metros
+            exclude_ids: IDs de negocios a excluir (las paradas de la ruta)
+            limit: Máximo de resultados
+
+        Returns:
+            Lista de CorridorMatch ordenada por costo de desvío
+        """
+        self._ensure_current()
+        ids, lats, lngs, cells = self._data
+        if not points or not ids:
+            return []
+
+        path = np.array([(float(lat), float(lng)) for lat, lng in points])
+        if len(path) == 1:
+            path = np.vstack([path, path])
+
+        # Proyección local en metros
+        meters_per_deg_lng = METERS_PER_DEG_LAT * cos(radians(path[:, 0].mean()))
+        buffer_lat = buffer_m / METERS_PER_DEG_LAT
+        buffer_lng = buffer_m / meters_per_deg_lng
+
+        starts, ends = path[:-1], path[1:]
+        candidates = np.unique(np.concatenate([
+            self._candidates(
+                cells,
+                min(a[0], b[0]) - buffer_lat, max(a[0], b[0]) + buffer_lat,
+                min(a[1], b[1]) - buffer_lng, max(a[1], b[1]) + buffer_lng
+            )
+            for a, b in zip(starts, ends)
+        ]))
+        if not len(candidates):
+            return []
+
+        def project(lat, lng):
+            return lng * meters_per_deg_lng, lat * METERS_PER_DEG_LAT
+
+        px, py = project(lats[candidates], lngs[candidates])
+        ax, ay = project(starts[:, 0], starts[:, 1])
+        bx, by = project(ends[:, 0], ends[:, 1])
+
+        # Distancia punto-segmento: candidatos (filas) x segmentos (columnas)
+        dx, dy = bx - ax, by - ay
+        length_sq = dx ** 2 + dy ** 2
+        t = ((px[:, None] - ax) * dx + (py[:, None] - ay) * dy) / np.where(length_sq > 0, length_sq, 1)
+        t = np.clip(t, 0, 1)
+        distance = np.hypot(px[:, None] - (ax + t * dx), py[:, None] - (ay + t * dy))
+
+        to_start = np.hypot(px[:, None] - ax, py[:, None] - ay)
+        to_end = np.hypot(px[:, None] - bx, py[:, None] - by)
+        detour = to_start + to_end - np.sqrt(length_sq)
+        detour = np.where(distance <= buffer_m, detour, np.inf)
+
+        best_segment = np.argmin(detour, axis=1)
+        rows = np.arange(len(candidates))
+        best_detour = detour[rows, best_segment]
+        best_distance = distance[rows, best_segment]
+
+        excluded = {str(pk) for pk in exclude_ids}
+        matches = []
+        for row in np.argsort(best_detour, kind='stable'):
+            if not np.isfinite(best_detour[row]):
+                break
+            business_id = ids[candidates[row]]
+            if business_id in excluded:
+                continue
+            matches.append(CorridorMatch(
+                business_id=business_id,
+                distance_m=round(float(best_distance[row]), 1),
+                detour_m=round(float(best_detour[row]), 1),
+                segment=int(best_segment[row]),
+            ))
+            if len(matches) >= limit:
+                break
+        return matches
+
+
+# Instancia compartida por proceso
+spatial_index = BusinessSpatialIndex()
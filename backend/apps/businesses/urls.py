@@ -10,6 +10,8 @@ urlpatterns = [
     # Geocodificación (debe ir antes de las rutas con slug)
     path('geocode/', views.geocode_address, name='geocode-address'),
     path('reverse-geocode/', views.reverse_geocode, name='reverse-geocode'),
+    path('semantic-search/', views.semantic_search, name='semantic-search'),
+    path('distance-matrix/stats/', views.distance_matrix_stats, name='distance-matrix-stats'),
 
     # Businesses públicos
     path('', views.BusinessListView.as_view(), name='business-list'),
@@ -1,11 +1,13 @@
 from rest_framework import generics, status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticatedOrReadOnly, IsAuthenticated, AllowAny
+from rest_framework.permissions import IsAuthenticatedOrReadOnly, IsAuthenticated, IsAdminUser, AllowAny
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.filters import SearchFilter, OrderingFilter
 from django.db.models import Q
 from .models import Business, Category, Feature, Favorite, Visit, BusinessOwnerProfile
+from .ranking import refresh_rank_scores
+from core.executor import ServiceUnavailableError
 from .serializers import (
     BusinessListSerializer, BusinessDetailSerializer,
     CategorySerializer, FeatureSerializer, FavoriteSerializer, VisitSerializer,
@@ -26,7 +28,8 @@ class BusinessListView(generics.ListAPIView):
     permission_classes = [IsAuthenticatedOrReadOnly]
     filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
     search_fields = ['name', 'description', 'neighborhood']
-    ordering_fields = ['rating', 'review_count', 'created_at']
+    ordering_fields = ['rank_score', 'rating', 'review_count', 'created_at']
+    ordering = ['-rank_score', 'id']  # id desempata (páginas estables); usa businesses_rank_score_idx
     
     def get_queryset(self):
         queryset = Business.objects.filter(is_active=True, status='published').select_related('category').prefetch_related('features')
@@ -57,6 +60,8 @@ class BusinessListView(generics.ListAPIView):
             feature_list = features.split(',')
             for feature in feature_list:
                 queryset = queryset.filter(features__slug=feature)
+            # Solo el join con features puede duplicar filas
+            queryset = queryset.distinct()
         
         # Filtro por búsqueda de texto
         search = self.request.query_params.get('search')
@@ -74,7 +79,7 @@ class BusinessListView(generics.ListAPIView):
             # TODO: Implementar ordenamiento por distancia
             pass
         
-        return queryset.distinct()
+        return queryset
     
     def get_serializer_context(self):
         """Pasar lat/lng al serializer para cálculo de distancia"""
@@ -151,6 +156,7 @@ def favorite_business(request, business_id):
     if created:
         # Incrementar contador
         Business.objects.filter(id=business_id).update(favorites_count=models.F('favorites_count') + 1)
+        refresh_rank_scores([business_id])
         
         return Response({
             'success': True,
@@ -176,6 +182,7 @@ def unfavorite_business(request, business_id):
         
         # Decrementar contador
         Business.objects.filter(id=business_id).update(favorites_count=models.F('favorites_count') - 1)
+        refresh_rank_scores([business_id])
         
         return Response({
             'success': True,
@@ -471,6 +478,8 @@ def geocode_address(request):
             'success': False,
             'error': str(e)
         }, status=status.HTTP_400_BAD_REQUEST)
+    except ServiceUnavailableError:
+        raise  # 503 del bulkhead de Mapbox
     except Exception as e:
         # Log error para debugging
         import logging
@@ -564,6 +573,8 @@ def reverse_geocode(request):
             'success': False,
             'error': str(e)
         }, status=status.HTTP_400_BAD_REQUEST)
+    except ServiceUnavailableError:
+        raise  # 503 del bulkhead de Mapbox
     except Exception as e:
         # Log error para debugging
         import logging
@@ -607,7 +618,7 @@ def track_business_view(request, business_id):
 @permission_classes([IsAuthenticated])
 def get_business_analytics(request, business_id):
     """Get analytics data for business dashboard"""
-    from .models import BusinessView, Favorite
+    from .models import BusinessView, BusinessViewDaily, Favorite
     from apps.reviews.models import Review
     from django.db.models import Count
     from django.db.models.functions import TruncDate
@@ -666,6 +677,11 @@ def get_business_analytics(request, business_id):
     days_es = ['Dom', 'Lun', 'Mar', 'Mié', 'Jue', 'Vie', 'Sáb']
     
     views_dict = {v['date']: v['count'] for v in views_by_day}
+    
+    # Sumar días ya compactados por compact_business_views
+    compacted_views = BusinessViewDaily.objects.filter(business=business, date__gte=start_date)
+    for daily in compacted_views:
+        views_dict[daily.date] = views_dict.get(daily.date, 0) + daily.views
     favorites_dict = {f['date']: f['count'] for f in favorites_by_day}
     reviews_dict = {r['date']: r['count'] for r in reviews_by_day}
     
@@ -697,3 +713,65 @@ def get_business_analytics(request, business_id):
             }
         }
     })
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticatedOrReadOnly])
+def semantic_search(request):
+    """
+    Búsqueda semántica de negocios publicados
+
+    GET /api/businesses/semantic-search/?q=lugar tranquilo para trabajar con wifi&limit=10
+
+    Response (200 OK):
+    {
+        "success": true,
+        "data": [{...negocio, "similarity": 0.42}, ...]
+    }
+    """
+    from .services.semantic_search import semantic_index
+
+    query = request.query_params.get('q', '').strip()
+    if not query:
+        return Response({
+            'success': False,
+            'error': 'El parámetro "q" es requerido'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        limit = min(max(int(request.query_params.get('limit', 10)), 1), 50)
+    except ValueError:
+        limit = 10
+
+    hits = semantic_index.search(query, limit=limit)
+    businesses = {
+        str(business.id): business
+        for business in Business.objects.filter(id__in=[hit.business_id for hit in hits])
+        .select_related('category').prefetch_related('features')
+    }
+
+    results = []
+    for hit in hits:
+        business = businesses.get(hit.business_id)
+        if business is None:
+            continue
+        data = BusinessListSerializer(business, context={'request': request}).data
+        data['similarity'] = hit.similarity
+        results.append(data)
+
+    return Response({
+        'success': True,
+        'data': results
+    })
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def distance_matrix_stats(request):
+    """Métricas del caché de matrices de distancia (del worker que atiende la consulta)"""
+    from .services.distance_matrix import distance_matrix
+
+    return Response({
+        'success': True,
+        'data': distance_matrix.stats()
+    }, status=status.HTTP_200_OK)
@@ -7,6 +7,8 @@ import cloudinary.uploader
 from django.conf import settings
 from typing import Dict, Optional
 
+from core.executor import ServiceUnavailableError, call_external
+
 
 class CloudinaryService:
     """Servicio para gestión de imágenes con Cloudinary"""
@@ -33,7 +35,9 @@ class CloudinaryService:
         """
         try:
             # Upload con transformaciones optimizadas para avatares
-            result = cloudinary.uploader.upload(
+            result = call_external(
+                'cloudinary',
+                cloudinary.uploader.upload,
                 file,
                 folder=f"rutago/profiles",
                 public_id=f"user_{user_id}",
@@ -54,6 +58,8 @@ class CloudinaryService:
                 'thumbnail_url': result['eager'][0]['secure_url'] if result.get('eager') else result['secure_url'],
                 'public_id': result['public_id']
             }
+        except ServiceUnavailableError:
+            raise
         except Exception as e:
             raise Exception(f"Error al subir foto de perfil: {str(e)}")
 
@@ -70,7 +76,9 @@ class CloudinaryService:
             Dict con url, secure_url y public_id de la imagen
         """
         try:
-            result = cloudinary.uploader.upload(
+            result = call_external(
+                'cloudinary',
+                cloudinary.uploader.upload,
                 file,
                 folder=f"rutago/businesses/{business_id}",
                 public_id=f"photo_{photo_index}",
@@ -94,6 +102,8 @@ class CloudinaryService:
                 'small_thumbnail_url': result['eager'][1]['secure_url'] if len(result.get('eager', [])) > 1 else result['secure_url'],
                 'public_id': result['public_id']
             }
+        except ServiceUnavailableError:
+            raise
         except Exception as e:
             raise Exception(f"Error al subir foto de negocio: {str(e)}")
 
@@ -108,8 +118,10 @@ class CloudinaryService:
             True si se eliminó correctamente
         """
         try:
-            result = cloudinary.uploader.destroy(public_id)
+            result = call_external('cloudinary', cloudinary.uploader.destroy, public_id)
             return result.get('result') == 'ok'
+        except ServiceUnavailableError:
+            raise
         except Exception as e:
             raise Exception(f"Error al eliminar imagen: {str(e)}")
 
@@ -7,6 +7,7 @@ from rest_framework.decorators import api_view, permission_classes, parser_class
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.parsers import MultiPartParser, FormParser
+from core.executor import ServiceUnavailableError
 from .services import get_cloudinary_service
 from .serializers import ProfilePictureUploadSerializer, BusinessPhotoUploadSerializer
 from apps.authentication.models import User
@@ -56,6 +57,8 @@ def upload_profile_picture(request):
             }
         }, status=status.HTTP_200_OK)
 
+    except ServiceUnavailableError:
+        raise  # 503 del bulkhead de Cloudinary
     except Exception as e:
         return Response({
             'error': str(e),
@@ -105,6 +108,8 @@ def upload_business_photo_temp(request):
             }
         }, status=status.HTTP_200_OK)
     
+    except ServiceUnavailableError:
+        raise  # 503 del bulkhead de Cloudinary
     except Exception as e:
         import traceback
         error_detail = traceback.format_exc()
@@ -182,6 +187,8 @@ def upload_business_photo(request, business_id):
             }
         }, status=status.HTTP_200_OK)
 
+    except ServiceUnavailableError:
+        raise  # 503 del bulkhead de Cloudinary
     except Exception as e:
         return Response({
             'error': str(e),
@@ -221,6 +228,8 @@ def delete_profile_picture(request):
             'message': 'Foto de perfil eliminada correctamente'
         }, status=status.HTTP_200_OK)
 
+    except ServiceUnavailableError:
+        raise  # 503 del bulkhead de Cloudinary
     except Exception as e:
         return Response({
             'error': str(e),
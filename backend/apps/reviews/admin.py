@@ -1,5 +1,7 @@
 from django.contrib import admin
-from .models import Review, ReviewHelpful
+from django.db import transaction
+from .models import Review, ReviewHelpful, ReviewStats, defer_review_stats
+from .services import recompute_review_stats, set_reviews_approval
 
 
 @admin.register(Review)
@@ -9,6 +11,7 @@ class ReviewAdmin(admin.ModelAdmin):
     search_fields = ['user__email', 'business__name', 'title', 'comment']
     readonly_fields = ['helpful_count', 'created_at', 'updated_at']
     date_hierarchy = 'created_at'
+    actions = ['approve_reviews', 'reject_reviews']
     
     fieldsets = (
         ('Usuario y Negocio', {
@@ -24,6 +27,33 @@ class ReviewAdmin(admin.ModelAdmin):
             'fields': ('created_at', 'updated_at')
         }),
     )
+    
+    def delete_queryset(self, request, queryset):
+        # Borrado en bloque y recálculo de estadísticas una vez por negocio
+        with transaction.atomic(), defer_review_stats():
+            business_ids = set(queryset.values_list('business_id', flat=True))
+            queryset.delete()
+            recompute_review_stats(business_ids)
+    
+    def approve_reviews(self, request, queryset):
+        updated = set_reviews_approval(queryset, True)
+        self.message_user(request, f"{updated} reseñas aprobadas")
+    approve_reviews.short_description = "✅ Aprobar reseñas"
+    
+    def reject_reviews(self, request, queryset):
+        updated = set_reviews_approval(queryset, False)
+        self.message_user(request, f"{updated} reseñas rechazadas")
+    reject_reviews.short_description = "❌ Rechazar reseñas"
+
+
+@admin.register(ReviewStats)
+class ReviewStatsAdmin(admin.ModelAdmin):
+    list_display = ['business', 'total', 'average_rating', 'count_1', 'count_2', 'count_3', 'count_4', 'count_5']
+    search_fields = ['business__name']
+    readonly_fields = ['business', 'total', 'rating_sum', 'count_1', 'count_2', 'count_3', 'count_4', 'count_5']
+    
+    def has_add_permission(self, request):
+        return False  # Se mantienen automáticamente
 
 
 @admin.register(ReviewHelpful)
@@ -0,0 +1,284 @@
+"""
+Importación masiva de reseñas
+
+Lee reseñas desde archivos CSV o NDJSON (un objeto JSON por línea) sin
+cargarlos completos en memoria, las valida por lotes y las inserta con
+bulk_create. Las estadísticas y el rating de los negocios se recalculan
+una sola vez al final, por negocio afectado.
+
+Columnas / claves esperadas por fila:
+    user_email (requerido), business_slug o business_id (requerido),
+    rating (1-5), comment (requerido), title, would_recommend,
+    is_approved, is_verified_visit, created_at (ISO 8601)
+"""
+import csv
+import json
+import logging
+import uuid
+from dataclasses import dataclass, field
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from apps.businesses.models import Business
+from .models import Review
+from .services import recompute_review_stats
+
+logger = logging.getLogger(__name__)
+
+User = get_user_model()
+
+TRUE_VALUES = {'1', 'true', 't', 'yes', 'si', 'sí', 'y'}
+FALSE_VALUES = {'0', 'false', 'f', 'no', 'n'}
+
+# Máximo de errores que se guardan con detalle (el total se cuenta siempre)
+MAX_REPORTED_ERRORS = 100
+
+
+class RowError(ValueError):
+    """Fila inválida; el mensaje se reporta junto al número de línea"""
+
+
+@dataclass
+class ImportResult:
+    """
+    Resultado de una importación
+
+    Attributes:
+        created: Reseñas insertadas
+        skipped: Filas omitidas por duplicadas (usuario ya reseñó el negocio)
+        error_count: Filas inválidas
+        errors: Detalle (línea, mensaje) de los primeros errores
+    """
+    created: int = 0
+    skipped: int = 0
+    error_count: int = 0
+    errors: List[Tuple[int, str]] = field(default_factory=list)
+
+    def add_error(self, line, message):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((line, message))
+
+
+def iter_csv_rows(file) -> Iterator[Tuple[int, Dict]]:
+    """Itera (número de línea, fila) de un archivo CSV con encabezado"""
+    reader = csv.DictReader(file)
+    for row in reader:
+        yield reader.line_num, row
+
+
+def iter_ndjson_rows(file) -> Iterator[Tuple[int, Dict]]:
+    """Itera (número de línea, objeto) de un archivo NDJSON"""
+    for line_num, line in enumerate(file, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            data = json.loads(line)
+        except json.JSONDecodeError as e:
+            yield line_num, RowError(f'JSON inválido: {e.msg}')
+            continue
+        if not isinstance(data, dict):
+            yield line_num, RowError('Se esperaba un objeto JSON')
+            continue
+        yield line_num, data
+
+
+def _parse_bool(value, default):
+    if value is None or value == '':
+        return default
+    if isinstance(value, bool):
+        return value
+    text = str(value).strip().lower()
+    if text in TRUE_VALUES:
+        return True
+    if text in FALSE_VALUES:
+        return False
+    raise RowError(f'Valor booleano inválido: {value!r}')
+
+
+def _clean_row(row):
+    """Normaliza y valida los campos propios de la reseña"""
+    email = (row.get('user_email') or '').strip()
+    if not email:
+        raise RowError('Falta user_email')
+
+    business_slug = (row.get('business_slug') or '').strip()
+    business_id = str(row.get('business_id') or '').strip()
+    if not business_slug and not business_id:
+        raise RowError('Falta business_slug o business_id')
+    if business_id:
+        try:
+            business_id = str(uuid.UUID(business_id))
+        except ValueError:
+            raise RowError(f'business_id inválido: {business_id!r}')
+
+    try:
+        rating = int(row.get('rating'))
+    except (TypeError, ValueError):
+        raise RowError(f'rating inválido: {row.get("rating")!r}')
+    if not 1 <= rating <= 5:
+        raise RowError('rating debe estar entre 1 y 5')
+
+    comment = (row.get('comment') or '').strip()
+    if not comment:
+        raise RowError('Falta comment')
+
+    title = (row.get('title') or '').strip()
+    if len(title) > 200:
+        raise RowError('title supera los 200 caracteres')
+
+    created_at = row.get('created_at') or None
+    if created_at:
+        try:
+            created_at = parse_datetime(str(created_at).strip())
+        except ValueError:
+            # Formato correcto pero fecha imposible (ej. 2024-02-30)
+            created_at = None
+        if created_at is None:
+            raise RowError(f'created_at inválido: {row.get("created_at")!r}')
+        if timezone.is_naive(created_at):
+            created_at = timezone.make_aware(created_at)
+
+    return {
+        'email': email,
+        'business_slug': business_slug,
+        'business_id': business_id,
+        'rating': rating,
+        'comment': comment,
+        'title': title,
+        'would_recommend': _parse_bool(row.get('would_recommend'), True),
+        'is_approved': _parse_bool(row.get('is_approved'), True),
+        'is_verified_visit': _parse_bool(row.get('is_verified_visit'), False),
+        'created_at': created_at,
+    }
+
+
+def import_reviews(rows: Iterable[Tuple[int, Dict]], batch_size=500, dry_run=False) -> ImportResult:
+    """
+    Importa reseñas en lotes
+
+    Por lote: valida las filas, resuelve usuarios y negocios con una consulta
+    cada uno, descarta duplicados (ya existentes o repetidos en el archivo) e
+    inserta con bulk_create. Al terminar recalcula las estadísticas de los
+    negocios afectados con recompute_review_stats.
+
+    Args:
+        rows: Iterable de (número de línea, fila); ver iter_csv_rows / iter_ndjson_rows
+        batch_size: Filas por lote
+        dry_run: Si es True valida todo pero no escribe
+
+    Returns:
+        ImportResult
+    """
+    result = ImportResult()
+    seen_pairs = set()
+    affected_business_ids = set()
+
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, batch_size))
+        if not batch:
+            break
+        created_ids = _import_batch(batch, result, seen_pairs, dry_run)
+        affected_business_ids.update(created_ids)
+
+    if affected_business_ids and not dry_run:
+        recompute_review_stats(affected_business_ids)
+
+    logger.info(
+        'Importación de reseñas: %s creadas, %s duplicadas, %s con errores',
+        result.created, result.skipped, result.error_count
+    )
+    return result
+
+
+def _import_batch(batch, result, seen_pairs, dry_run):
+    """Valida e inserta un lote; retorna los IDs de negocios con reseñas nuevas"""
+    cleaned = []
+    for line, row in batch:
+        if isinstance(row, Exception):
+            result.add_error(line, str(row))
+            continue
+        try:
+            cleaned.append((line, _clean_row(row)))
+        except RowError as e:
+            result.add_error(line, str(e))
+
+    users = dict(
+        User.objects.filter(email__in={data['email'] for _, data in cleaned}).values_list('email', 'id')
+    )
+    slugs = dict(
+        Business.objects
+        .filter(slug__in={data['business_slug'] for _, data in cleaned if data['business_slug']})
+        .values_list('slug', 'id')
+    )
+    known_ids = {
+        str(pk) for pk in Business.objects
+        .filter(pk__in={data['business_id'] for _, data in cleaned if data['business_id']})
+        .values_list('id', flat=True)
+    }
+
+    resolved = []
+    for line, data in cleaned:
+        user_id = users.get(data['email'])
+        if user_id is None:
+            result.add_error(line, f'Usuario no encontrado: {data["email"]}')
+            continue
+        if data['business_id']:
+            business_id = data['business_id'] if data['business_id'] in known_ids else None
+        else:
+            business_id = slugs.get(data['business_slug'])
+        if business_id is None:
+            result.add_error(line, f'Negocio no encontrado: {data["business_id"] or data["business_slug"]}')
+            continue
+        resolved.append((line, user_id, uuid.UUID(str(business_id)), data))
+
+    existing_pairs = set(
+        Review.objects
+        .filter(user_id__in={r[1] for r in resolved}, business_id__in={r[2] for r in resolved})
+        .values_list('user_id', 'business_id')
+    )
+
+    reviews = []
+    dated = []
+    for line, user_id, business_id, data in resolved:
+        pair = (user_id, business_id)
+        if pair in existing_pairs or pair in seen_pairs:
+            result.skipped += 1
+            continue
+        seen_pairs.add(pair)
+
+        review = Review(
+            user_id=user_id,
+            business_id=business_id,
+            rating=data['rating'],
+            title=data['title'],
+            comment=data['comment'],
+            would_recommend=data['would_recommend'],
+            is_approved=data['is_approved'],
+            is_verified_visit=data['is_verified_visit'],
+        )
+        reviews.append(review)
+        if data['created_at']:
+            dated.append((review, data['created_at']))
+
+    if dry_run or not reviews:
+        result.created += len(reviews)
+        return set()
+
+    with transaction.atomic():
+        Review.objects.bulk_create(reviews)
+        if dated:
+            # created_at es auto_now_add: conservar la fecha original en un segundo paso
+            for review, created_at in dated:
+                review.created_at = created_at
+            Review.objects.bulk_update([review for review, _ in dated], ['created_at'])
+
+    result.created += len(reviews)
+    return {review.business_id for review in reviews}
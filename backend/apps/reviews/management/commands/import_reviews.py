@@ -0,0 +1,84 @@
+"""
+Management command para importar reseñas en bloque desde CSV o NDJSON
+
+Lee el archivo en streaming, valida e inserta por lotes con bulk_create y
+recalcula el rating de cada negocio afectado una sola vez al final (en vez
+de una agregación por reseña vía Review.save()).
+
+Uso:
+    python manage.py import_reviews reviews.csv
+    python manage.py import_reviews reviews.ndjson --batch-size 1000
+    python manage.py import_reviews export.txt --format ndjson --dry-run
+"""
+
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.reviews.importer import import_reviews, iter_csv_rows, iter_ndjson_rows
+
+READERS = {
+    'csv': iter_csv_rows,
+    'ndjson': iter_ndjson_rows,
+}
+
+EXTENSIONS = {
+    '.csv': 'csv',
+    '.ndjson': 'ndjson',
+    '.jsonl': 'ndjson',
+}
+
+
+class Command(BaseCommand):
+    help = 'Importa reseñas en bloque desde un archivo CSV o NDJSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Ruta del archivo a importar')
+        parser.add_argument(
+            '--format',
+            choices=sorted(READERS),
+            help='Formato del archivo (por defecto se deduce de la extensión)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Filas a validar e insertar por lote (default: 500)',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Valida el archivo sin escribir en la base de datos',
+        )
+
+    def handle(self, *args, **options):
+        path = Path(options['path'])
+        batch_size = options['batch_size']
+        dry_run = options['dry_run']
+
+        if not path.is_file():
+            raise CommandError(f'No existe el archivo: {path}')
+        if batch_size < 1:
+            raise CommandError('--batch-size debe ser al menos 1')
+
+        fmt = options['format'] or EXTENSIONS.get(path.suffix.lower())
+        if not fmt:
+            raise CommandError('No se pudo deducir el formato; usa --format csv|ndjson')
+
+        self.stdout.write(self.style.WARNING(f'Importando reseñas desde {path} ({fmt})...'))
+
+        with path.open(encoding='utf-8-sig', newline='') as file:
+            result = import_reviews(READERS[fmt](file), batch_size=batch_size, dry_run=dry_run)
+
+        for line, message in sorted(result.errors):
+            self.stdout.write(self.style.ERROR(f'  Línea {line}: {message}'))
+        if result.error_count > len(result.errors):
+            self.stdout.write(self.style.ERROR(
+                f'  ... y {result.error_count - len(result.errors)} errores más'
+            ))
+
+        prefix = '[DRY RUN] ' if dry_run else ''
+        self.stdout.write(self.style.SUCCESS(
+            f'\n{prefix}✓ {result.created} reseñas importadas, '
+            f'{result.skipped} duplicadas omitidas, {result.error_count} filas con errores'
+        ))
@@ -0,0 +1,54 @@
+# Generated by Django 5.0.1 on 2026-10-19 14:49
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+
+
+def backfill_review_stats(apps, schema_editor):
+    """Calcula las estadísticas iniciales desde las reseñas aprobadas existentes"""
+    Review = apps.get_model('reviews', 'Review')
+    ReviewStats = apps.get_model('reviews', 'ReviewStats')
+
+    rows = (
+        Review.objects
+        .filter(is_approved=True)
+        .values('business_id')
+        .annotate(
+            total=Count('id'),
+            rating_sum=Sum('rating'),
+            **{f'count_{i}': Count('id', filter=Q(rating=i)) for i in range(1, 6)}
+        )
+        .order_by()
+    )
+    ReviewStats.objects.bulk_create([ReviewStats(**row) for row in rows], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('businesses', '0006_business_views_daily'),
+        ('reviews', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReviewStats',
+            fields=[
+                ('business', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='review_stats', serialize=False, to='businesses.business')),
+                ('total', models.IntegerField(default=0, verbose_name='Reseñas aprobadas')),
+                ('rating_sum', models.IntegerField(default=0, verbose_name='Suma de calificaciones')),
+                ('count_1', models.IntegerField(default=0)),
+                ('count_2', models.IntegerField(default=0)),
+                ('count_3', models.IntegerField(default=0)),
+                ('count_4', models.IntegerField(default=0)),
+                ('count_5', models.IntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Estadísticas de reseñas',
+                'verbose_name_plural': 'Estadísticas de reseñas',
+                'db_table': 'review_stats',
+            },
+        ),
+        migrations.RunPython(backfill_review_stats, migrations.RunPython.noop),
+    ]
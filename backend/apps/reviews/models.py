@@ -1,10 +1,32 @@
 import uuid
-from django.db import models
+from contextlib import contextmanager
+from contextvars import ContextVar
+from django.db import models, transaction
+from django.db.models.signals import post_delete, pre_delete
+from django.dispatch import receiver
 from django.contrib.auth import get_user_model
 from apps.businesses.models import Business
 
 User = get_user_model()
 
+# Activo durante borrados en bloque que recalculan las estadísticas al final
+_stats_deferred = ContextVar('review_stats_deferred', default=False)
+
+
+@contextmanager
+def defer_review_stats():
+    """
+    Omite el descuento por reseña de los borrados dentro del bloque
+    
+    Para borrados en bloque: quien lo usa debe llamar a
+    services.recompute_review_stats con los negocios afectados.
+    """
+    token = _stats_deferred.set(True)
+    try:
+        yield
+    finally:
+        _stats_deferred.reset(token)
+
 
 class Review(models.Model):
     """Reseñas de negocios"""
@@ -48,10 +70,107 @@ class Review(models.Model):
     def __str__(self):
         return f"{self.user.email} - {self.business.name} ({self.rating}⭐)"
     
+    @property
+    def counted_rating(self):
+        """Rating con que la reseña aporta a las estadísticas (None si no está aprobada)"""
+        return self.rating if self.is_approved else None
+    
+    def _locked_counted_rating(self):
+        """
+        Rating con que la reseña cuenta en la base de datos, bloqueando la fila
+        
+        Debe llamarse dentro de la transacción del cambio: una edición
+        concurrente espera el bloqueo y lee el valor ya actualizado, así cada
+        delta parte del valor que realmente está en ReviewStats.
+        """
+        stored = Review.objects.select_for_update().filter(pk=self.pk).values('rating', 'is_approved').first()
+        if not stored or not stored['is_approved']:
+            return None
+        return stored['rating']
+    
     def save(self, *args, **kwargs):
-        super().save(*args, **kwargs)
-        # Actualizar rating del negocio
-        self.business.update_rating()
+        from .services import apply_review_change
+        
+        with transaction.atomic():
+            previous = None if self._state.adding else self._locked_counted_rating()
+            super().save(*args, **kwargs)
+            apply_review_change(self.business_id, previous, self.counted_rating)
+
+
+@receiver(pre_delete, sender=Review)
+def _lock_deleted_review(sender, instance, **kwargs):
+    """Lee (con bloqueo) el rating con que cuenta la reseña antes de eliminarla"""
+    if _stats_deferred.get():
+        return
+    instance._deleted_counted_rating = instance._locked_counted_rating()
+
+
+@receiver(post_delete, sender=Review)
+def _discount_deleted_review(sender, instance, origin=None, **kwargs):
+    """
+    Descuenta la reseña eliminada de las estadísticas de su negocio
+    
+    Cubre delete(), QuerySet.delete() y las eliminaciones en cascada (ej. al
+    eliminar el usuario). Si se elimina el negocio, sus estadísticas se
+    eliminan con él y no hay nada que descontar; dentro de
+    defer_review_stats() las recalcula quien borra.
+    """
+    from .services import apply_review_change
+    
+    if _stats_deferred.get() or getattr(origin, 'model', type(origin)) is Business:
+        return
+    apply_review_change(instance.business_id, getattr(instance, '_deleted_counted_rating', None), None)
+
+
+class ReviewStats(models.Model):
+    """
+    Estadísticas de reseñas aprobadas por negocio.
+    
+    Se mantienen incrementalmente al crear, editar, aprobar o eliminar
+    reseñas (ver services.apply_review_change), de modo que el listado de
+    reseñas las lea con una sola consulta por clave primaria.
+    """
+    business = models.OneToOneField(
+        Business,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='review_stats'
+    )
+    total = models.IntegerField(default=0, verbose_name="Reseñas aprobadas")
+    rating_sum = models.IntegerField(default=0, verbose_name="Suma de calificaciones")
+    
+    # Histograma de calificaciones
+    count_1 = models.IntegerField(default=0)
+    count_2 = models.IntegerField(default=0)
+    count_3 = models.IntegerField(default=0)
+    count_4 = models.IntegerField(default=0)
+    count_5 = models.IntegerField(default=0)
+    
+    class Meta:
+        db_table = 'review_stats'
+        verbose_name = 'Estadísticas de reseñas'
+        verbose_name_plural = 'Estadísticas de reseñas'
+    
+    def __str__(self):
+        return f"{self.business_id} - {self.total} reseñas"
+    
+    @property
+    def average_rating(self):
+        if not self.total:
+            return 0
+        return round(self.rating_sum / self.total, 2)
+    
+    @property
+    def rating_distribution(self):
+        return {str(i): getattr(self, f'count_{i}') for i in range(1, 6)}
+    
+    def to_dict(self):
+        """Formato usado en la respuesta del listado de reseñas"""
+        return {
+            'average_rating': self.average_rating,
+            'total_reviews': self.total,
+            'rating_distribution': self.rating_distribution
+        }
 
 
 class ReviewHelpful(models.Model):
@@ -0,0 +1,172 @@
+"""
+Servicios de la app reviews
+
+Mantención incremental de las estadísticas de reseñas y del rating de los
+negocios, más la reparación masiva cuando los contadores se desvían.
+"""
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+
+from apps.businesses.models import Business
+from apps.businesses.ranking import compute_rank_score, refresh_rank_scores
+from .models import Review, ReviewStats
+
+STATS_FIELDS = ['total', 'rating_sum', 'count_1', 'count_2', 'count_3', 'count_4', 'count_5']
+
+
+def apply_review_change(business_id, old_rating=None, new_rating=None):
+    """
+    Aplica el cambio de una reseña a ReviewStats con una sola UPDATE y
+    sincroniza rating, review_count y rank_score del negocio
+
+    Son tres sentencias por cambio: la UPDATE con los deltas de ReviewStats,
+    una SELECT por clave primaria de esa fila (ya bloqueada por la UPDATE,
+    así que ve el valor confirmado más los deltas propios) y una UPDATE del
+    negocio con sus tres campos. El promedio redondeado del negocio no se
+    puede derivar de un delta, por eso se lee la suma.
+
+    Debe llamarse dentro de la transacción del cambio de la reseña.
+
+    Args:
+        business_id: ID del negocio de la reseña
+        old_rating: Rating con que la reseña contaba antes (None si no contaba:
+            reseña nueva o no aprobada)
+        new_rating: Rating con que cuenta ahora (None si dejó de contar:
+            reseña eliminada o no aprobada)
+    """
+    if old_rating == new_rating:
+        return
+
+    deltas = {}
+    if old_rating is not None:
+        deltas['total'] = deltas.get('total', 0) - 1
+        deltas['rating_sum'] = deltas.get('rating_sum', 0) - old_rating
+        deltas[f'count_{old_rating}'] = -1
+    if new_rating is not None:
+        deltas['total'] = deltas.get('total', 0) + 1
+        deltas['rating_sum'] = deltas.get('rating_sum', 0) + new_rating
+        deltas[f'count_{new_rating}'] = deltas.get(f'count_{new_rating}', 0) + 1
+
+    updates = {field: F(field) + delta for field, delta in deltas.items() if delta}
+    stats = ReviewStats.objects.filter(business_id=business_id)
+    if not stats.update(**updates):
+        # Primera reseña del negocio: crear la fila y aplicar el delta
+        ReviewStats.objects.get_or_create(business_id=business_id)
+        stats.update(**updates)
+
+    row = (
+        Business.objects.filter(pk=business_id)
+        .values_list('favorites_count', 'created_at', 'review_stats__rating_sum', 'review_stats__total')
+        .first()
+    )
+    if row is None:
+        return
+    favorites_count, created_at, rating_sum, total = row
+    Business.objects.filter(pk=business_id).update(
+        rating=_average(rating_sum or 0, total or 0),
+        review_count=total or 0,
+        rank_score=compute_rank_score(rating_sum, total, favorites_count, created_at),
+    )
+
+
+def _average(rating_sum, total):
+    if not total:
+        return Decimal('0.00')
+    return (Decimal(rating_sum) / Decimal(total)).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+
+
+def recompute_review_stats(business_ids=None):
+    """
+    Recalcula ReviewStats y el rating de los negocios desde las reseñas
+
+    Usa una única consulta agrupada sobre las reseñas aprobadas y solo
+    escribe los negocios cuyos valores se desviaron.
+
+    Args:
+        business_ids: IDs de negocios a reparar (None para todos)
+
+    Returns:
+        Número de negocios corregidos
+    """
+    reviews = Review.objects.filter(is_approved=True)
+    businesses = Business.objects.all()
+    existing_stats = ReviewStats.objects.all()
+    if business_ids is not None:
+        business_ids = list(business_ids)
+        reviews = reviews.filter(business_id__in=business_ids)
+        businesses = businesses.filter(pk__in=business_ids)
+        existing_stats = existing_stats.filter(business_id__in=business_ids)
+
+    computed = {
+        row.pop('business_id'): row
+        for row in (
+            reviews
+            .values('business_id')
+            .annotate(
+                total=Count('id'),
+                rating_sum=Sum('rating'),
+                **{f'count_{i}': Count('id', filter=Q(rating=i)) for i in range(1, 6)},
+            )
+            .order_by()
+        )
+    }
+    empty = dict.fromkeys(STATS_FIELDS, 0)
+    current_stats = {
+        row.pop('business_id'): row
+        for row in existing_stats.values('business_id', *STATS_FIELDS)
+    }
+
+    stats_to_save = []
+    businesses_to_save = []
+    repaired = set()
+    for business in businesses.only('id', 'rating', 'review_count').order_by():
+        expected = computed.get(business.pk, empty)
+        if current_stats.get(business.pk) != expected:
+            stats_to_save.append(ReviewStats(business_id=business.pk, **expected))
+            repaired.add(business.pk)
+
+        rating = _average(expected['rating_sum'], expected['total'])
+        if business.rating != rating or business.review_count != expected['total']:
+            business.rating = rating
+            business.review_count = expected['total']
+            businesses_to_save.append(business)
+            repaired.add(business.pk)
+
+    with transaction.atomic():
+        ReviewStats.objects.bulk_create(
+            stats_to_save,
+            update_conflicts=True,
+            unique_fields=['business'],
+            update_fields=STATS_FIELDS,
+            batch_size=1000
+        )
+        Business.objects.bulk_update(businesses_to_save, ['rating', 'review_count'], batch_size=1000)
+        refresh_rank_scores(business_ids)
+
+    return len(repaired)
+
+
+def set_reviews_approval(queryset, is_approved):
+    """
+    Aprueba o rechaza reseñas en bloque
+
+    Hace una sola UPDATE sobre las reseñas que cambian de estado y recalcula
+    las estadísticas una vez por negocio afectado, en vez de pasar por
+    Review.save() fila a fila.
+
+    Args:
+        queryset: Reseñas a moderar
+        is_approved: Nuevo estado de aprobación
+
+    Returns:
+        Número de reseñas actualizadas
+    """
+    changing = queryset.exclude(is_approved=is_approved)
+    with transaction.atomic():
+        business_ids = set(changing.values_list('business_id', flat=True))
+        updated = Review.objects.filter(pk__in=changing.values('pk')).update(is_approved=is_approved)
+        if business_ids:
+            recompute_review_stats(business_ids)
+    return updated
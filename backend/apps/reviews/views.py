@@ -2,9 +2,9 @@ from rest_framework import generics, status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, IsAuthenticatedOrReadOnly
-from django.db.models import Count, Q, Avg
+from django.db.models import Count, Q
 from apps.businesses.models import Business
-from .models import Review, ReviewHelpful
+from .models import Review, ReviewHelpful, ReviewStats
 from .serializers import ReviewSerializer, ReviewCreateSerializer, ReviewUpdateSerializer
 
 
@@ -29,14 +29,11 @@ class ReviewListView(generics.ListAPIView):
     
     def list(self, request, *args, **kwargs):
         business_id = kwargs.get('business_id')
-        
-        # Obtener estadísticas de reviews
         reviews = self.get_queryset()
         
-        # Calcular distribución de ratings
-        rating_distribution = {}
-        for i in range(1, 6):
-            rating_distribution[str(i)] = reviews.filter(rating=i).count()
+        # Estadísticas precalculadas (una lectura por clave primaria)
+        review_stats = ReviewStats.objects.filter(business_id=business_id).first()
+        stats = (review_stats or ReviewStats(business_id=business_id)).to_dict()
         
         # Paginar resultados
         page = self.paginate_queryset(reviews)
@@ -55,11 +52,7 @@ class ReviewListView(generics.ListAPIView):
                         'total': paginated_response.data['count'],
                         'pages': (paginated_response.data['count'] + self.pagination_class.page_size - 1) // self.pagination_class.page_size
                     },
-                    'stats': {
-                        'average_rating': round(reviews.aggregate(Avg('rating'))['rating__avg'] or 0, 2),
-                        'total_reviews': reviews.count(),
-                        'rating_distribution': rating_distribution
-                    }
+                    'stats': stats
                 }
             })
         
@@ -68,11 +61,7 @@ class ReviewListView(generics.ListAPIView):
             'success': True,
             'data': {
                 'results': serializer.data,
-                'stats': {
-                    'average_rating': round(reviews.aggregate(Avg('rating'))['rating__avg'] or 0, 2),
-                    'total_reviews': reviews.count(),
-                    'rating_distribution': rating_distribution
-                }
+                'stats': stats
             }
         })
 
@@ -177,11 +166,9 @@ def delete_review(request, review_id):
     """Eliminar una review"""
     try:
         review = Review.objects.get(id=review_id, user=request.user)
-        business = review.business
-        review.delete()
         
-        # Actualizar rating del negocio
-        business.update_rating()
+        # Review.delete() actualiza las estadísticas y el rating del negocio
+        review.delete()
         
         return Response({
             'success': True,
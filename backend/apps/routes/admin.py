@@ -1,11 +1,12 @@
 from django.contrib import admin
-from .models import Route, RouteStop, RouteLike
+from .models import Route, RouteStop, RouteLike, RouteRanking, RouteRankingTag
+from .services.discovery import refresh_route_rankings
 
 
 class RouteStopInline(admin.TabularInline):
     model = RouteStop
     extra = 0
-    readonly_fields = ['is_completed', 'completed_at']
+    readonly_fields = ['distance_from_previous', 'travel_time_from_previous', 'is_completed', 'completed_at']
 
 
 @admin.register(Route)
@@ -31,6 +32,12 @@ class RouteAdmin(admin.ModelAdmin):
             'fields': ('created_at', 'updated_at')
         }),
     )
+    
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        # Las paradas editadas en línea cambian distancias y vista previa
+        form.instance.update_stats()
+        refresh_route_rankings([form.instance.pk])
 
 
 @admin.register(RouteStop)
@@ -46,3 +53,21 @@ class RouteLikeAdmin(admin.ModelAdmin):
     list_filter = ['created_at']
     search_fields = ['route__name', 'user__email']
     date_hierarchy = 'created_at'
+
+
+class RouteRankingTagInline(admin.TabularInline):
+    model = RouteRankingTag
+    extra = 0
+    readonly_fields = ['kind', 'slug', 'score']
+    can_delete = False
+
+
+@admin.register(RouteRanking)
+class RouteRankingAdmin(admin.ModelAdmin):
+    list_display = ['route', 'score', 'updated_at']
+    search_fields = ['route__name']
+    readonly_fields = ['route', 'score', 'updated_at']
+    inlines = [RouteRankingTagInline]
+    
+    def has_add_permission(self, request):
+        return False  # Se mantiene automáticamente
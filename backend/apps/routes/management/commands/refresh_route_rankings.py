@@ -0,0 +1,57 @@
+"""
+Management command para refrescar el ranking del feed de rutas
+
+Las rutas se refrescan solas al crearse, editarse o recibir likes. Este
+comando incorpora las vistas acumuladas y los cambios de rating de los
+negocios, y limpia rutas que dejaron de ser públicas.
+
+Pensado para ejecutarse periódicamente (cron de Railway, cada hora).
+
+Uso:
+    python manage.py refresh_route_rankings
+    python manage.py refresh_route_rankings --batch-size 5000
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.routes.models import Route, RouteRanking
+from apps.routes.services.discovery import refresh_route_rankings
+
+
+class Command(BaseCommand):
+    help = 'Recalcula el ranking de rutas públicas del feed de descubrimiento'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=2000,
+            help='Rutas a recalcular por lote (default: 2000)',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        if batch_size < 1:
+            raise CommandError('--batch-size debe ser al menos 1')
+
+        self.stdout.write(self.style.WARNING('Recalculando ranking de rutas públicas...'))
+
+        # Rutas rankeadas que ya no son públicas
+        removed, _ = RouteRanking.objects.filter(route__is_public=False).delete()
+
+        ranked = 0
+        last_id = None
+        public_routes = Route.objects.filter(is_public=True).order_by('pk')
+        while True:
+            batch = public_routes.filter(pk__gt=last_id) if last_id else public_routes
+            batch_ids = list(batch.values_list('pk', flat=True)[:batch_size])
+            if not batch_ids:
+                break
+
+            ranked += refresh_route_rankings(batch_ids)
+            last_id = batch_ids[-1]
+            self.stdout.write(f'  ✓ {ranked} rutas recalculadas')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'\n✓ {ranked} rutas en el ranking, {removed} rutas privadas eliminadas'
+        ))
@@ -0,0 +1,49 @@
+# Generated by Django 5.0.1 on 2026-10-19 14:54
+
+from django.db import migrations, models
+from django.db.models import Prefetch
+
+from core.utils import calculate_route_stats
+
+
+def backfill_route_stats(apps, schema_editor):
+    """Calcula distancias reales y tramos de las rutas existentes"""
+    Route = apps.get_model('routes', 'Route')
+    RouteStop = apps.get_model('routes', 'RouteStop')
+
+    routes = Route.objects.prefetch_related(
+        Prefetch('stops', queryset=RouteStop.objects.select_related('business').order_by('order'))
+    )
+    for route in routes.iterator(chunk_size=500):
+        stops = list(route.stops.all())
+        stats = calculate_route_stats(stops)
+        for stop, leg in zip(stops, stats['legs']):
+            stop.distance_from_previous = leg['distance']
+            stop.travel_time_from_previous = leg['travel_time']
+        RouteStop.objects.bulk_update(stops, ['distance_from_previous', 'travel_time_from_previous'])
+        Route.objects.filter(pk=route.pk).update(
+            total_distance=stats['total_distance'],
+            estimated_duration=stats['estimated_duration'],
+            stops_count=stats['stops_count'],
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('routes', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='routestop',
+            name='distance_from_previous',
+            field=models.FloatField(default=0, help_text='Distancia desde la parada anterior (km)'),
+        ),
+        migrations.AddField(
+            model_name='routestop',
+            name='travel_time_from_previous',
+            field=models.IntegerField(default=0, help_text='Traslado desde la parada anterior (minutos)'),
+        ),
+        migrations.RunPython(backfill_route_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.0.1 on 2026-10-19 15:20
+
+from django.db import migrations, models
+from django.db.models import Prefetch
+
+
+def backfill_route_preview(apps, schema_editor):
+    """Construye la vista previa de las rutas existentes"""
+    Route = apps.get_model('routes', 'Route')
+    RouteStop = apps.get_model('routes', 'RouteStop')
+
+    routes = Route.objects.prefetch_related(
+        Prefetch('stops', queryset=RouteStop.objects.select_related('business').order_by('order'))
+    )
+    batch = []
+    for route in routes.iterator(chunk_size=500):
+        route.preview = [
+            {'id': str(stop.business.id), 'name': stop.business.name, 'cover_image': stop.business.cover_image}
+            for stop in list(route.stops.all())[:3]
+        ]
+        batch.append(route)
+        if len(batch) >= 500:
+            Route.objects.bulk_update(batch, ['preview'])
+            batch = []
+    Route.objects.bulk_update(batch, ['preview'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('routes', '0002_routestop_legs'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='route',
+            name='preview',
+            field=models.JSONField(blank=True, default=list, help_text='Primeros negocios de la ruta'),
+        ),
+        migrations.RunPython(backfill_route_preview, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,90 @@
+# Generated by Django 5.0.1 on 2026-10-19 15:01
+
+from math import exp, log1p
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.utils import timezone
+from django.utils.text import slugify
+
+
+def compute_route_score(likes, views, stop_ratings, created_at, is_featured, now):
+    """
+    Fórmula del puntaje de rutas al crear RouteRanking (congelada: no depende
+    de services/discovery.py; los cambios se aplican con refresh_route_rankings)
+    """
+    def bayesian(rating, review_count):
+        return (5 * 4.0 + float(rating or 0) * (review_count or 0)) / (5 + (review_count or 0))
+
+    quality = sum(bayesian(*pair) for pair in stop_ratings) / len(stop_ratings) / 5 if stop_ratings else 0.0
+    age_days = max((now - created_at).total_seconds() / 86400, 0)
+    score = log1p(max(likes, 0)) + 0.3 * log1p(max(views, 0)) + quality + 0.5 * exp(-age_days / 30)
+    if is_featured:
+        score += 1.0
+    return round(score, 6)
+
+
+def _tags(values):
+    """Slugs únicos delimitados por comas: ',a,b,'"""
+    slugs = sorted({slugify(value) for value in values if value})
+    return f",{','.join(slugs)}," if slugs else ''
+
+
+def backfill_route_rankings(apps, schema_editor):
+    """Rankea las rutas públicas existentes"""
+    Route = apps.get_model('routes', 'Route')
+    RouteStop = apps.get_model('routes', 'RouteStop')
+    RouteRanking = apps.get_model('routes', 'RouteRanking')
+
+    stops = {}
+    for route_id, comuna, category, rating, review_count in (
+        RouteStop.objects
+        .filter(route__is_public=True)
+        .values_list('route_id', 'business__comuna', 'business__category__slug',
+                     'business__rating', 'business__review_count')
+        .iterator(chunk_size=2000)
+    ):
+        stops.setdefault(route_id, []).append((comuna, category, rating, review_count))
+
+    now = timezone.now()
+    rankings = []
+    for pk, likes, views, created_at, is_featured in (
+        Route.objects.filter(is_public=True).values_list('pk', 'likes', 'views', 'created_at', 'is_featured')
+    ):
+        route_stops = stops.get(pk, [])
+        rankings.append(RouteRanking(
+            route_id=pk,
+            score=compute_route_score(
+                likes, views, [(rating, count) for _, _, rating, count in route_stops], created_at, is_featured, now
+            ),
+            comunas=_tags(comuna for comuna, _, _, _ in route_stops),
+            categories=_tags(category for _, category, _, _ in route_stops),
+        ))
+    RouteRanking.objects.bulk_create(rankings, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('routes', '0003_route_preview'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RouteRanking',
+            fields=[
+                ('route', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='ranking', serialize=False, to='routes.route')),
+                ('score', models.FloatField(default=0, verbose_name='Puntaje')),
+                ('comunas', models.TextField(blank=True, default='', help_text='Slugs de comunas de las paradas')),
+                ('categories', models.TextField(blank=True, default='', help_text='Slugs de categorías de las paradas')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Ranking de ruta',
+                'verbose_name_plural': 'Ranking de rutas',
+                'db_table': 'route_rankings',
+                'indexes': [models.Index(fields=['-score', '-route'], name='route_ranking_feed_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_route_rankings, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,53 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_tags(apps, schema_editor):
+    """Pasa los slugs ',a,b,' de comunas y categories a RouteRankingTag"""
+    RouteRanking = apps.get_model('routes', 'RouteRanking')
+    RouteRankingTag = apps.get_model('routes', 'RouteRankingTag')
+
+    tags = []
+    for route_id, score, comunas, categories in (
+        RouteRanking.objects.values_list('route_id', 'score', 'comunas', 'categories').iterator(chunk_size=2000)
+    ):
+        for kind, value in (('comuna', comunas), ('category', categories)):
+            for slug in filter(None, value.split(',')):
+                tags.append(RouteRankingTag(ranking_id=route_id, kind=kind, slug=slug, score=score))
+    RouteRankingTag.objects.bulk_create(tags, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('routes', '0004_route_ranking'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RouteRankingTag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('comuna', 'Comuna'), ('category', 'Categoría')], max_length=10)),
+                ('slug', models.CharField(max_length=100)),
+                ('score', models.FloatField(default=0, verbose_name='Puntaje de la ruta')),
+                ('ranking', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tags', to='routes.routeranking')),
+            ],
+            options={
+                'verbose_name': 'Etiqueta de ranking de ruta',
+                'verbose_name_plural': 'Etiquetas de ranking de rutas',
+                'db_table': 'route_ranking_tags',
+                'indexes': [models.Index(fields=['kind', 'slug', '-score', '-ranking'], name='route_rank_tag_feed_idx')],
+                'unique_together': {('ranking', 'kind', 'slug')},
+            },
+        ),
+        migrations.RunPython(backfill_tags, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='routeranking',
+            name='categories',
+        ),
+        migrations.RemoveField(
+            model_name='routeranking',
+            name='comunas',
+        ),
+    ]
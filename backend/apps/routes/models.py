@@ -2,6 +2,7 @@ import uuid
 from django.db import models
 from django.contrib.auth import get_user_model
 from apps.businesses.models import Business
+from core.utils import calculate_route_stats
 
 User = get_user_model()
 
@@ -24,6 +25,9 @@ class Route(models.Model):
     estimated_duration = models.IntegerField(default=0, help_text="Duración en minutos")
     stops_count = models.IntegerField(default=0, verbose_name="Número de paradas")
     
+    # Primeras paradas desnormalizadas para los listados (ver services/previews.py)
+    preview = models.JSONField(default=list, blank=True, help_text="Primeros negocios de la ruta")
+    
     # Engagement
     views = models.IntegerField(default=0)
     likes = models.IntegerField(default=0)
@@ -42,20 +46,43 @@ class Route(models.Model):
     def __str__(self):
         return f"{self.name} - {self.user.email}"
     
-    def update_stats(self):
-        """Actualizar estadísticas de la ruta"""
-        stops = self.stops.all().order_by('order')
-        self.stops_count = stops.count()
+    def update_stats(self, stops=None):
+        """
+        Actualizar estadísticas de la ruta y los tramos de cada parada
+        
+        Args:
+            stops: Paradas ya cargadas (ordenadas y con business); si no se
+                pasan se leen con una sola consulta
+        """
+        from apps.businesses.services.distance_matrix import distance_matrix
+        from .services.previews import build_preview
+        
+        if stops is None:
+            stops = self.stops.select_related('business').order_by('order')
+        stops = list(stops)
         
-        # Calcular duración total
-        total_duration = sum(stop.duration for stop in stops)
-        self.estimated_duration = total_duration
+        # Tramos consecutivos desde el LRU de pares (compartido con el optimizador)
+        points = [
+            (str(stop.business_id), float(stop.business.latitude), float(stop.business.longitude))
+            for stop in stops
+        ]
+        stats = calculate_route_stats(stops, distance_matrix.path_distances(points))
+        self.stops_count = stats['stops_count']
+        self.estimated_duration = stats['estimated_duration']
+        self.total_distance = stats['total_distance']
+        self.preview = build_preview(stops)
         
-        # Calcular distancia total (simplificado)
-        # TODO: Usar Mapbox API para distancias reales
-        self.total_distance = 0
+        # Guardar solo los tramos que cambiaron
+        changed_stops = []
+        for stop, leg in zip(stops, stats['legs']):
+            if (stop.distance_from_previous, stop.travel_time_from_previous) != (leg['distance'], leg['travel_time']):
+                stop.distance_from_previous = leg['distance']
+                stop.travel_time_from_previous = leg['travel_time']
+                changed_stops.append(stop)
+        if changed_stops:
+            RouteStop.objects.bulk_update(changed_stops, ['distance_from_previous', 'travel_time_from_previous'])
         
-        self.save(update_fields=['stops_count', 'estimated_duration', 'total_distance'])
+        self.save(update_fields=['stops_count', 'estimated_duration', 'total_distance', 'preview', 'updated_at'])
 
 
 class RouteStop(models.Model):
@@ -69,6 +96,10 @@ class RouteStop(models.Model):
     
     # Tiempos estimados
     duration = models.IntegerField(default=60, help_text="Tiempo en el lugar (minutos)")
+    
+    # Tramo desde la parada anterior (calculado en Route.update_stats)
+    distance_from_previous = models.FloatField(default=0, help_text="Distancia desde la parada anterior (km)")
+    travel_time_from_previous = models.IntegerField(default=0, help_text="Traslado desde la parada anterior (minutos)")
     notes = models.TextField(blank=True, verbose_name="Notas")
     
     # Completado
@@ -86,6 +117,68 @@ class RouteStop(models.Model):
         return f"{self.route.name} - Stop {self.order}: {self.business.name}"
 
 
+class RouteRanking(models.Model):
+    """
+    Ranking precalculado de rutas públicas para el feed de descubrimiento.
+    
+    Solo existen filas para rutas públicas. Las comunas y categorías de sus
+    paradas están en RouteRankingTag para filtrar con índice.
+    Se mantiene con services.discovery.refresh_route_rankings.
+    """
+    route = models.OneToOneField(
+        Route,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='ranking'
+    )
+    score = models.FloatField(default=0, verbose_name="Puntaje")
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'route_rankings'
+        verbose_name = 'Ranking de ruta'
+        verbose_name_plural = 'Ranking de rutas'
+        indexes = [
+            # Paginación por keyset (score, route_id)
+            models.Index(fields=['-score', '-route'], name='route_ranking_feed_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.route_id} - {self.score}"
+
+
+class RouteRankingTag(models.Model):
+    """
+    Comuna o categoría de alguna parada de una ruta rankeada.
+    
+    Copia el puntaje de la ruta para que el feed filtrado sea un rango del
+    índice (kind, slug, score, route): filtrar por una comuna poco frecuente
+    no recorre la tabla de rankings.
+    """
+    KIND_CHOICES = [
+        ('comuna', 'Comuna'),
+        ('category', 'Categoría'),
+    ]
+    
+    ranking = models.ForeignKey(RouteRanking, on_delete=models.CASCADE, related_name='tags')
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    slug = models.CharField(max_length=100)
+    score = models.FloatField(default=0, verbose_name="Puntaje de la ruta")
+    
+    class Meta:
+        db_table = 'route_ranking_tags'
+        verbose_name = 'Etiqueta de ranking de ruta'
+        verbose_name_plural = 'Etiquetas de ranking de rutas'
+        unique_together = ['ranking', 'kind', 'slug']
+        indexes = [
+            # Feed filtrado con paginación por keyset (score, route_id)
+            models.Index(fields=['kind', 'slug', '-score', '-ranking'], name='route_rank_tag_feed_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.ranking_id} - {self.kind}:{self.slug}"
+
+
 class RouteLike(models.Model):
     """Likes en rutas"""
     route = models.ForeignKey(Route, on_delete=models.CASCADE, related_name='liked_by')
@@ -1,9 +1,41 @@
+from django.db import transaction
 from rest_framework import serializers
 from .models import Route, RouteStop
+from .services import discovery
+from apps.businesses.models import Business
 from apps.businesses.serializers import BusinessListSerializer
 from apps.authentication.serializers import UserSerializer
 
 
+def resolve_stop_businesses(stops_data):
+    """
+    Reemplaza business_id por la instancia de Business en cada parada
+    
+    Resuelve todos los negocios con una sola consulta (in_bulk) y valida que
+    existan, estén activos y que los órdenes no se repitan.
+    
+    Raises:
+        serializers.ValidationError: Si algún negocio no existe o hay órdenes repetidos
+    """
+    orders = [stop_data['order'] for stop_data in stops_data]
+    if len(orders) != len(set(orders)):
+        raise serializers.ValidationError("Hay paradas con el mismo orden")
+    
+    business_ids = {stop_data['business_id'] for stop_data in stops_data}
+    businesses = Business.objects.filter(is_active=True).in_bulk(business_ids)
+    
+    missing = [str(business_id) for business_id in business_ids if business_id not in businesses]
+    if missing:
+        raise serializers.ValidationError(f"Negocio {', '.join(sorted(missing))} no encontrado")
+    
+    resolved = []
+    for stop_data in stops_data:
+        stop_data = dict(stop_data)
+        stop_data['business'] = businesses[stop_data.pop('business_id')]
+        resolved.append(stop_data)
+    return resolved
+
+
 class RouteStopSerializer(serializers.ModelSerializer):
     """Serializer para paradas de ruta"""
     business = BusinessListSerializer(read_only=True)
@@ -11,13 +43,17 @@ class RouteStopSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = RouteStop
-        fields = ['id', 'business', 'business_id', 'order', 'duration', 'notes', 'is_completed', 'completed_at']
-        read_only_fields = ['id', 'is_completed', 'completed_at']
+        fields = [
+            'id', 'business', 'business_id', 'order', 'duration', 'notes',
+            'distance_from_previous', 'travel_time_from_previous', 'is_completed', 'completed_at'
+        ]
+        read_only_fields = ['id', 'distance_from_previous', 'travel_time_from_previous', 'is_completed', 'completed_at']
 
 
 class RouteListSerializer(serializers.ModelSerializer):
     """Serializer para listado de rutas (simplificado)"""
-    preview_businesses = serializers.SerializerMethodField()
+    # Desnormalizado en Route.preview (sin consultas por ruta)
+    preview_businesses = serializers.JSONField(source='preview', read_only=True)
     
     class Meta:
         model = Route
@@ -25,15 +61,6 @@ class RouteListSerializer(serializers.ModelSerializer):
             'id', 'name', 'description', 'stops_count', 'total_distance',
             'estimated_duration', 'is_public', 'likes', 'created_at', 'preview_businesses'
         ]
-    
-    def get_preview_businesses(self, obj):
-        """Obtener primeros 3 negocios de la ruta"""
-        stops = obj.stops.all().select_related('business')[:3]
-        return [{
-            'id': str(stop.business.id),
-            'name': stop.business.name,
-            'cover_image': stop.business.cover_image
-        } for stop in stops]
 
 
 class RouteDetailSerializer(serializers.ModelSerializer):
@@ -60,35 +87,32 @@ class RouteCreateSerializer(serializers.ModelSerializer):
         fields = ['name', 'description', 'is_public', 'stops']
     
     def validate_stops(self, value):
-        """Validar que haya al menos 2 paradas"""
+        """Validar paradas y resolver sus negocios antes de escribir nada"""
         if len(value) < 2:
             raise serializers.ValidationError("Una ruta debe tener al menos 2 paradas")
-        return value
+        return resolve_stop_businesses(value)
     
     def create(self, validated_data):
         stops_data = validated_data.pop('stops')
         
-        # Crear ruta
-        route = Route.objects.create(user=self.context['request'].user, **validated_data)
-        
-        # Crear paradas
-        from apps.businesses.models import Business
-        for stop_data in stops_data:
-            business_id = stop_data.pop('business_id')
-            try:
-                business = Business.objects.get(id=business_id, is_active=True)
-                RouteStop.objects.create(route=route, business=business, **stop_data)
-            except Business.DoesNotExist:
-                route.delete()
-                raise serializers.ValidationError(f"Negocio {business_id} no encontrado")
-        
-        # Actualizar stats
-        route.update_stats()
-        
-        # Incrementar contador de rutas del usuario
-        from django.contrib.auth import get_user_model
-        User = get_user_model()
-        User.objects.filter(id=route.user.id).update(routes_created=models.F('routes_created') + 1)
+        with transaction.atomic():
+            # Crear ruta
+            route = Route.objects.create(user=self.context['request'].user, **validated_data)
+            
+            # Crear paradas (negocios ya resueltos en validate_stops)
+            stops = RouteStop.objects.bulk_create([
+                RouteStop(route=route, **stop_data) for stop_data in stops_data
+            ])
+            
+            # Actualizar stats con las paradas ya cargadas
+            route.update_stats(sorted(stops, key=lambda stop: stop.order))
+            
+            # Incrementar contador de rutas del usuario
+            from django.contrib.auth import get_user_model
+            User = get_user_model()
+            User.objects.filter(id=route.user.id).update(routes_created=models.F('routes_created') + 1)
+            
+            discovery.refresh_route_ranking_on_commit(route.id)
         
         return route
 
@@ -101,34 +125,87 @@ class RouteUpdateSerializer(serializers.ModelSerializer):
         model = Route
         fields = ['name', 'description', 'is_public', 'stops']
     
+    def validate_stops(self, value):
+        """Resolver negocios de las paradas antes de escribir nada"""
+        return resolve_stop_businesses(value)
+    
     def update(self, instance, validated_data):
         stops_data = validated_data.pop('stops', None)
         
-        # Actualizar campos básicos
-        instance.name = validated_data.get('name', instance.name)
-        instance.description = validated_data.get('description', instance.description)
-        instance.is_public = validated_data.get('is_public', instance.is_public)
-        instance.save()
-        
-        # Actualizar paradas si se proporcionan
-        if stops_data is not None:
-            # Eliminar paradas existentes
-            instance.stops.all().delete()
+        with transaction.atomic():
+            # Actualizar campos básicos
+            instance.name = validated_data.get('name', instance.name)
+            instance.description = validated_data.get('description', instance.description)
+            instance.is_public = validated_data.get('is_public', instance.is_public)
+            instance.save()
             
-            # Crear nuevas paradas
-            from apps.businesses.models import Business
-            for stop_data in stops_data:
-                business_id = stop_data.pop('business_id')
-                try:
-                    business = Business.objects.get(id=business_id, is_active=True)
-                    RouteStop.objects.create(route=instance, business=business, **stop_data)
-                except Business.DoesNotExist:
-                    raise serializers.ValidationError(f"Negocio {business_id} no encontrado")
+            # Actualizar paradas si se proporcionan
+            if stops_data is not None:
+                self._apply_stops_diff(instance, stops_data)
             
-            # Actualizar stats
-            instance.update_stats()
+            discovery.refresh_route_ranking_on_commit(instance.id)
         
         return instance
+    
+    def _apply_stops_diff(self, route, stops_data):
+        """
+        Aplica solo las diferencias entre las paradas actuales y las recibidas
+        
+        Las paradas se emparejan por negocio (en orden, si un negocio se repite):
+        las emparejadas conservan su id e is_completed y se actualizan en bloque,
+        las sobrantes se eliminan y las nuevas se crean con bulk_create. Las
+        estadísticas se recalculan solo si cambian paradas, orden o duración.
+        """
+        existing = list(route.stops.select_related('business').order_by('order'))
+        
+        available = {}
+        for stop in existing:
+            available.setdefault(stop.business_id, []).append(stop)
+        
+        kept, created, changed, moved_ids = [], [], [], []
+        duration_changed = False
+        for stop_data in stops_data:
+            candidates = available.get(stop_data['business'].pk)
+            if not candidates:
+                created.append(RouteStop(route=route, **stop_data))
+                continue
+            
+            stop = candidates.pop(0)
+            kept.append(stop)
+            # Campos omitidos conservan su valor actual
+            values = {
+                'order': stop_data['order'],
+                'duration': stop_data.get('duration', stop.duration),
+                'notes': stop_data.get('notes', stop.notes),
+            }
+            if stop.order != values['order']:
+                moved_ids.append(stop.id)
+            if stop.duration != values['duration']:
+                duration_changed = True
+            if any(getattr(stop, field) != value for field, value in values.items()):
+                for field, value in values.items():
+                    setattr(stop, field, value)
+                changed.append(stop)
+        
+        deleted_ids = [stop.id for stops in available.values() for stop in stops]
+        
+        if deleted_ids:
+            RouteStop.objects.filter(id__in=deleted_ids).delete()
+        
+        if moved_ids:
+            # unique_together (route, order): sacar primero las paradas movidas
+            # del rango de órdenes en uso para que ninguna fila choque
+            orders = [stop.order for stop in existing] + [stop_data['order'] for stop_data in stops_data]
+            offset = max(orders) - min(orders) + 1
+            RouteStop.objects.filter(id__in=moved_ids).update(order=models.F('order') + offset)
+        
+        if changed:
+            RouteStop.objects.bulk_update(changed, ['order', 'duration', 'notes'])
+        if created:
+            RouteStop.objects.bulk_create(created)
+        
+        if deleted_ids or created or moved_ids or duration_changed:
+            route.update_stats(sorted(kept + created, key=lambda stop: stop.order))
 
 
 # Import models for F expressions
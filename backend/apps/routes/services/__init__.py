@@ -0,0 +1,7 @@
+"""
+Servicios de la app routes
+"""
+from .itinerary import Itinerary, ItineraryError, generate_itinerary
+from .optimizer import optimize_route, optimize_stop_order
+
+__all__ = ['Itinerary', 'ItineraryError', 'generate_itinerary', 'optimize_route', 'optimize_stop_order']
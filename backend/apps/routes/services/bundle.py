@@ -0,0 +1,166 @@
+"""
+Bundle offline de rutas para clientes móviles
+
+Empaqueta en un solo JSON comprimido con gzip la ruta, sus paradas en orden
+y una tarjeta recortada de cada negocio (coordenadas, horarios e imágenes),
+para que la app no tenga que pedir cada negocio por separado.
+
+El bundle se versiona con un hash de la ruta y de los negocios de sus
+paradas (updated_at, rating); imágenes y horarios tocan updated_at del
+negocio al cambiar. La versión sirve de ETag y de clave de caché, así que un
+bundle cacheado nunca queda desactualizado: simplemente deja de usarse.
+"""
+import gzip
+import hashlib
+import json
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Prefetch
+from django.utils import timezone
+
+from apps.businesses.models import BusinessImage
+from ..models import RouteStop
+
+logger = logging.getLogger(__name__)
+
+# Se incrementa al cambiar la estructura del bundle
+BUNDLE_FORMAT_VERSION = 1
+
+# Imágenes de galería por negocio incluidas en el bundle
+MAX_IMAGES_PER_BUSINESS = 4
+
+
+def bundle_version(route):
+    """
+    Hash de versión del bundle de una ruta (una consulta liviana)
+
+    Cambia si cambia la ruta, cualquiera de sus paradas o cualquier negocio
+    de ellas (incluidos rating, imágenes y horarios).
+    """
+    stops = (
+        RouteStop.objects
+        .filter(route=route)
+        .order_by('order')
+        .values_list(
+            'id', 'order', 'duration', 'notes', 'business_id',
+            'business__updated_at', 'business__rating', 'business__review_count'
+        )
+    )
+    digest = hashlib.sha1(f'{BUNDLE_FORMAT_VERSION}|{route.pk}|{route.updated_at.isoformat()}'.encode())
+    for row in stops:
+        digest.update(repr(row).encode())
+    return digest.hexdigest()[:20]
+
+
+def _time(value):
+    return value.strftime('%H:%M') if value else None
+
+
+def _business_card(business):
+    """Tarjeta recortada de un negocio para uso offline"""
+    return {
+        'id': str(business.id),
+        'name': business.name,
+        'short_description': business.short_description,
+        'category': {
+            'name': business.category.name,
+            'slug': business.category.slug,
+            'icon': business.category.icon,
+            'color': business.category.color,
+        },
+        'location': {'lat': float(business.latitude), 'lng': float(business.longitude)},
+        'address': business.address,
+        'neighborhood': business.neighborhood,
+        'comuna': business.comuna,
+        'phone': business.phone,
+        'website': business.website,
+        'price_range': business.price_range,
+        'rating': float(business.rating),
+        'review_count': business.review_count,
+        'cover_image': business.cover_image,
+        'images': [
+            {'url': image.image_url, 'thumbnail': image.thumbnail_url or image.image_url}
+            for image in business.bundle_images[:MAX_IMAGES_PER_BUSINESS]
+        ],
+        'is_open_24h': business.is_open_24h,
+        # [día (0=lunes), abre, cierra, abre 2, cierra 2, cerrado, 24h]
+        'opening_hours': [
+            [
+                hours.day_of_week, _time(hours.opens_at), _time(hours.closes_at),
+                _time(hours.opens_at_2), _time(hours.closes_at_2), hours.is_closed, hours.is_24h
+            ]
+            for hours in business.opening_hours.all()
+        ],
+    }
+
+
+def build_bundle(route, version):
+    """Construye el contenido del bundle (sin comprimir)"""
+    stops = list(
+        route.stops
+        .select_related('business__category')
+        .prefetch_related(
+            'business__opening_hours',
+            Prefetch(
+                'business__business_images',
+                queryset=BusinessImage.objects.filter(is_active=True, is_approved=True).order_by('order', '-created_at'),
+                to_attr='bundle_images'
+            )
+        )
+        .order_by('order')
+    )
+
+    businesses = {}
+    for stop in stops:
+        if str(stop.business_id) not in businesses:
+            businesses[str(stop.business_id)] = _business_card(stop.business)
+
+    return {
+        'format_version': BUNDLE_FORMAT_VERSION,
+        'version': version,
+        'generated_at': timezone.now().isoformat(),
+        'route': {
+            'id': str(route.id),
+            'name': route.name,
+            'description': route.description,
+            'total_distance': route.total_distance,
+            'estimated_duration': route.estimated_duration,
+            'stops_count': route.stops_count,
+            'updated_at': route.updated_at.isoformat(),
+        },
+        'stops': [
+            {
+                'id': str(stop.id),
+                'order': stop.order,
+                'business_id': str(stop.business_id),
+                'duration': stop.duration,
+                'notes': stop.notes,
+                'distance_from_previous': stop.distance_from_previous,
+                'travel_time_from_previous': stop.travel_time_from_previous,
+            }
+            for stop in stops
+        ],
+        'businesses': businesses,
+    }
+
+
+def get_route_bundle(route):
+    """
+    Bundle comprimido de una ruta, desde la caché si la versión no cambió
+
+    Returns:
+        (version, bytes gzip con el JSON del bundle)
+    """
+    version = bundle_version(route)
+    cache_key = f'route_bundle:{route.pk}:{version}'
+
+    payload = cache.get(cache_key)
+    if payload is None:
+        content = json.dumps(build_bundle(route, version), separators=(',', ':'), ensure_ascii=False)
+        payload = gzip.compress(content.encode('utf-8'), compresslevel=6)
+        cache.set(cache_key, payload, settings.ROUTE_BUNDLE_CACHE_TIMEOUT)
+        logger.debug('Bundle de ruta %s generado (%s bytes)', route.pk, len(payload))
+
+    return version, payload
@@ -0,0 +1,203 @@
+"""
+Feed de descubrimiento de rutas públicas
+
+El puntaje de cada ruta pública combina:
+- Popularidad: log(1 + likes) y log(1 + vistas).
+- Calidad de las paradas: promedio del rating bayesiano de sus negocios
+  (mismo previo que el ranking de negocios), escalado a 0-1.
+- Novedad: w * exp(-días desde la creación / τ), acotado por
+  ROUTE_DISCOVERY_RECENCY_WEIGHT: una ruta nueva aparece arriba un tiempo
+  sin desplazar indefinidamente a rutas mejores.
+- Bonus para rutas destacadas.
+
+El puntaje se guarda en RouteRanking y las comunas/categorías de las paradas
+en RouteRankingTag (con copia del puntaje, para filtrar con índice). Se
+refrescan por ruta al crearla, editarla o recibir likes. Las vistas, los
+cambios de rating de los negocios y el decaimiento de la novedad se
+incorporan con el comando refresh_route_rankings (periódico).
+"""
+import base64
+import logging
+import uuid
+from math import exp, log1p
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.text import slugify
+
+from ..models import Route, RouteRanking, RouteRankingTag, RouteStop
+
+logger = logging.getLogger(__name__)
+
+
+def _slugs(values):
+    """Slugs únicos de una lista de nombres"""
+    return {slugify(value) for value in values if value} - {''}
+
+
+def _bayesian_rating(rating, review_count):
+    prior_mean = settings.RANKING_PRIOR_MEAN
+    prior_weight = settings.RANKING_PRIOR_WEIGHT
+    return (prior_weight * prior_mean + float(rating or 0) * (review_count or 0)) / (prior_weight + (review_count or 0))
+
+
+def compute_route_score(likes, views, stop_ratings, created_at, is_featured=False, now=None):
+    """
+    Calcula el puntaje de una ruta
+
+    Args:
+        likes: Likes de la ruta
+        views: Vistas de la ruta
+        stop_ratings: Lista de (rating, review_count) de los negocios de las paradas
+        created_at: Fecha de creación de la ruta
+        is_featured: Si la ruta está destacada
+        now: Momento del cálculo (default: ahora)
+
+    Returns:
+        float con el puntaje (mayor es mejor)
+    """
+    quality = 0.0
+    if stop_ratings:
+        quality = sum(_bayesian_rating(*pair) for pair in stop_ratings) / len(stop_ratings) / 5
+
+    age_days = max(((now or timezone.now()) - created_at).total_seconds() / 86400, 0)
+
+    score = (
+        settings.ROUTE_DISCOVERY_LIKES_WEIGHT * log1p(max(likes, 0))
+        + settings.ROUTE_DISCOVERY_VIEWS_WEIGHT * log1p(max(views, 0))
+        + settings.ROUTE_DISCOVERY_QUALITY_WEIGHT * quality
+        + settings.ROUTE_DISCOVERY_RECENCY_WEIGHT * exp(-age_days / settings.ROUTE_DISCOVERY_RECENCY_DAYS)
+    )
+    if is_featured:
+        score += settings.ROUTE_DISCOVERY_FEATURED_BOOST
+    return round(score, 6)
+
+
+def refresh_route_rankings(route_ids):
+    """
+    Recalcula el ranking de las rutas indicadas
+
+    Usa una consulta para las rutas y otra para sus paradas, inserta o
+    actualiza las rutas públicas y elimina las que dejaron de serlo.
+
+    Args:
+        route_ids: IDs de rutas a refrescar
+
+    Returns:
+        Número de rutas rankeadas
+    """
+    route_ids = list(route_ids)
+    if not route_ids:
+        return 0
+
+    routes = list(
+        Route.objects
+        .filter(pk__in=route_ids, is_public=True)
+        .values_list('pk', 'likes', 'views', 'created_at', 'is_featured')
+    )
+    stops = {}
+    for route_id, comuna, category, rating, review_count in (
+        RouteStop.objects
+        .filter(route_id__in=[route[0] for route in routes])
+        .values_list('route_id', 'business__comuna', 'business__category__slug',
+                     'business__rating', 'business__review_count')
+    ):
+        stops.setdefault(route_id, []).append((comuna, category, rating, review_count))
+
+    now = timezone.now()
+    rankings = []
+    tags = []
+    for pk, likes, views, created_at, is_featured in routes:
+        route_stops = stops.get(pk, [])
+        score = compute_route_score(
+            likes, views, [(rating, count) for _, _, rating, count in route_stops], created_at, is_featured, now
+        )
+        rankings.append(RouteRanking(route_id=pk, score=score))
+        for kind, values in (
+            ('comuna', _slugs(comuna for comuna, _, _, _ in route_stops)),
+            ('category', _slugs(category for _, category, _, _ in route_stops)),
+        ):
+            tags.extend(RouteRankingTag(ranking_id=pk, kind=kind, slug=slug, score=score) for slug in values)
+
+    with transaction.atomic():
+        RouteRanking.objects.filter(route_id__in=route_ids).exclude(
+            route_id__in=[ranking.route_id for ranking in rankings]
+        ).delete()
+        RouteRanking.objects.bulk_create(
+            rankings,
+            update_conflicts=True,
+            unique_fields=['route'],
+            update_fields=['score', 'updated_at'],
+            batch_size=1000
+        )
+        # Las etiquetas se reemplazan completas (copian el puntaje nuevo)
+        RouteRankingTag.objects.filter(ranking_id__in=route_ids).delete()
+        RouteRankingTag.objects.bulk_create(tags, batch_size=1000)
+    return len(rankings)
+
+
+def refresh_route_ranking_on_commit(route_id):
+    """Refresca una ruta cuando termine la transacción en curso"""
+    transaction.on_commit(lambda: refresh_route_rankings([route_id]))
+
+
+def encode_cursor(ranking):
+    """Cursor opaco con la posición (score, route_id) de la última fila"""
+    raw = f'{ranking.score!r}|{ranking.route_id}'
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor):
+    """
+    Raises:
+        ValueError: Si el cursor no es válido
+    """
+    try:
+        score, route_id = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+        return float(score), uuid.UUID(route_id)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError('Cursor inválido') from e
+
+
+def discover_routes(comuna=None, category=None, cursor=None, limit=20):
+    """
+    Página del feed de rutas públicas ordenada por puntaje
+
+    Paginación por keyset sobre (score, route_id): cada página es un rango
+    del índice route_ranking_feed_idx, sin OFFSET. Con filtro se recorre
+    route_rank_tag_feed_idx de la comuna (o categoría), que ya está ordenado
+    por puntaje.
+
+    Args:
+        comuna: Nombre o slug de comuna que debe tener alguna parada
+        category: Slug de categoría que debe tener alguna parada
+        cursor: Cursor de la página anterior (encode_cursor)
+        limit: Tamaño de página
+
+    Returns:
+        (lista de Route, cursor siguiente o None)
+
+    Raises:
+        ValueError: Si el cursor no es válido
+    """
+    if comuna or category:
+        # Recorrer las etiquetas de la comuna (o categoría) en orden de puntaje
+        kind, slug = ('comuna', slugify(comuna)) if comuna else ('category', slugify(category))
+        rows = RouteRankingTag.objects.filter(kind=kind, slug=slug).select_related('ranking__route')
+        if comuna and category:
+            rows = rows.filter(ranking__tags__kind='category', ranking__tags__slug=slugify(category))
+        route_field = 'ranking_id'
+    else:
+        rows = RouteRanking.objects.select_related('route')
+        route_field = 'route_id'
+
+    if cursor:
+        score, route_id = decode_cursor(cursor)
+        rows = rows.filter(Q(score__lt=score) | Q(score=score, **{f'{route_field}__lt': route_id}))
+
+    page = list(rows.order_by('-score', f'-{route_field}')[:limit + 1])
+    rankings = [row.ranking if isinstance(row, RouteRankingTag) else row for row in page]
+    next_cursor = encode_cursor(rankings[limit - 1]) if len(rankings) > limit else None
+    return [ranking.route for ranking in rankings[:limit]], next_cursor
@@ -0,0 +1,327 @@
+"""
+Generador local de itinerarios para sugerencias de rutas
+
+Elige y ordena negocios resolviendo un problema de orientación con premios
+(prize-collecting orienteering): cada negocio candidato aporta su rank_score
+como premio y cuesta su tiempo de visita más el traslado a pie; se busca el
+recorrido abierto de mayor premio que cabe en el presupuesto de tiempo.
+
+Heurística determinista:
+1. Inserción voraz: en cada paso se inserta el candidato con mejor razón
+   premio / (minutos extra de traslado + visita), en su mejor posición.
+   Todas las inserciones se evalúan a la vez con NumPy.
+2. Reordenamiento con el optimizador de rutas (2-opt + Or-opt) para liberar
+   tiempo, y nueva ronda de inserciones.
+3. Reemplazo: cambiar una parada por un candidato de mayor premio que quepa
+   en el tiempo liberado.
+
+Con ~60 candidatos el resultado está en pocos milisegundos, sin depender del LLM.
+"""
+import logging
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from django.conf import settings
+
+from apps.businesses.models import Business
+from apps.businesses.services.distance_matrix import distance_matrix
+from apps.businesses.services.spatial_index import spatial_index
+from core.utils import TRAVEL_MINUTES_PER_KM, haversine_matrix
+from .optimizer import optimize_stop_order
+
+logger = logging.getLogger(__name__)
+
+# Premio mínimo, para que negocios sin puntaje igual puedan elegirse
+MIN_PRIZE = 0.01
+
+# Presupuesto del optimizador por ronda de reordenamiento
+REORDER_TIME_BUDGET_MS = 20
+
+
+class ItineraryError(ValueError):
+    """No es posible armar un itinerario con los parámetros dados"""
+
+
+@dataclass
+class Itinerary:
+    """
+    Itinerario generado
+
+    Attributes:
+        business_ids: IDs de negocios en orden de visita
+        distances: Distancia (km) de cada parada desde la anterior (o desde el inicio)
+        visit_duration: Minutos de visita por parada
+        prize: Suma de premios (rank_score) de las paradas
+        candidates: Negocios candidatos evaluados
+        elapsed_ms: Tiempo de cómputo en milisegundos
+    """
+    business_ids: List[str]
+    distances: List[float]
+    visit_duration: int
+    prize: float
+    candidates: int
+    elapsed_ms: float = 0
+
+    @property
+    def total_distance(self):
+        return sum(self.distances)
+
+    @property
+    def total_duration(self):
+        travel = sum(round(distance * TRAVEL_MINUTES_PER_KM) for distance in self.distances)
+        return travel + self.visit_duration * len(self.business_ids)
+
+    def to_dict(self) -> Dict:
+        """Convierte el itinerario a diccionario (para la respuesta de la API)"""
+        return {
+            'stops': [
+                {
+                    'business_id': business_id,
+                    'order': order,
+                    'duration': self.visit_duration,
+                    'distance_from_previous': round(distance, 2),
+                    'travel_time_from_previous': round(distance * TRAVEL_MINUTES_PER_KM),
+                }
+                for order, (business_id, distance) in enumerate(zip(self.business_ids, self.distances), 1)
+            ],
+            'total_distance': round(self.total_distance, 2),
+            'estimated_duration': self.total_duration,
+            'candidates': self.candidates,
+            'elapsed_ms': round(self.elapsed_ms, 1),
+        }
+
+
+def _travel_matrix(travel, start_row):
+    """
+    Matriz de traslados con dos nodos ficticios: inicio (n) y fin (n + 1)
+
+    Sin punto de inicio el nodo inicial está a 0 de todos (inicio libre); el
+    nodo final siempre está a 0 (ruta abierta).
+    """
+    n = len(travel)
+    padded = np.zeros((n + 2, n + 2))
+    padded[:n, :n] = travel
+    if start_row is not None:
+        padded[n, :n] = start_row
+        padded[:n, n] = start_row
+    return padded
+
+
+def _path_cost(padded, path, visit):
+    full = [len(padded) - 2] + path + [len(padded) - 1]
+    return float(padded[full[:-1], full[1:]].sum()) + visit * len(path)
+
+
+def _best_insertions(padded, path, candidates):
+    """
+    Costo extra de traslado y mejor posición de inserción de cada candidato
+
+    Returns:
+        (delta, positions): arreglos alineados con candidates
+    """
+    full = np.array([len(padded) - 2] + path + [len(padded) - 1])
+    a, b = full[:-1], full[1:]
+    # posiciones (filas) x candidatos (columnas)
+    delta = padded[np.ix_(a, candidates)] + padded[np.ix_(candidates, b)].T - padded[a, b][:, None]
+    positions = np.argmin(delta, axis=0)
+    return delta[positions, np.arange(len(candidates))], positions
+
+
+def _insert_greedy(padded, prizes, path, visit, time_budget, max_stops):
+    """Inserta candidatos por mejor razón premio / costo mientras quepan"""
+    n = len(prizes)
+    changed = False
+    while len(path) < max_stops:
+        candidates = np.setdiff1d(np.arange(n), path)
+        if not len(candidates):
+            break
+        delta, positions = _best_insertions(padded, path, candidates)
+        slack = time_budget - _path_cost(padded, path, visit)
+        feasible = delta + visit <= slack
+        if not feasible.any():
+            break
+        ratio = np.where(feasible, prizes[candidates] / (delta + visit), -np.inf)
+        best = int(np.argmax(ratio))
+        path.insert(int(positions[best]), int(candidates[best]))
+        changed = True
+    return changed
+
+
+def _reorder(padded, path, has_start):
+    """Reordena el recorrido con el optimizador de rutas (inicio fijo si lo hay)"""
+    if len(path) < 3:
+        return path
+    nodes = ([len(padded) - 2] if has_start else []) + path
+    result = optimize_stop_order(
+        padded[np.ix_(nodes, nodes)],
+        start=0 if has_start else None,
+        time_budget_ms=REORDER_TIME_BUDGET_MS
+    )
+    order = [nodes[i] for i in result.order]
+    return order[1:] if has_start else order
+
+
+def _replace_once(padded, prizes, path, visit, time_budget):
+    """Cambia una parada por el candidato de mayor premio que quepa; True si hubo cambio"""
+    candidates = np.setdiff1d(np.arange(len(prizes)), path)
+    if not len(candidates):
+        return False
+    # Paradas de menor premio primero
+    for index in sorted(range(len(path)), key=lambda i: prizes[path[i]]):
+        better = candidates[prizes[candidates] > prizes[path[index]]]
+        if not len(better):
+            continue
+        reduced = path[:index] + path[index + 1:]
+        delta, positions = _best_insertions(padded, reduced, better)
+        slack = time_budget - _path_cost(padded, reduced, visit)
+        feasible = delta + visit <= slack
+        if feasible.any():
+            best = int(np.argmax(np.where(feasible, prizes[better], -np.inf)))
+            reduced.insert(int(positions[best]), int(better[best]))
+            path[:] = reduced
+            return True
+    return False
+
+
+def solve_orienteering(
+    prizes,
+    travel,
+    visit_duration: int,
+    time_budget: float,
+    max_stops: int,
+    start_row=None,
+) -> List[int]:
+    """
+    Recorrido abierto de mayor premio dentro del presupuesto de tiempo
+
+    Args:
+        prizes: Premio de cada candidato
+        travel: Matriz NxN de minutos de traslado entre candidatos
+        visit_duration: Minutos de visita por parada
+        time_budget: Minutos disponibles (traslados + visitas)
+        max_stops: Máximo de paradas
+        start_row: Minutos de traslado desde el punto de inicio a cada candidato (opcional)
+
+    Returns:
+        Índices de candidatos en orden de visita
+    """
+    prizes = np.maximum(np.asarray(prizes, dtype=float), MIN_PRIZE)
+    padded = _travel_matrix(np.asarray(travel, dtype=float), start_row)
+    has_start = start_row is not None
+
+    path = []
+    _insert_greedy(padded, prizes, path, visit_duration, time_budget, max_stops)
+    # Cada ronda agrega o cambia al menos una parada; el tope evita ciclos
+    for _ in range(len(prizes)):
+        path = _reorder(padded, path, has_start)
+        if _insert_greedy(padded, prizes, path, visit_duration, time_budget, max_stops):
+            continue
+        if not _replace_once(padded, prizes, path, visit_duration, time_budget):
+            break
+    return path
+
+
+def generate_itinerary(
+    categories: Optional[Sequence[str]] = None,
+    max_price: Optional[int] = None,
+    time_budget: Optional[int] = None,
+    start: Optional[Tuple[float, float]] = None,
+    min_stops: Optional[int] = None,
+    max_stops: Optional[int] = None,
+    visit_duration: Optional[int] = None,
+) -> Itinerary:
+    """
+    Elige y ordena negocios publicados para una ruta sugerida
+
+    Args:
+        categories: Slugs de categorías (opcional)
+        max_price: Rango de precio máximo 1-4 (opcional)
+        time_budget: Minutos disponibles (default: ITINERARY_DEFAULT_TIME_BUDGET,
+            máximo: ITINERARY_MAX_TIME_BUDGET)
+        start: (lat, lng) del punto de partida (opcional)
+        min_stops: Mínimo de paradas (default: hasta 3, según el tiempo disponible)
+        max_stops: Máximo de paradas (default y tope: ITINERARY_MAX_STOPS)
+        visit_duration: Minutos en cada lugar (default: ITINERARY_VISIT_DURATION,
+            acortado con poco tiempo para que quepan las paradas y las caminatas)
+
+    Returns:
+        Itinerary
+
+    Raises:
+        ItineraryError: Si la duración está fuera de rango, no hay suficientes
+            candidatos o el tiempo no alcanza
+    """
+    began = time.perf_counter()
+    if time_budget is None:
+        time_budget = settings.ITINERARY_DEFAULT_TIME_BUDGET
+    if not 0 < time_budget <= settings.ITINERARY_MAX_TIME_BUDGET:
+        raise ItineraryError(f'La duración debe estar entre 1 y {settings.ITINERARY_MAX_TIME_BUDGET} minutos')
+    max_stops = min(max_stops or settings.ITINERARY_MAX_STOPS, settings.ITINERARY_MAX_STOPS)
+    if min_stops is None:
+        # Cada parada necesita una visita corta y una caminata de duración similar
+        min_stops = max(1, min(3, time_budget // (2 * settings.ITINERARY_MIN_VISIT_DURATION), max_stops))
+    if visit_duration is None:
+        # Con poco tiempo se acortan las visitas y queda un tramo para caminar
+        visit_duration = max(
+            min(settings.ITINERARY_VISIT_DURATION, time_budget // (min_stops + 1)),
+            settings.ITINERARY_MIN_VISIT_DURATION,
+        )
+    if min_stops > max_stops:
+        raise ItineraryError(f'El mínimo de paradas ({min_stops}) supera el máximo ({max_stops})')
+    if visit_duration * min_stops > time_budget:
+        raise ItineraryError(f'{time_budget} minutos no alcanzan para {min_stops} paradas')
+
+    businesses = Business.objects.filter(is_active=True, status='published')
+    if categories:
+        businesses = businesses.filter(category__slug__in=categories)
+    if max_price:
+        businesses = businesses.filter(price_range__lte=max_price)
+    if start is not None:
+        # Solo negocios alcanzables a pie dentro del presupuesto
+        reach_km = min((time_budget - visit_duration) / TRAVEL_MINUTES_PER_KM, settings.ITINERARY_MAX_REACH_KM)
+        businesses = businesses.filter(id__in=spatial_index.within(start[0], start[1], reach_km * 1000))
+
+    candidates = list(
+        businesses.order_by('-rank_score').values_list('id', 'latitude', 'longitude', 'rank_score')
+        [:settings.ITINERARY_CANDIDATE_POOL]
+    )
+    if len(candidates) < min_stops:
+        raise ItineraryError('No hay suficientes negocios que cumplan los filtros')
+
+    points = [(str(pk), float(lat), float(lng)) for pk, lat, lng, _ in candidates]
+    distances = distance_matrix.matrix_for_points(points).distances
+    start_distances = None
+    if start is not None:
+        start_distances = haversine_matrix(
+            [start[0]], [start[1]], [point[1] for point in points], [point[2] for point in points]
+        )[0]
+
+    path = solve_orienteering(
+        [score for _, _, _, score in candidates],
+        distances * TRAVEL_MINUTES_PER_KM,
+        visit_duration,
+        time_budget,
+        max_stops,
+        start_row=None if start_distances is None else start_distances * TRAVEL_MINUTES_PER_KM,
+    )
+    if len(path) < min_stops:
+        raise ItineraryError(f'{time_budget} minutos no alcanzan para {min_stops} paradas con estos filtros')
+
+    legs = [float(start_distances[path[0]]) if start_distances is not None else 0.0]
+    legs += [float(distances[a, b]) for a, b in zip(path, path[1:])]
+
+    itinerary = Itinerary(
+        business_ids=[points[i][0] for i in path],
+        distances=legs,
+        visit_duration=visit_duration,
+        prize=float(sum(candidates[i][3] for i in path)),
+        candidates=len(candidates),
+        elapsed_ms=(time.perf_counter() - began) * 1000,
+    )
+    logger.info(
+        'Itinerario: %s paradas de %s candidatos en %.1f ms',
+        len(path), len(candidates), itinerary.elapsed_ms
+    )
+    return itinerary
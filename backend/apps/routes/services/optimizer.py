@@ -0,0 +1,333 @@
+"""
+Optimización del orden de paradas de una ruta
+
+Minimiza la distancia total a pie de una ruta abierta (sin volver al inicio)
+con inicio y/o fin opcionalmente fijos:
+
+1. Vecino más cercano como solución inicial (probando cada inicio posible
+   cuando el inicio no está fijo).
+2. Mejora local con 2-opt (invertir un tramo) y Or-opt (mover un bloque de
+   1 a 3 paradas, opcionalmente invertido). Cada paso evalúa todos los
+   movimientos a la vez sobre la matriz de distancias con NumPy y aplica el
+   de mayor mejora.
+
+La búsqueda se corta al agotar el presupuesto de tiempo
+(ROUTE_OPTIMIZER_TIME_BUDGET_MS) y siempre retorna la mejor solución
+encontrada hasta ese momento.
+"""
+import logging
+import time
+from dataclasses import dataclass
+from typing import Dict, List
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+
+from apps.businesses.services.distance_matrix import distance_matrix
+from ..models import Route, RouteStop
+
+logger = logging.getLogger(__name__)
+
+# Mejora mínima (km) para aceptar un movimiento; evita ciclos por redondeo
+EPSILON = 1e-9
+
+# Largo máximo de los bloques que mueve Or-opt
+OR_OPT_MAX_SEGMENT = 3
+
+
+class RouteOptimizationError(ValueError):
+    """Parámetros inválidos para optimizar una ruta"""
+
+
+@dataclass
+class OptimizationResult:
+    """
+    Resultado de la optimización
+
+    Attributes:
+        order: Índices de las paradas originales en el nuevo orden
+        distance_before: Distancia total del orden original (km)
+        distance_after: Distancia total del nuevo orden (km)
+        moves: Movimientos de mejora aplicados (2-opt + Or-opt)
+        elapsed_ms: Tiempo de cómputo en milisegundos
+        timed_out: True si se agotó el presupuesto de tiempo
+    """
+    order: List[int]
+    distance_before: float
+    distance_after: float
+    moves: int = 0
+    elapsed_ms: float = 0
+    timed_out: bool = False
+
+    @property
+    def changed(self):
+        return self.order != list(range(len(self.order)))
+
+    def to_dict(self) -> Dict:
+        """Convierte el resultado a diccionario (para la respuesta de la API)"""
+        return {
+            'distance_before': round(self.distance_before, 2),
+            'distance_after': round(self.distance_after, 2),
+            'distance_saved': round(self.distance_before - self.distance_after, 2),
+            'changed': self.changed,
+            'moves': self.moves,
+            'elapsed_ms': round(self.elapsed_ms, 1),
+            'timed_out': self.timed_out,
+        }
+
+
+def _path_length(distances, path):
+    path = np.asarray(path)
+    if len(path) < 2:
+        return 0.0
+    return float(distances[path[:-1], path[1:]].sum())
+
+
+def _nearest_neighbor(distances, start, end):
+    """Recorrido inicial por vecino más cercano desde start (terminando en end si está fijo)"""
+    n = len(distances)
+    visited = np.zeros(n, dtype=bool)
+    visited[start] = True
+    if end is not None:
+        visited[end] = True
+
+    path = [start]
+    current = start
+    for _ in range(int(n - visited.sum())):
+        candidates = np.where(visited, np.inf, distances[current])
+        current = int(np.argmin(candidates))
+        visited[current] = True
+        path.append(current)
+
+    if end is not None and end != start:
+        path.append(end)
+    return path
+
+
+def _initial_path(distances, start, end, deadline):
+    """Mejor recorrido de vecino más cercano entre los inicios permitidos"""
+    n = len(distances)
+    starts = [start] if start is not None else [i for i in range(n) if i != end]
+
+    best_path, best_length = None, np.inf
+    for candidate in starts:
+        path = _nearest_neighbor(distances, candidate, end)
+        length = _path_length(distances, path)
+        if length < best_length:
+            best_path, best_length = path, length
+        if time.perf_counter() >= deadline:
+            break
+    return best_path
+
+
+def _two_opt_move(padded, path, start_fixed, end_fixed):
+    """
+    Aplica el mejor 2-opt (invertir path[i..j]) si mejora; retorna True si lo hizo
+
+    path incluye un nodo ficticio a distancia 0 en cada extremo, de modo que
+    la ruta abierta se trata como un ciclo sin costo en los bordes.
+    """
+    m = len(path)
+    i_lo = 2 if start_fixed else 1
+    j_hi = m - 3 if end_fixed else m - 2
+    if j_hi - i_lo < 1:
+        return False
+
+    i = np.arange(i_lo, j_hi)
+    j = np.arange(i_lo + 1, j_hi + 1)
+    a, b = path[i - 1], path[i]
+    c, d = path[j], path[j + 1]
+
+    delta = (
+        padded[a[:, None], c[None, :]] + padded[b[:, None], d[None, :]]
+        - padded[a, b][:, None] - padded[c, d][None, :]
+    )
+    delta[j[None, :] <= i[:, None]] = np.inf
+
+    best = np.unravel_index(np.argmin(delta), delta.shape)
+    if delta[best] >= -EPSILON:
+        return False
+
+    ii, jj = i[best[0]], j[best[1]]
+    path[ii:jj + 1] = path[ii:jj + 1][::-1].copy()
+    return True
+
+
+def _or_opt_move(padded, path, start_fixed, end_fixed):
+    """
+    Aplica el mejor Or-opt (mover path[s..e] entre otras dos paradas, derecho
+    o invertido) si mejora; retorna la nueva ruta o None
+    """
+    m = len(path)
+    first_movable = 2 if start_fixed else 1
+    last_movable = m - 3 if end_fixed else m - 2
+    k = np.arange(1 if start_fixed else 0, (m - 3 if end_fixed else m - 2) + 1)
+    u, v = path[k], path[k + 1]
+    edge = padded[u, v]
+
+    best_delta, best_move = -EPSILON, None
+    for length in range(1, OR_OPT_MAX_SEGMENT + 1):
+        s = np.arange(first_movable, last_movable - length + 2)
+        if not len(s):
+            break
+        e = s + length - 1
+        prev, first, last, nxt = path[s - 1], path[s], path[e], path[e + 1]
+
+        gain = padded[prev, first] + padded[last, nxt] - padded[prev, nxt]
+        forward = padded[u[None, :], first[:, None]] + padded[last[:, None], v[None, :]] - edge[None, :]
+        backward = padded[u[None, :], last[:, None]] + padded[first[:, None], v[None, :]] - edge[None, :]
+        insertion = np.minimum(forward, backward)
+
+        delta = insertion - gain[:, None]
+        delta[(k[None, :] >= (s - 1)[:, None]) & (k[None, :] <= e[:, None])] = np.inf
+
+        best = np.unravel_index(np.argmin(delta), delta.shape)
+        if delta[best] < best_delta:
+            best_delta = delta[best]
+            best_move = (s[best[0]], e[best[0]], k[best[1]], backward[best] < forward[best])
+
+    if best_move is None:
+        return None
+
+    s, e, k, reverse = best_move
+    segment = path[s:e + 1][::-1] if reverse else path[s:e + 1]
+    rest = np.concatenate([path[:s], path[e + 1:]])
+    position = k + 1 if k < s else k + 1 - (e - s + 1)
+    return np.concatenate([rest[:position], segment, rest[position:]])
+
+
+def optimize_stop_order(distances, start=None, end=None, time_budget_ms=None) -> OptimizationResult:
+    """
+    Ordena las paradas para minimizar la distancia total de una ruta abierta
+
+    Args:
+        distances: Matriz NxN de distancias (simétrica)
+        start: Índice de la parada inicial fija (opcional)
+        end: Índice de la parada final fija (opcional)
+        time_budget_ms: Presupuesto de tiempo (default: ROUTE_OPTIMIZER_TIME_BUDGET_MS)
+
+    Returns:
+        OptimizationResult
+    """
+    if time_budget_ms is None:
+        time_budget_ms = settings.ROUTE_OPTIMIZER_TIME_BUDGET_MS
+
+    began = time.perf_counter()
+    deadline = began + time_budget_ms / 1000
+
+    distances = np.asarray(distances, dtype=float)
+    n = len(distances)
+    original = list(range(n))
+    distance_before = _path_length(distances, original)
+
+    if n < 3:
+        return OptimizationResult(order=original, distance_before=distance_before, distance_after=distance_before)
+
+    # Nodo ficticio (índice n) a distancia 0 de todos: convierte la ruta abierta en ciclo
+    padded = np.zeros((n + 1, n + 1))
+    padded[:n, :n] = distances
+
+    initial = _initial_path(distances, start, end, deadline)
+    path = np.array([n] + initial + [n])
+
+    moves = 0
+    timed_out = False
+    while True:
+        if time.perf_counter() >= deadline:
+            timed_out = True
+            break
+        if _two_opt_move(padded, path, start is not None, end is not None):
+            moves += 1
+            continue
+        moved = _or_opt_move(padded, path, start is not None, end is not None)
+        if moved is None:
+            break
+        path = moved
+        moves += 1
+
+    order = [int(i) for i in path[1:-1]]
+    distance_after = _path_length(distances, order)
+
+    # Conservar el orden original si cumple las restricciones y no es peor
+    respects_fixed = (start is None or start == 0) and (end is None or end == n - 1)
+    if respects_fixed and distance_after >= distance_before - EPSILON:
+        order, distance_after = original, distance_before
+
+    return OptimizationResult(
+        order=order,
+        distance_before=distance_before,
+        distance_after=distance_after,
+        moves=moves,
+        elapsed_ms=(time.perf_counter() - began) * 1000,
+        timed_out=timed_out,
+    )
+
+
+def optimize_route(route, start_stop_id=None, end_stop_id=None) -> OptimizationResult:
+    """
+    Reordena las paradas de una ruta y persiste el nuevo orden
+
+    Args:
+        route: Instancia de Route
+        start_stop_id: ID de la parada que debe ir primero (opcional)
+        end_stop_id: ID de la parada que debe ir al final (opcional)
+
+    Returns:
+        OptimizationResult
+
+    Raises:
+        RouteOptimizationError: Si las paradas fijas no pertenecen a la ruta
+            o la ruta supera ROUTE_OPTIMIZER_MAX_STOPS
+    """
+    with transaction.atomic():
+        # Bloquear la ruta para no mezclar dos reordenamientos concurrentes
+        Route.objects.select_for_update().filter(pk=route.pk).first()
+        stops = list(route.stops.select_related('business').order_by('order'))
+
+        if len(stops) > settings.ROUTE_OPTIMIZER_MAX_STOPS:
+            raise RouteOptimizationError(
+                f'La ruta supera el máximo de {settings.ROUTE_OPTIMIZER_MAX_STOPS} paradas optimizables'
+            )
+
+        index = {str(stop.id): i for i, stop in enumerate(stops)}
+        start = end = None
+        if start_stop_id:
+            start = index.get(str(start_stop_id))
+            if start is None:
+                raise RouteOptimizationError('La parada inicial no pertenece a la ruta')
+        if end_stop_id:
+            end = index.get(str(end_stop_id))
+            if end is None:
+                raise RouteOptimizationError('La parada final no pertenece a la ruta')
+        if start is not None and start == end:
+            raise RouteOptimizationError('La parada inicial y final deben ser distintas')
+
+        matrix = distance_matrix.matrix_for_businesses([stop.business for stop in stops])
+        result = optimize_stop_order(matrix.distances, start, end)
+
+        if result.changed:
+            _save_order(route, [stops[i] for i in result.order])
+
+    logger.info(
+        'Ruta %s optimizada: %.2f km -> %.2f km (%s movimientos, %.1f ms)',
+        route.pk, result.distance_before, result.distance_after, result.moves, result.elapsed_ms
+    )
+    return result
+
+
+def _save_order(route, ordered_stops):
+    """Persiste el nuevo orden reutilizando los mismos valores de 'order'"""
+    orders = sorted(stop.order for stop in ordered_stops)
+
+    # unique_together (route, order): mover primero todas las paradas fuera
+    # del rango usado y luego asignar el orden final en una sola UPDATE
+    offset = orders[-1] - orders[0] + 1
+    RouteStop.objects.filter(route=route).update(order=F('order') + offset)
+
+    for stop, order in zip(ordered_stops, orders):
+        stop.order = order
+    RouteStop.objects.bulk_update(ordered_stops, ['order'])
+
+    route.update_stats(ordered_stops)
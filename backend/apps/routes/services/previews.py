@@ -0,0 +1,61 @@
+"""
+Vista previa desnormalizada de las rutas
+
+Route.preview guarda nombre e imagen de los primeros negocios de la ruta
+para que el listado de rutas no consulte paradas ni negocios. Se reconstruye
+en Route.update_stats (cambios de paradas) y se parchea cuando un negocio
+cambia su nombre o su imagen de portada.
+"""
+from ..models import Route
+
+# Cantidad de negocios que se muestran en la vista previa
+PREVIEW_SIZE = 3
+
+
+def preview_entry(business):
+    """Datos de un negocio en la vista previa"""
+    return {
+        'id': str(business.id),
+        'name': business.name,
+        'cover_image': business.cover_image
+    }
+
+
+def build_preview(stops):
+    """
+    Construye la vista previa desde paradas ya cargadas
+
+    Args:
+        stops: Paradas ordenadas por 'order' con business cargado
+    """
+    return [preview_entry(stop.business) for stop in stops[:PREVIEW_SIZE]]
+
+
+def refresh_business_in_previews(business):
+    """
+    Actualiza nombre e imagen de un negocio en las rutas que lo muestran
+
+    Solo lee id y preview de las rutas que contienen el negocio y las
+    escribe con un bulk_update.
+
+    Returns:
+        Número de rutas actualizadas
+    """
+    business_id = str(business.id)
+    entry = preview_entry(business)
+
+    routes = (
+        Route.objects
+        .filter(stops__business_id=business.id)
+        .distinct()
+        .only('id', 'preview')
+    )
+    changed = []
+    for route in routes:
+        preview = [entry if item.get('id') == business_id else item for item in route.preview]
+        if preview != route.preview:
+            route.preview = preview
+            changed.append(route)
+
+    Route.objects.bulk_update(changed, ['preview'], batch_size=500)
+    return len(changed)
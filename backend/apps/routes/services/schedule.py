@@ -0,0 +1,169 @@
+"""
+Simulación de horario de una ruta
+
+Recorre las paradas en orden desde una hora de inicio sumando el traslado
+de cada tramo (travel_time_from_previous) y la duración de cada parada, y
+contrasta cada visita con los OpeningHours del negocio (day_of_week 0 =
+lunes). Todo se calcula en una sola pasada sobre datos precargados: una
+consulta para las paradas con sus negocios y otra para los horarios.
+
+Estados por parada:
+- open: abierto durante toda la visita
+- closes_during_visit: abierto al llegar pero cierra antes de salir
+- opens_later: cerrado al llegar pero abre más tarde ese día
+- closed: no vuelve a abrir ese día
+- unknown: el negocio no tiene horarios cargados
+"""
+from datetime import datetime, time, timedelta
+
+from django.utils import timezone
+
+from ..models import RouteStop
+
+OPEN = 'open'
+CLOSES_DURING_VISIT = 'closes_during_visit'
+OPENS_LATER = 'opens_later'
+CLOSED = 'closed'
+UNKNOWN = 'unknown'
+
+
+class _AlwaysOpen:
+    """Horario equivalente para negocios marcados is_open_24h sin OpeningHours"""
+    is_closed = False
+    is_24h = True
+
+
+_ALWAYS_OPEN = _AlwaysOpen()
+
+
+def _at(day, clock):
+    return timezone.make_aware(datetime.combine(day, clock))
+
+
+def _day_intervals(hours, day):
+    """Intervalos (inicio, fin) de apertura que empiezan en 'day'"""
+    if hours is None or hours.is_closed:
+        return []
+    if hours.is_24h:
+        return [(_at(day, time.min), _at(day + timedelta(days=1), time.min))]
+
+    intervals = []
+    for opens, closes in ((hours.opens_at, hours.closes_at), (hours.opens_at_2, hours.closes_at_2)):
+        if opens is None or closes is None:
+            continue
+        start, end = _at(day, opens), _at(day, closes)
+        if end <= start:
+            end += timedelta(days=1)  # Cierra después de medianoche
+        intervals.append((start, end))
+    return intervals
+
+
+def _open_intervals(hours_by_day, day):
+    """
+    Intervalos relevantes para una visita en 'day': los del día y los del
+    día anterior que se extienden pasada la medianoche
+    """
+    previous = day - timedelta(days=1)
+    intervals = [
+        interval for interval in _day_intervals(hours_by_day.get(previous.weekday()), previous)
+        if interval[1] > _at(day, time.min)
+    ]
+    intervals += _day_intervals(hours_by_day.get(day.weekday()), day)
+    return sorted(intervals)
+
+
+def _visit_status(hours_by_day, arrival, duration, wait):
+    """
+    Evalúa una visita contra los horarios del negocio
+
+    Returns:
+        (estado, llegada efectiva, intervalo de apertura relevante o None)
+    """
+    if not hours_by_day:
+        return UNKNOWN, arrival, None
+
+    day = timezone.localtime(arrival).date()
+    intervals = _open_intervals(hours_by_day, day)
+
+    for start, end in intervals:
+        if start <= arrival < end:
+            departure = arrival + timedelta(minutes=duration)
+            return (OPEN if departure <= end else CLOSES_DURING_VISIT), arrival, (start, end)
+
+    later = [interval for interval in intervals if interval[0] > arrival]
+    if not later:
+        return CLOSED, arrival, None
+
+    start, end = later[0]
+    if not wait:
+        return OPENS_LATER, arrival, (start, end)
+
+    # Esperar a que abra y evaluar la visita desde la apertura
+    departure = start + timedelta(minutes=duration)
+    return (OPEN if departure <= end else CLOSES_DURING_VISIT), start, (start, end)
+
+
+def simulate_route_schedule(route, start, wait=False):
+    """
+    Simula el itinerario de una ruta
+
+    Args:
+        route: Instancia de Route
+        start: datetime (aware) de inicio en la primera parada
+        wait: Si es True, en paradas que abren más tarde se espera la apertura
+
+    Returns:
+        Dict con el itinerario, la hora de término y las paradas con problemas
+    """
+    stops = list(
+        RouteStop.objects
+        .filter(route=route)
+        .select_related('business')
+        .prefetch_related('business__opening_hours')
+        .order_by('order')
+    )
+
+    current = start
+    itinerary = []
+    issues = 0
+    for stop in stops:
+        business = stop.business
+        hours_by_day = {hours.day_of_week: hours for hours in business.opening_hours.all()}
+        if not hours_by_day and business.is_open_24h:
+            hours_by_day = {day: _ALWAYS_OPEN for day in range(7)}
+
+        arrival = current + timedelta(minutes=stop.travel_time_from_previous)
+        status, visit_start, interval = _visit_status(hours_by_day, arrival, stop.duration, wait)
+        departure = visit_start + timedelta(minutes=stop.duration)
+
+        if status not in (OPEN, UNKNOWN):
+            issues += 1
+
+        itinerary.append({
+            'stop_id': str(stop.id),
+            'order': stop.order,
+            'business': {
+                'id': str(business.id),
+                'name': business.name,
+            },
+            'travel_time': stop.travel_time_from_previous,
+            'arrival': timezone.localtime(arrival).isoformat(),
+            'visit_start': timezone.localtime(visit_start).isoformat(),
+            'departure': timezone.localtime(departure).isoformat(),
+            'wait_minutes': int((visit_start - arrival).total_seconds() // 60),
+            'status': status,
+            'is_open_on_arrival': status in (OPEN, CLOSES_DURING_VISIT),
+            'opens_at': timezone.localtime(interval[0]).isoformat() if interval else None,
+            'closes_at': timezone.localtime(interval[1]).isoformat() if interval else None,
+        })
+        current = departure
+
+    return {
+        'route_id': str(route.id),
+        'start': timezone.localtime(start).isoformat(),
+        'end': timezone.localtime(current).isoformat(),
+        'total_minutes': int((current - start).total_seconds() // 60),
+        'feasible': issues == 0,
+        'issues_count': issues,
+        'stops': itinerary,
+    }
@@ -6,9 +6,14 @@ app_name = 'routes'
 urlpatterns = [
     path('', views.RouteListView.as_view(), name='route-list'),
     path('create/', views.RouteCreateView.as_view(), name='route-create'),
+    path('discover/', views.discover_routes, name='route-discover'),
     path('<uuid:id>/', views.RouteDetailView.as_view(), name='route-detail'),
     path('<uuid:id>/update/', views.RouteUpdateView.as_view(), name='route-update'),
     path('<uuid:id>/delete/', views.RouteDeleteView.as_view(), name='route-delete'),
     path('<uuid:route_id>/like/', views.like_route, name='route-like'),
     path('<uuid:route_id>/unlike/', views.unlike_route, name='route-unlike'),
+    path('<uuid:route_id>/optimize/', views.optimize_route, name='route-optimize'),
+    path('<uuid:route_id>/bundle/', views.route_bundle, name='route-bundle'),
+    path('<uuid:route_id>/schedule/', views.route_schedule, name='route-schedule'),
+    path('<uuid:route_id>/along/', views.businesses_along_route, name='route-along'),
 ]
@@ -1,13 +1,24 @@
+import gzip
+
+from django.http import HttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.utils.cache import patch_vary_headers
 from rest_framework import generics, status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated, IsAuthenticatedOrReadOnly
+from rest_framework.permissions import AllowAny, IsAuthenticated, IsAuthenticatedOrReadOnly
+from django.conf import settings
 from django.db import models
+from apps.businesses.models import Business
+from apps.businesses.serializers import BusinessListSerializer
+from apps.businesses.services.spatial_index import spatial_index
 from .models import Route, RouteLike
 from .serializers import (
     RouteListSerializer, RouteDetailSerializer,
     RouteCreateSerializer, RouteUpdateSerializer
 )
+from .services import bundle, discovery, optimizer, schedule
 
 
 class RouteListView(generics.ListAPIView):
@@ -16,7 +27,7 @@ class RouteListView(generics.ListAPIView):
     permission_classes = [IsAuthenticated]
     
     def get_queryset(self):
-        queryset = Route.objects.filter(user=self.request.user).prefetch_related('stops__business')
+        queryset = Route.objects.filter(user=self.request.user)
         
         # Filtro por visibilidad
         is_public = self.request.query_params.get('is_public')
@@ -53,6 +64,41 @@ class RouteListView(generics.ListAPIView):
         })
 
 
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def discover_routes(request):
+    """
+    Feed público de rutas ordenado por ranking
+    
+    Query params:
+        comuna: Filtrar rutas con alguna parada en la comuna
+        category: Filtrar rutas con alguna parada de la categoría (slug)
+        cursor: Cursor de la página anterior (next_cursor)
+        page_size: Tamaño de página (máx. 50, default 20)
+    """
+    try:
+        page_size = min(max(int(request.query_params.get('page_size', 20)), 1), 50)
+        routes, next_cursor = discovery.discover_routes(
+            comuna=request.query_params.get('comuna'),
+            category=request.query_params.get('category'),
+            cursor=request.query_params.get('cursor'),
+            limit=page_size
+        )
+    except ValueError:
+        return Response({
+            'success': False,
+            'message': 'Parámetros de paginación inválidos'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    return Response({
+        'success': True,
+        'data': {
+            'results': RouteListSerializer(routes, many=True).data,
+            'next_cursor': next_cursor
+        }
+    })
+
+
 class RouteDetailView(generics.RetrieveAPIView):
     """Detalle de una ruta"""
     serializer_class = RouteDetailSerializer
@@ -175,6 +221,7 @@ def like_route(request, route_id):
     if created:
         # Incrementar contador
         Route.objects.filter(id=route_id).update(likes=models.F('likes') + 1)
+        discovery.refresh_route_rankings([route_id])
         
         return Response({
             'success': True,
@@ -197,6 +244,7 @@ def unlike_route(request, route_id):
         
         # Decrementar contador
         Route.objects.filter(id=route_id).update(likes=models.F('likes') - 1)
+        discovery.refresh_route_rankings([route_id])
         
         return Response({
             'success': True,
@@ -208,3 +256,201 @@ def unlike_route(request, route_id):
             'success': False,
             'message': 'No has dado like a esta ruta'
         }, status=status.HTTP_404_NOT_FOUND)
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def optimize_route(request, route_id):
+    """
+    Reordenar las paradas de una ruta para minimizar la distancia total
+    
+    Body (opcional):
+        start_stop_id: ID de la parada que debe quedar primera
+        end_stop_id: ID de la parada que debe quedar última
+    """
+    try:
+        route = Route.objects.get(id=route_id, user=request.user)
+    except Route.DoesNotExist:
+        return Response({
+            'success': False,
+            'message': 'Ruta no encontrada'
+        }, status=status.HTTP_404_NOT_FOUND)
+    
+    try:
+        result = optimizer.optimize_route(
+            route,
+            start_stop_id=request.data.get('start_stop_id'),
+            end_stop_id=request.data.get('end_stop_id')
+        )
+    except optimizer.RouteOptimizationError as e:
+        return Response({
+            'success': False,
+            'message': str(e)
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    route = Route.objects.select_related('user').prefetch_related('stops__business').get(id=route.id)
+    
+    return Response({
+        'success': True,
+        'data': {
+            'route': RouteDetailSerializer(route).data,
+            'optimization': result.to_dict()
+        },
+        'message': 'Ruta optimizada' if result.changed else 'La ruta ya tenía el mejor orden encontrado'
+    }, status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticatedOrReadOnly])
+def route_bundle(request, route_id):
+    """
+    Bundle offline de una ruta (JSON comprimido con gzip)
+    
+    Responde 304 si el cliente envía If-None-Match con la versión vigente.
+    """
+    routes = Route.objects.filter(is_public=True)
+    if request.user.is_authenticated:
+        routes = Route.objects.filter(models.Q(is_public=True) | models.Q(user=request.user))
+    
+    try:
+        route = routes.get(id=route_id)
+    except Route.DoesNotExist:
+        return Response({
+            'success': False,
+            'message': 'Ruta no encontrada'
+        }, status=status.HTTP_404_NOT_FOUND)
+    
+    version, payload = bundle.get_route_bundle(route)
+    etag = f'"{version}"'
+    
+    if_none_match = request.headers.get('If-None-Match', '')
+    client_etags = {tag.strip().removeprefix('W/') for tag in if_none_match.split(',')}
+    if etag in client_etags or '*' in client_etags:
+        response = HttpResponse(status=status.HTTP_304_NOT_MODIFIED)
+    elif 'gzip' in request.headers.get('Accept-Encoding', ''):
+        response = HttpResponse(payload, content_type='application/json')
+        response['Content-Encoding'] = 'gzip'
+    else:
+        response = HttpResponse(gzip.decompress(payload), content_type='application/json; charset=utf-8')
+    
+    response['ETag'] = etag
+    response['Cache-Control'] = 'private, no-cache'
+    patch_vary_headers(response, ['Accept-Encoding', 'Authorization'])
+    return response
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticatedOrReadOnly])
+def route_schedule(request, route_id):
+    """
+    Simular el itinerario de una ruta contra los horarios de los negocios
+    
+    Query params:
+        start: Fecha y hora de inicio ISO 8601 (default: ahora, hora local)
+        wait: 'true' para esperar la apertura de paradas que abren más tarde
+    """
+    routes = Route.objects.filter(is_public=True)
+    if request.user.is_authenticated:
+        routes = Route.objects.filter(models.Q(is_public=True) | models.Q(user=request.user))
+    
+    try:
+        route = routes.get(id=route_id)
+    except Route.DoesNotExist:
+        return Response({
+            'success': False,
+            'message': 'Ruta no encontrada'
+        }, status=status.HTTP_404_NOT_FOUND)
+    
+    start = timezone.now()
+    start_param = request.query_params.get('start')
+    if start_param:
+        try:
+            start = parse_datetime(start_param.replace(' ', '+'))
+        except ValueError:
+            # Formato correcto pero fecha imposible (ej. 2026-13-45T10:00)
+            start = None
+        if start is None:
+            return Response({
+                'success': False,
+                'message': 'Parámetro start inválido (usar ISO 8601, ej: 2026-01-31T10:00)'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        if timezone.is_naive(start):
+            start = timezone.make_aware(start)
+    
+    wait = request.query_params.get('wait', 'false').lower() == 'true'
+    
+    return Response({
+        'success': True,
+        'data': schedule.simulate_route_schedule(route, start, wait=wait)
+    })
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticatedOrReadOnly])
+def businesses_along_route(request, route_id):
+    """
+    Negocios publicados "en el camino" de una ruta
+    
+    Query params:
+        buffer_m: Distancia máxima a la línea entre paradas en metros
+            (default ROUTE_ALONG_DEFAULT_BUFFER_M, máx. ROUTE_ALONG_MAX_BUFFER_M)
+        limit: Máximo de resultados (default 20, máx. 50)
+    """
+    routes = Route.objects.filter(is_public=True)
+    if request.user.is_authenticated:
+        routes = Route.objects.filter(models.Q(is_public=True) | models.Q(user=request.user))
+    
+    try:
+        route = routes.get(id=route_id)
+    except Route.DoesNotExist:
+        return Response({
+            'success': False,
+            'message': 'Ruta no encontrada'
+        }, status=status.HTTP_404_NOT_FOUND)
+    
+    try:
+        buffer_m = float(request.query_params.get('buffer_m', settings.ROUTE_ALONG_DEFAULT_BUFFER_M))
+        limit = min(max(int(request.query_params.get('limit', 20)), 1), 50)
+    except ValueError:
+        return Response({
+            'success': False,
+            'message': 'Parámetros buffer_m o limit inválidos'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    if not 0 < buffer_m <= settings.ROUTE_ALONG_MAX_BUFFER_M:
+        return Response({
+            'success': False,
+            'message': f'buffer_m debe estar entre 1 y {settings.ROUTE_ALONG_MAX_BUFFER_M}'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    stops = list(route.stops.order_by('order').values_list('business_id', 'business__latitude', 'business__longitude'))
+    matches = spatial_index.along(
+        [(lat, lng) for _, lat, lng in stops],
+        buffer_m,
+        exclude_ids=[business_id for business_id, _, _ in stops],
+        limit=limit
+    )
+    
+    businesses = {
+        str(business.id): business
+        for business in Business.objects.select_related('category').prefetch_related('features').filter(
+            id__in=[match.business_id for match in matches]
+        )
+    }
+    results = []
+    for match in matches:
+        business = businesses.get(match.business_id)
+        if business is None:
+            continue
+        data = BusinessListSerializer(business, context={'request': request}).data
+        data['distance_to_route_m'] = match.distance_m
+        data['detour_m'] = match.detour_m
+        data['after_stop'] = match.segment
+        results.append(data)
+    
+    return Response({
+        'success': True,
+        'data': {
+            'buffer_m': buffer_m,
+            'results': results
+        }
+    })
@@ -213,6 +213,123 @@ MAPBOX_ACCESS_TOKEN = env(
     default='pk.eyJ1IjoibmFjaG8yNTQiLCJhIjoiY21pdGxyZjhnMHRlYjNnb243bnA1OG81ayJ9.BPTKLir4w184eLNzsao9XQ'
 )
 
+# Caché: 'default' para versiones de catálogo, bundles y métricas; 'llm' para
+# respuestas de Gemini (LRU en memoria; en producción ambas van a Redis si hay REDIS_URL)
+LLM_CACHE_TIMEOUT = env.int('LLM_CACHE_TIMEOUT', default=60 * 60 * 6)
+LLM_CACHE_MAX_ENTRIES = env.int('LLM_CACHE_MAX_ENTRIES', default=1000)
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'llm': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'llm-responses',
+        'TIMEOUT': LLM_CACHE_TIMEOUT,
+        'OPTIONS': {
+            'MAX_ENTRIES': LLM_CACHE_MAX_ENTRIES,
+        },
+    },
+}
+
+# Segundos entre lecturas de la versión del catálogo en cada proceso (ver apps/businesses/catalog.py)
+CATALOG_VERSION_CHECK_SECONDS = env.float('CATALOG_VERSION_CHECK_SECONDS', default=2)
+
+# Bulkheads de servicios externos (ver core/executor.py): hilos, cola y timeout (s) por servicio
+OUTBOUND_BULKHEADS = {
+    'gemini': {
+        'max_concurrent': env.int('GEMINI_MAX_CONCURRENT', default=4),
+        'max_queue': env.int('GEMINI_MAX_QUEUE', default=4),
+        'timeout': env.float('GEMINI_TIMEOUT', default=30),
+    },
+    'mapbox': {
+        'max_concurrent': env.int('MAPBOX_MAX_CONCURRENT', default=8),
+        'max_queue': env.int('MAPBOX_MAX_QUEUE', default=8),
+        'timeout': env.float('MAPBOX_TIMEOUT', default=12),
+    },
+    'cloudinary': {
+        'max_concurrent': env.int('CLOUDINARY_MAX_CONCURRENT', default=4),
+        'max_queue': env.int('CLOUDINARY_MAX_QUEUE', default=4),
+        'timeout': env.float('CLOUDINARY_TIMEOUT', default=30),
+    },
+}
+
+# Cuota de la API de Gemini (ver apps/ai_assistant/quota.py); 0 desactiva un límite
+GEMINI_QUOTA = {
+    'requests_per_minute': env.int('GEMINI_QUOTA_RPM', default=15),
+    'requests_per_day': env.int('GEMINI_QUOTA_RPD', default=1500),
+    'tokens_per_day': env.int('GEMINI_QUOTA_TOKENS_PER_DAY', default=1_000_000),
+    'max_wait': env.float('GEMINI_QUOTA_MAX_WAIT', default=5),  # Segundos que una llamada espera cuota
+    'output_tokens': env.int('GEMINI_QUOTA_OUTPUT_TOKENS', default=800),  # Tokens estimados de respuesta
+}
+
+# Tokens estimados máximos de un prompt de Gemini (ver apps/ai_assistant/prompting.py)
+PROMPT_MAX_TOKENS = env.int('PROMPT_MAX_TOKENS', default=2500)
+# Largo máximo del mensaje del usuario: la mitad del presupuesto (4 caracteres por token)
+CHAT_MESSAGE_MAX_CHARS = env.int('CHAT_MESSAGE_MAX_CHARS', default=PROMPT_MAX_TOKENS * 4 // 2)
+
+# Sesiones de chat del asistente (ver apps/ai_assistant/sessions.py)
+CHAT_SESSION = {
+    'history_tokens': env.int('CHAT_SESSION_HISTORY_TOKENS', default=800),  # Últimos mensajes completos
+    'max_messages': env.int('CHAT_SESSION_MAX_MESSAGES', default=8),
+    'summary_tokens': env.int('CHAT_SESSION_SUMMARY_TOKENS', default=250),  # Resumen acumulado
+    'ttl_days': env.int('CHAT_SESSION_TTL_DAYS', default=7),  # Días sin actividad antes de expirar
+}
+
+# Asistente AI: modelo falso local en lugar de Gemini (tests y desarrollo sin API key)
+AI_ASSISTANT_FAKE_MODEL = env.bool('AI_ASSISTANT_FAKE_MODEL', default=False)
+AI_ASSISTANT_FAKE_MODEL_DELAY_MS = env.int('AI_ASSISTANT_FAKE_MODEL_DELAY_MS', default=30)  # Demora por fragmento
+
+# Analytics: días que se conservan las vistas crudas (BusinessView)
+# antes de compactarlas en agregados diarios
+BUSINESS_VIEWS_RETENTION_DAYS = env.int('BUSINESS_VIEWS_RETENTION_DAYS', default=90)
+
+# Ranking de negocios (ver apps/businesses/ranking.py)
+RANKING_PRIOR_MEAN = env.float('RANKING_PRIOR_MEAN', default=4.0)  # Rating previo del promedio bayesiano
+RANKING_PRIOR_WEIGHT = env.float('RANKING_PRIOR_WEIGHT', default=5)  # Reseñas "virtuales" con el rating previo
+RANKING_ENGAGEMENT_WEIGHT = env.float('RANKING_ENGAGEMENT_WEIGHT', default=0.15)  # Peso de log(1 + favoritos)
+RANKING_RECENCY_WEIGHT = env.float('RANKING_RECENCY_WEIGHT', default=0.3)  # Puntaje máximo de novedad (recién creado)
+RANKING_RECENCY_DAYS = env.float('RANKING_RECENCY_DAYS', default=60)  # Días τ del decaimiento exp(-edad/τ) de la novedad
+
+# Optimizador de orden de paradas (ver apps/routes/services/optimizer.py)
+ROUTE_OPTIMIZER_TIME_BUDGET_MS = env.int('ROUTE_OPTIMIZER_TIME_BUDGET_MS', default=300)
+ROUTE_OPTIMIZER_MAX_STOPS = env.int('ROUTE_OPTIMIZER_MAX_STOPS', default=100)
+
+# Generador local de itinerarios (ver apps/routes/services/itinerary.py)
+ITINERARY_DEFAULT_TIME_BUDGET = env.int('ITINERARY_DEFAULT_TIME_BUDGET', default=240)  # Minutos
+ITINERARY_MAX_STOPS = env.int('ITINERARY_MAX_STOPS', default=8)
+ITINERARY_VISIT_DURATION = env.int('ITINERARY_VISIT_DURATION', default=60)  # Minutos por parada (se acorta con poco tiempo)
+ITINERARY_MIN_VISIT_DURATION = env.int('ITINERARY_MIN_VISIT_DURATION', default=20)  # Visita más corta al acortar
+ITINERARY_DAY_MINUTES = env.int('ITINERARY_DAY_MINUTES', default=480)  # Minutos de recorrido de "1 día"
+ITINERARY_MAX_TIME_BUDGET = env.int('ITINERARY_MAX_TIME_BUDGET', default=ITINERARY_DAY_MINUTES)  # Tope de duración pedida
+ITINERARY_MAX_REACH_KM = env.float('ITINERARY_MAX_REACH_KM', default=10)  # Radio máximo de búsqueda desde el punto de partida
+ITINERARY_CANDIDATE_POOL = env.int('ITINERARY_CANDIDATE_POOL', default=60)  # Mejores negocios por rank_score
+
+# Feed de descubrimiento de rutas (ver apps/routes/services/discovery.py)
+ROUTE_DISCOVERY_LIKES_WEIGHT = env.float('ROUTE_DISCOVERY_LIKES_WEIGHT', default=1.0)  # Peso de log(1 + likes)
+ROUTE_DISCOVERY_VIEWS_WEIGHT = env.float('ROUTE_DISCOVERY_VIEWS_WEIGHT', default=0.3)  # Peso de log(1 + vistas)
+ROUTE_DISCOVERY_QUALITY_WEIGHT = env.float('ROUTE_DISCOVERY_QUALITY_WEIGHT', default=1.0)  # Peso del rating bayesiano medio de las paradas
+ROUTE_DISCOVERY_FEATURED_BOOST = env.float('ROUTE_DISCOVERY_FEATURED_BOOST', default=1.0)  # Bonus de rutas destacadas
+ROUTE_DISCOVERY_RECENCY_WEIGHT = env.float('ROUTE_DISCOVERY_RECENCY_WEIGHT', default=0.5)  # Puntaje máximo de novedad (recién creada)
+ROUTE_DISCOVERY_RECENCY_DAYS = env.float('ROUTE_DISCOVERY_RECENCY_DAYS', default=30)  # Días τ del decaimiento exp(-edad/τ)
+
+# Bundle offline de rutas: la clave incluye la versión, el TTL solo limpia bundles viejos
+ROUTE_BUNDLE_CACHE_TIMEOUT = env.int('ROUTE_BUNDLE_CACHE_TIMEOUT', default=60 * 60 * 24)
+
+# Búsqueda de negocios a lo largo de una ruta (metros)
+ROUTE_ALONG_DEFAULT_BUFFER_M = env.int('ROUTE_ALONG_DEFAULT_BUFFER_M', default=300)
+ROUTE_ALONG_MAX_BUFFER_M = env.int('ROUTE_ALONG_MAX_BUFFER_M', default=2000)
+
+# Búsqueda semántica de negocios (ver apps/businesses/services/semantic_search.py)
+SEMANTIC_EMBEDDING_PROVIDER = env(
+    'SEMANTIC_EMBEDDING_PROVIDER',
+    default='apps.businesses.services.semantic_search.HashingEmbeddingProvider'
+)
+SEMANTIC_EMBEDDING_DIM = env.int('SEMANTIC_EMBEDDING_DIM', default=1024)  # Solo para el vectorizador de hashing
+SEMANTIC_EMBEDDING_MODEL = env('SEMANTIC_EMBEDDING_MODEL', default='paraphrase-multilingual-MiniLM-L12-v2')
+
+# Caché LRU de distancias entre pares de negocios (por proceso, ~150 bytes por par)
+DISTANCE_MATRIX_CACHE_SIZE = env.int('DISTANCE_MATRIX_CACHE_SIZE', default=100000)
+
 # ===========================================
 # SENTRY ERROR TRACKING
 # ===========================================
@@ -108,5 +108,16 @@ if env('REDIS_URL', default=None):
             'OPTIONS': {
                 'CLIENT_CLASS': 'django_redis.client.DefaultClient',
             }
-        }
+        },
+        # Respuestas de Gemini: compartidas entre workers; la expulsión LRU
+        # la hace Redis (maxmemory-policy allkeys-lru)
+        'llm': {
+            'BACKEND': 'django_redis.cache.RedisCache',
+            'LOCATION': env('REDIS_URL'),
+            'KEY_PREFIX': 'llm',
+            'TIMEOUT': LLM_CACHE_TIMEOUT,
+            'OPTIONS': {
+                'CLIENT_CLASS': 'django_redis.client.DefaultClient',
+            }
+        },
     }
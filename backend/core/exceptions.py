@@ -15,6 +15,12 @@ def custom_exception_handler(exc, context):
             'errors': response.data
         }
         
-        return Response(custom_response, status=response.status_code)
+        # Conservar cabeceras como Retry-After o WWW-Authenticate
+        headers = {key: value for key, value in response.items()}
+        retry_after = getattr(exc, 'retry_after', None)
+        if retry_after and 'Retry-After' not in headers:
+            headers['Retry-After'] = str(retry_after)
+
+        return Response(custom_response, status=response.status_code, headers=headers)
     
     return response
@@ -0,0 +1,160 @@
+"""
+Ejecutor aislado para llamadas a servicios externos (bulkheads)
+
+Cada servicio externo (Gemini, Mapbox, Cloudinary) tiene su propio pool de
+hilos acotado y un límite de llamadas en espera. Si un servicio se degrada,
+sus llamadas ocupan solo su pool: al llenarse, las nuevas llamadas fallan de
+inmediato con ServiceUnavailableError (503) en vez de bloquear los workers
+y tumbar endpoints que no dependen de él (ej. BusinessListView).
+
+Configuración por servicio en OUTBOUND_BULKHEADS:
+    max_concurrent: llamadas ejecutándose a la vez
+    max_queue: llamadas esperando un hilo libre
+    timeout: segundos que el request espera el resultado
+
+Uso:
+    response = call_external('mapbox', requests.get, url, params=params, timeout=10)
+
+    with bulkhead('gemini').slot():
+        for chunk in model.generate_content(prompt, stream=True):
+            ...
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from contextlib import contextmanager
+
+from django.conf import settings
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+logger = logging.getLogger(__name__)
+
+
+class ServiceUnavailableError(APIException):
+    """Servicio externo saturado o sin respuesta (503)"""
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = 'Servicio externo no disponible temporalmente. Intenta de nuevo en unos segundos.'
+    default_code = 'service_unavailable'
+
+    def __init__(self, detail=None, code=None, retry_after=None):
+        super().__init__(detail, code)
+        self.retry_after = retry_after
+
+
+class Bulkhead:
+    """Pool de hilos acotado con cola limitada y timeout para un servicio externo"""
+
+    def __init__(self, name, max_concurrent, max_queue, timeout):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrent, thread_name_prefix=f'bulkhead-{name}')
+        # Llamadas en curso: ejecutándose + en cola
+        self._slots = threading.BoundedSemaphore(max_concurrent + max_queue)
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.rejected = 0
+        self.timeouts = 0
+
+    def acquire(self):
+        """Reserva un cupo sin esperar; False si el servicio está saturado"""
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            logger.warning('Bulkhead %s saturado: llamada rechazada', self.name)
+            return False
+        with self._lock:
+            self.in_flight += 1
+        return True
+
+    def release(self):
+        """Libera un cupo reservado con acquire()"""
+        with self._lock:
+            self.in_flight -= 1
+        self._slots.release()
+
+    def _unavailable(self, detail):
+        return ServiceUnavailableError(detail, retry_after=max(1, int(self.timeout)))
+
+    @contextmanager
+    def slot(self):
+        """
+        Cupo para una llamada que corre en el hilo actual (ej. streaming)
+
+        Raises:
+            ServiceUnavailableError: Si el servicio está saturado
+        """
+        if not self.acquire():
+            raise self._unavailable(f'El servicio {self.name} está saturado. Intenta de nuevo en unos segundos.')
+        try:
+            yield
+        finally:
+            self.release()
+
+    def call(self, fn, *args, call_timeout=None, **kwargs):
+        """
+        Ejecuta fn en el pool del servicio y espera su resultado
+
+        Args:
+            fn: Función que llama al servicio externo (args y kwargs se le pasan tal cual)
+            call_timeout: Segundos a esperar (default: timeout del bulkhead)
+
+        Raises:
+            ServiceUnavailableError: Si el servicio está saturado o no responde a tiempo
+        """
+        if not self.acquire():
+            raise self._unavailable(f'El servicio {self.name} está saturado. Intenta de nuevo en unos segundos.')
+        try:
+            future = self._executor.submit(fn, *args, **kwargs)
+        except Exception:
+            self.release()
+            raise
+        # El cupo se libera cuando la llamada termina, aunque el request ya no la espere
+        future.add_done_callback(lambda _: self.release())
+
+        timeout = self.timeout if call_timeout is None else call_timeout
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            with self._lock:
+                self.timeouts += 1
+            logger.warning('Bulkhead %s: sin respuesta en %ss', self.name, timeout)
+            raise self._unavailable(f'El servicio {self.name} no respondió a tiempo.')
+
+    def stats(self):
+        """Llamadas en curso, rechazadas y con timeout (de este proceso)"""
+        with self._lock:
+            return {
+                'in_flight': self.in_flight,
+                'max_concurrent': self.max_concurrent,
+                'max_queue': self.max_queue,
+                'rejected': self.rejected,
+                'timeouts': self.timeouts,
+            }
+
+
+_bulkheads = {}
+_bulkheads_lock = threading.Lock()
+
+
+def bulkhead(name):
+    """Bulkhead del servicio name (configurado en OUTBOUND_BULKHEADS, uno por proceso)"""
+    with _bulkheads_lock:
+        if name not in _bulkheads:
+            config = settings.OUTBOUND_BULKHEADS[name]
+            _bulkheads[name] = Bulkhead(name, **config)
+        return _bulkheads[name]
+
+
+def call_external(name, fn, *args, **kwargs):
+    """Ejecuta fn en el bulkhead del servicio name (ver Bulkhead.call)"""
+    return bulkhead(name).call(fn, *args, **kwargs)
+
+
+def bulkhead_stats():
+    """Estadísticas de los bulkheads creados en este proceso"""
+    with _bulkheads_lock:
+        return {name: instance.stats() for name, instance in _bulkheads.items()}
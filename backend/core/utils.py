@@ -3,9 +3,27 @@ Utilidades comunes para el proyecto
 """
 from math import radians, cos, sin, asin, sqrt
 from datetime import datetime
+import unicodedata
+import numpy as np
 from django.db.models import Q
 
 
+# Radio de la Tierra en kilómetros
+EARTH_RADIUS_KM = 6371
+
+# Tiempo estimado de traslado entre paradas (caminando/transporte urbano)
+TRAVEL_MINUTES_PER_KM = 5
+
+
+def _haversine_radians(lon1, lat1, lon2, lat2):
+    """Distancia Haversine en km (sin redondear) entre coordenadas ya en radianes"""
+    dlon = lon2 - lon1
+    dlat = lat2 - lat1
+    a = sin(dlat/2)**2 + cos(lat1) * cos(lat2) * sin(dlon/2)**2
+    c = 2 * asin(sqrt(a))
+    return EARTH_RADIUS_KM * c
+
+
 def haversine_distance(lon1, lat1, lon2, lat2):
     """
     Calcular distancia entre dos puntos usando fórmula Haversine
@@ -20,18 +38,50 @@ def haversine_distance(lon1, lat1, lon2, lat2):
     # Convertir grados a radianes
     lon1, lat1, lon2, lat2 = map(radians, [float(lon1), float(lat1), float(lon2), float(lat2)])
     
-    # Fórmula Haversine
-    dlon = lon2 - lon1
-    dlat = lat2 - lat1
-    a = sin(dlat/2)**2 + cos(lat1) * cos(lat2) * sin(dlon/2)**2
-    c = 2 * asin(sqrt(a))
-    
-    # Radio de la Tierra en kilómetros
-    km = 6371 * c
+    km = _haversine_radians(lon1, lat1, lon2, lat2)
     
     return round(km, 2)
 
 
+def haversine_matrix(lats1, lngs1, lats2=None, lngs2=None):
+    """
+    Matriz de distancias Haversine entre dos conjuntos de puntos (vectorizada)
+    
+    Args:
+        lats1, lngs1: Coordenadas de las filas (grados)
+        lats2, lngs2: Coordenadas de las columnas (por defecto, las mismas filas)
+    
+    Returns:
+        numpy.ndarray NxM con distancias en kilómetros (sin redondear)
+    """
+    lats1 = np.asarray(lats1, dtype=float)[:, None]
+    lngs1 = np.asarray(lngs1, dtype=float)[:, None]
+    if lats2 is None:
+        lats2, lngs2 = lats1.T, lngs1.T
+    else:
+        lats2 = np.asarray(lats2, dtype=float)[None, :]
+        lngs2 = np.asarray(lngs2, dtype=float)[None, :]
+    
+    return haversine_pairs(lats1, lngs1, lats2, lngs2)
+
+
+def haversine_pairs(lats1, lngs1, lats2, lngs2):
+    """
+    Distancias Haversine elemento a elemento entre arreglos de puntos
+    (con broadcasting de NumPy)
+    
+    Returns:
+        numpy.ndarray con distancias en kilómetros (sin redondear)
+    """
+    lat1 = np.radians(np.asarray(lats1, dtype=float))
+    lng1 = np.radians(np.asarray(lngs1, dtype=float))
+    lat2 = np.radians(np.asarray(lats2, dtype=float))
+    lng2 = np.radians(np.asarray(lngs2, dtype=float))
+    
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+
 def is_business_open_now(business):
     """
     Verificar si un negocio está abierto en el momento actual
@@ -101,6 +151,30 @@ def filter_businesses_by_location(queryset, lat, lng, radius=5):
     return businesses_with_distance
 
 
+# Palabras vacías (ya plegadas) que se ignoran al buscar negocios por texto
+SPANISH_STOPWORDS = frozenset("""
+    a al algo algun alguna algunas alguno algunos ante con como cual cuales cuando de del desde donde
+    el ella ellas ellos en entre era es esa ese eso esta estan este esto hay la las le les lo los
+    me mi mis muy mas nos o para pero por que se sea ser si sin sobre su sus te tu tus un una unos
+    unas y ya yo quiero quisiera busco buscar puedo podria recomienda recomiendas recomendar
+    hola gracias lugar lugares cerca santiago
+""".split())
+
+
+def fold_accents(text):
+    """
+    Minúsculas y sin tildes ni diéresis ('Ñuñoa' -> 'nunoa', 'Café' -> 'cafe')
+    
+    Args:
+        text: Texto a normalizar
+    
+    Returns:
+        Texto normalizado
+    """
+    decomposed = unicodedata.normalize('NFKD', text or '')
+    return ''.join(char for char in decomposed if not unicodedata.combining(char)).lower()
+
+
 def search_businesses(queryset, query):
     """
     Búsqueda de texto en negocios
@@ -124,53 +198,53 @@ def search_businesses(queryset, query):
     ).distinct()
 
 
-def calculate_route_stats(stops):
+def calculate_route_stats(stops, leg_distances=None):
     """
-    Calcular estadísticas de una ruta
+    Calcular estadísticas de una ruta en una sola pasada
+    
+    Cada coordenada se convierte a radianes una sola vez y las distancias
+    se suman sin redondear (solo se redondea el resultado).
     
     Args:
-        stops: QuerySet o lista de RouteStop
+        stops: Lista de RouteStop ordenada por 'order' con business cargado,
+            o QuerySet de RouteStop (se carga con select_related)
+        leg_distances: Distancias (km) desde la parada anterior ya calculadas,
+            alineadas con stops (ej. del servicio de matrices de distancia);
+            si no se pasan se calculan con haversine
     
     Returns:
-        Dict con total_distance, estimated_duration, stops_count
+        Dict con total_distance, estimated_duration, stops_count y legs:
+        lista alineada con las paradas de dicts {'distance', 'travel_time'}
+        con el tramo desde la parada anterior (0 para la primera)
     """
-    if not stops:
-        return {
-            'total_distance': 0,
-            'estimated_duration': 0,
-            'stops_count': 0
-        }
+    if hasattr(stops, 'select_related'):
+        stops = stops.select_related('business').order_by('order')
+    stops_list = list(stops)
     
     total_distance = 0
     total_duration = 0
-    
-    # Calcular distancia entre paradas consecutivas
-    stops_list = list(stops.order_by('order'))
-    
-    for i in range(len(stops_list) - 1):
-        current = stops_list[i]
-        next_stop = stops_list[i + 1]
-        
-        distance = haversine_distance(
-            float(current.business.longitude),
-            float(current.business.latitude),
-            float(next_stop.business.longitude),
-            float(next_stop.business.latitude)
-        )
+    legs = []
+    previous = None
+    
+    for index, stop in enumerate(stops_list):
+        if leg_distances is not None:
+            distance = leg_distances[index]
+        else:
+            point = (radians(float(stop.business.longitude)), radians(float(stop.business.latitude)))
+            distance = _haversine_radians(*previous, *point) if previous else 0
+            previous = point
+        travel_time = int(round(distance * TRAVEL_MINUTES_PER_KM))
+        legs.append({
+            'distance': round(distance, 3),
+            'travel_time': travel_time
+        })
         
         total_distance += distance
-        total_duration += current.duration
-    
-    # Agregar duración de la última parada
-    if stops_list:
-        total_duration += stops_list[-1].duration
-    
-    # Agregar tiempo estimado de traslado (5 min por km)
-    travel_time = int(total_distance * 5)
-    total_duration += travel_time
+        total_duration += stop.duration + travel_time
     
     return {
         'total_distance': round(total_distance, 2),
         'estimated_duration': total_duration,
-        'stops_count': len(stops_list)
+        'stops_count': len(stops_list),
+        'legs': legs
     }
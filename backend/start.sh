@@ -9,4 +9,5 @@ python3 create_superuser.py
 echo "🖼️  Actualizando imágenes de negocios..."
 python3 manage.py update_business_images
 echo "🚀 Iniciando servidor..."
-exec python3 -m gunicorn config.wsgi:application --bind 0.0.0.0:$PORT --workers 2
+# Workers ASGI (uvicorn): el chat en streaming no bloquea un worker por respuesta
+exec python3 -m gunicorn config.asgi:application -k uvicorn.workers.UvicornWorker --bind 0.0.0.0:$PORT --workers 2